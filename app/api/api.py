@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.endpoints import auth, proxy, hall_of_fame, user, submissions
+from app.api.endpoints import auth, proxy, hall_of_fame, user, submissions, beatmap
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -11,3 +11,4 @@ api_router.include_router(
 api_router.include_router(
     submissions.router, prefix="/submissions", tags=["submissions"]
 )
+api_router.include_router(beatmap.router, prefix="/beatmaps", tags=["beatmaps"])
@@ -4,11 +4,14 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
 from jose.exceptions import JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import httpx
 
-from app.db.session import SessionLocal
+from app.db.session import AsyncReadSessionLocal, SessionLocal
+from app.db.writer import DatabaseWriter, db_writer
 from app.core.config import settings
+from app.core.http_client import get_osu_http_client
 from app.models import user as user_model
 from app.core import security
 from app.crud import crud_user
@@ -24,9 +27,19 @@ def get_db() -> Generator:
         db.close()
 
 
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session on the read-only pool; any write through it raises."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def get_db_writer() -> DatabaseWriter:
+    return db_writer
+
+
 async def get_async_client() -> AsyncGenerator[httpx.AsyncClient, None]:
-    async with httpx.AsyncClient() as client:
-        yield client
+    # Shared pool owned by the app lifespan; never closed per request.
+    yield get_osu_http_client()
 
 
 def get_current_user(
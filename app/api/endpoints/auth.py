@@ -12,6 +12,7 @@ from app.schemas.token import OsuToken, SessionToken
 from app.crud import crud_user, crud_token
 from app.core import security
 from app.api import deps
+from app.db.writer import DatabaseWriter
 
 router = APIRouter()
 
@@ -65,7 +66,11 @@ async def web_login(request: Request):
 
 @router.get("/callback")
 async def auth_callback(
-    code: str, state: str, request: Request, db: Session = Depends(deps.get_db)
+    code: str,
+    state: str,
+    request: Request,
+    writer: DatabaseWriter = Depends(deps.get_db_writer),
+    client: httpx.AsyncClient = Depends(deps.get_async_client),
 ):
     try:
         state_json = base64.urlsafe_b64decode(state).decode()
@@ -85,36 +90,30 @@ async def auth_callback(
         "redirect_uri": settings.OSU_REDIRECT_URI,
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            token_response = await client.post(token_url, data=token_data)
-            token_response.raise_for_status()
-            osu_token_data = OsuToken(**token_response.json())
-
-            headers = {"Authorization": f"Bearer {osu_token_data.access_token}"}
-            user_response = await client.get(
-                f"{OSU_API_BASE_URL}/api/v2/me/osu", headers=headers
-            )
-            user_response.raise_for_status()
-            osu_user_profile = user_response.json()
-
-        except httpx.HTTPStatusError as exc:
-            raise HTTPException(
-                status_code=exc.response.status_code,
-                detail=f"Failed to communicate with osu! API: {exc.response.text}",
-            )
+    try:
+        token_response = await client.post(token_url, data=token_data)
+        token_response.raise_for_status()
+        osu_token_data = OsuToken(**token_response.json())
+
+        headers = {"Authorization": f"Bearer {osu_token_data.access_token}"}
+        user_response = await client.get(
+            f"{OSU_API_BASE_URL}/api/v2/me/osu", headers=headers
+        )
+        user_response.raise_for_status()
+        osu_user_profile = user_response.json()
+
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(
+            status_code=exc.response.status_code,
+            detail=f"Failed to communicate with osu! API: {exc.response.text}",
+        )
 
     osu_user_id = osu_user_profile.get("id")
     username = osu_user_profile.get("username")
 
-    user = crud_user.get_user_by_osu_id(db, osu_user_id=osu_user_id)
-    if not user:
-        user_in = UserCreate(osu_user_id=osu_user_id, username=username)
-        user = crud_user.create_user(db, user=user_in)
+    user_id = await writer.run(_store_login, osu_user_id, username, osu_token_data)
 
-    crud_token.create_or_update_token(db, token_data=osu_token_data, user_id=user.id)
-
-    session_jwt = security.create_session_token(data={"sub": str(user.id)})
+    session_jwt = security.create_session_token(data={"sub": str(user_id)})
 
     callback_port = state_data.get("port")
     client_type = state_data.get("client_type", "web")
@@ -133,3 +132,13 @@ async def auth_callback(
         )
 
     return response
+
+
+def _store_login(db: Session, osu_user_id: int, username: str, token_data: OsuToken) -> int:
+    user = crud_user.get_user_by_osu_id(db, osu_user_id=osu_user_id)
+    if not user:
+        user_in = UserCreate(osu_user_id=osu_user_id, username=username)
+        user = crud_user.create_user(db, user=user_in)
+
+    crud_token.create_or_update_token(db, token_data=token_data, user_id=user.id)
+    return user.id
@@ -1,121 +1,273 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import httpx
+from pydantic import BaseModel
+from typing import AsyncIterator, Optional
 import asyncio
+import json
 import logging
-from app.api.deps import get_db
+import uuid
+from app.api.deps import get_async_read_db, get_db_writer
 from app.schemas.beatmap import BeatmapEnrichRequest, BeatmapEnrichResponse, BeatmapData
-from app.crud.crud_beatmap import (
-    get_beatmaps_by_md5,
-    create_beatmap,
-    get_invalid_md5s,
-    create_invalid_md5
-)
-from app.core.osu_api_client import get_client_credentials_token
-from app.core.rate_limiter import osu_api_rate_limiter
+from app.crud.crud_beatmap_async import get_beatmaps_by_md5, get_invalid_md5s
+from app.crud import crud_enrich_job
+from app.core.beatmap_cache import CachedBeatmap, beatmap_cache
+from app.core.beatmap_enrichment import beatmap_enrichment_engine, store_lookup_results
+from app.core.md5_index import md5_membership_index
+from app.core.enrich_jobs import enrich_job_runner
+from app.db.writer import DatabaseWriter
+from app.models.beatmap import Beatmap
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-OSU_API_BASE_URL = "https://osu.ppy.sh"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
+# Lookups still running when an enrich job request returned; held so they aren't collected.
+_late_result_tasks: set[asyncio.Task] = set()
 
-async def fetch_beatmap_by_md5(md5_hash: str, token: str) -> dict | None:
-    try:
-        await osu_api_rate_limiter.acquire()
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json"
-            }
-            url = f"{OSU_API_BASE_URL}/api/v2/beatmaps/lookup?checksum={md5_hash}"
-            response = await client.get(url, headers=headers)
 
-            if response.status_code == 404:
-                return None
-
-            response.raise_for_status()
-            return response.json()
-    except Exception as e:
-        logger.error(f"Failed to fetch beatmap for MD5 {md5_hash}: {e}")
-        return None
+class EnrichJobResponse(BaseModel):
+    job_id: Optional[str] = None
+    status: str
+    beatmaps: dict[str, Optional[BeatmapData]]
+    pending: list[str] = []
+    failed: list[str] = []
 
 
 @router.post("/enrich", response_model=BeatmapEnrichResponse)
 async def enrich_beatmaps(
     request: BeatmapEnrichRequest,
-    db: Session = Depends(get_db)
+    stream: bool = Query(False),
+    accept: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    writer: DatabaseWriter = Depends(get_db_writer),
 ):
-    md5_hashes = request.md5_hashes
-    result = {}
+    """
+    Resolve every hash and answer with one ``BeatmapEnrichResponse``.
+
+    With ``?stream=true`` or ``Accept: application/x-ndjson`` the answer is streamed
+    instead, one ``{"md5_hash": ..., "beatmap": ...}`` line per hash: known hashes
+    first, then each upstream lookup as soon as it resolves.
+    """
+    if stream or (accept and NDJSON_MEDIA_TYPE in accept):
+        return StreamingResponse(
+            _stream_enrich(db, writer, request.md5_hashes), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    result, missing_md5s = await _lookup_known(db, request.md5_hashes)
+
+    if missing_md5s:
+        logger.info(f"Fetching {len(missing_md5s)} missing beatmaps from osu! API")
+        fetched_data = await beatmap_enrichment_engine.resolve(missing_md5s)
+        stored = await writer.run(store_lookup_results, fetched_data)
+
+        for md5 in missing_md5s:
+            # Hashes absent from fetched_data failed transiently: answer None but
+            # don't cache them as invalid.
+            result[md5] = _beatmap_data(stored.get(md5))
+
+    return BeatmapEnrichResponse(beatmaps=result)
+
+
+async def _stream_enrich(
+    db: AsyncSession, writer: DatabaseWriter, md5_hashes: list[str]
+) -> AsyncIterator[str]:
+    result, missing_md5s = await _lookup_known(db, md5_hashes)
+    for md5, beatmap in result.items():
+        yield _ndjson_line(md5, beatmap)
+    del result
+
+    # Submit at most one queue's worth at a time: submit() blocks while the queue is
+    # full, and nothing could be streamed until the whole list had been queued.
+    window = beatmap_enrichment_engine.queue_size
+    for start in range(0, len(missing_md5s), window):
+        futures = await beatmap_enrichment_engine.submit(missing_md5s[start:start + window])
+        md5_by_future = {future: md5 for md5, future in futures.items()}
+        pending = set(md5_by_future)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            fetched_data: dict[str, Optional[dict]] = {}
+            for future in done:
+                md5 = md5_by_future.pop(future)
+                if future.cancelled() or future.exception() is not None:
+                    # Transient failure: answer None but don't cache it as invalid.
+                    if not future.cancelled():
+                        logger.error(f"Failed to fetch beatmap for MD5 {md5}: {future.exception()}")
+                    yield _ndjson_line(md5, None)
+                else:
+                    fetched_data[md5] = future.result()
+
+            stored = await writer.run(store_lookup_results, fetched_data)
+            for md5, beatmap in stored.items():
+                yield _ndjson_line(md5, _beatmap_data(beatmap))
+
+
+def _ndjson_line(md5: str, beatmap: Optional[BeatmapData]) -> str:
+    data = beatmap.model_dump() if beatmap is not None else None
+    return json.dumps({"md5_hash": md5, "beatmap": data}) + "\n"
+
+
+@router.post("/enrich/jobs", response_model=EnrichJobResponse)
+async def create_enrich_job(
+    request: BeatmapEnrichRequest,
+    deadline_ms: int = Query(2000, ge=0, le=30000),
+    db: AsyncSession = Depends(get_async_read_db),
+    writer: DatabaseWriter = Depends(get_db_writer),
+):
+    """
+    Answer with whatever is known within ``deadline_ms`` and queue the rest.
+
+    Unresolved hashes are persisted as a job before any upstream call is made, so
+    they survive restarts; poll ``GET /enrich/jobs/{job_id}`` for the remainder.
+    The deadline counts from the start of the request. Lookups that finish after
+    it are still recorded, so the job runner doesn't repeat them.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_ms / 1000
+
+    result, missing_md5s = await _lookup_known(db, request.md5_hashes)
+    if not missing_md5s:
+        return EnrichJobResponse(status=crud_enrich_job.JOB_COMPLETED, beatmaps=result)
+
+    job_id = str(uuid.uuid4())
+    await writer.run(crud_enrich_job.create_job, job_id, missing_md5s)
+
+    # Only what fits in the engine's queue is looked up now; the rest stays pending
+    # for the job runner, so a full queue can't hold the request past its deadline.
+    futures = beatmap_enrichment_engine.submit_nowait(missing_md5s)
+    done: set[asyncio.Future] = set()
+    if futures:
+        done, _ = await asyncio.wait(set(futures.values()), timeout=max(0.0, deadline - loop.time()))
 
-    invalid_md5s = get_invalid_md5s(db, md5_hashes)
+    fetched_data = {
+        md5: future.result()
+        for md5, future in futures.items()
+        if future in done and not future.cancelled() and future.exception() is None
+    }
+    stored = await writer.run(_store_job_results, job_id, fetched_data)
+    for md5, beatmap in stored.items():
+        result[md5] = _beatmap_data(beatmap)
+
+    pending = [md5 for md5 in missing_md5s if md5 not in fetched_data]
+    late = {md5: future for md5, future in futures.items() if future not in done}
+    if late:
+        task = asyncio.create_task(_store_late_results(writer, job_id, late))
+        _late_result_tasks.add(task)
+        task.add_done_callback(_late_result_tasks.discard)
+    if any(md5 not in late for md5 in pending):
+        enrich_job_runner.wake()
+
+    return EnrichJobResponse(
+        job_id=job_id,
+        status=crud_enrich_job.JOB_PENDING if pending else crud_enrich_job.JOB_COMPLETED,
+        beatmaps=result,
+        pending=pending,
+    )
+
+
+@router.get("/enrich/jobs/{job_id}", response_model=EnrichJobResponse)
+async def get_enrich_job(job_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    job = await db.run_sync(crud_enrich_job.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Enrich job not found")
+
+    items = await db.run_sync(crud_enrich_job.get_job_items, job_id)
+    done = [item.md5_hash for item in items if item.status == crud_enrich_job.ITEM_DONE]
+    result, _ = await _lookup_known(db, done)
+
+    return EnrichJobResponse(
+        job_id=job.id,
+        status=job.status,
+        beatmaps=result,
+        pending=[item.md5_hash for item in items if item.status == crud_enrich_job.ITEM_PENDING],
+        failed=[item.md5_hash for item in items if item.status == crud_enrich_job.ITEM_FAILED],
+    )
+
+
+async def _store_late_results(
+    writer: DatabaseWriter, job_id: str, futures: dict[str, asyncio.Future]
+) -> None:
+    await asyncio.wait(set(futures.values()))
+    fetched_data = {
+        md5: future.result()
+        for md5, future in futures.items()
+        if not future.cancelled() and future.exception() is None
+    }
+    # Failed lookups stay pending for the job runner.
+    if fetched_data:
+        try:
+            await writer.run(_store_job_results, job_id, fetched_data)
+        except Exception:
+            logger.exception(f"Storing late results for enrich job {job_id} failed")
+
+
+def _store_job_results(
+    db: Session, job_id: str, fetched_data: dict[str, Optional[dict]]
+) -> dict[str, Optional[CachedBeatmap]]:
+    stored = store_lookup_results(db, fetched_data)
+    job_ids = crud_enrich_job.mark_items_done(db, fetched_data.keys())
+    crud_enrich_job.complete_finished_jobs(db, job_ids | {job_id})
+    return stored
+
+
+@router.get("/enrich/metrics")
+async def get_enrich_metrics():
+    return beatmap_enrichment_engine.metrics()
+
+
+@router.get("/cache/metrics")
+async def get_cache_metrics():
+    return {
+        "beatmap_cache": beatmap_cache.metrics(),
+        "md5_index": md5_membership_index.metrics(),
+    }
+
+
+async def _lookup_known(
+    db: AsyncSession, md5_hashes: list[str]
+) -> tuple[dict[str, Optional[BeatmapData]], list[str]]:
+    """
+    Answer hashes from the database. Returns the results and the unknown hashes.
+
+    The MD5 index lets hashes it has classified skip the InvalidMD5 query, and
+    hashes it has never seen skip the beatmap lookup as well.
+    """
+    result: dict[str, Optional[BeatmapData]] = {}
+
+    known_invalid, maybe_cached, unchecked = md5_membership_index.classify(md5_hashes)
+    invalid_md5s = known_invalid | await get_invalid_md5s(db, unchecked)
     for md5 in invalid_md5s:
         result[md5] = None
 
-    remaining_md5s = [md5 for md5 in md5_hashes if md5 not in invalid_md5s]
-
-    cached_beatmaps = get_beatmaps_by_md5(db, remaining_md5s)
+    lookup_md5s = [md5 for md5 in maybe_cached + unchecked if md5 not in invalid_md5s]
+    cached_beatmaps = await get_beatmaps_by_md5(db, lookup_md5s)
     for md5, beatmap in cached_beatmaps.items():
         if beatmap:
-            result[md5] = BeatmapData(
-                beatmap_id=beatmap.beatmap_id,
-                beatmapset_id=beatmap.beatmapset_id,
-                ranked_status=beatmap.ranked_status,
-                artist=beatmap.artist,
-                title=beatmap.title,
-                creator=beatmap.creator,
-                version=beatmap.version,
-                hit_objects=beatmap.hit_objects,
-                max_combo=beatmap.max_combo
-            )
-
-    missing_md5s = [md5 for md5 in remaining_md5s if md5 not in cached_beatmaps]
+            result[md5] = _beatmap_data(beatmap)
 
-    if missing_md5s:
-        logger.info(f"Fetching {len(missing_md5s)} missing beatmaps from osu! API")
-        token = await get_client_credentials_token()
-        fetch_tasks = [fetch_beatmap_by_md5(md5, token) for md5 in missing_md5s]
-        fetched_data = await asyncio.gather(*fetch_tasks)
-
-        for md5, data in zip(missing_md5s, fetched_data):
-            if data is None:
-                logger.info(f"MD5 {md5} returned 404, caching as invalid")
-                create_invalid_md5(db, md5, "404_not_found")
-                result[md5] = None
-            else:
-                logger.info(f"Saving beatmap {data['id']} (MD5: {md5}) to database")
-                beatmap_data = {
-                    "beatmap_id": data["id"],
-                    "beatmapset_id": data["beatmapset_id"],
-                    "ranked_status": data["status"],
-                    "md5_hash": md5,
-                    "artist": data["beatmapset"]["artist"],
-                    "title": data["beatmapset"]["title"],
-                    "creator": data["beatmapset"]["creator"],
-                    "version": data["version"],
-                    "hit_objects": data.get("count_circles", 0) + data.get("count_sliders", 0) + data.get("count_spinners", 0),
-                    "max_combo": data.get("max_combo")
-                }
-
-                try:
-                    beatmap = create_beatmap(db, beatmap_data)
-                    logger.info(f"Successfully saved beatmap {beatmap.beatmap_id}")
-                except Exception as e:
-                    logger.error(f"Failed to save beatmap: {e}")
-                    raise
-
-                result[md5] = BeatmapData(
-                    beatmap_id=beatmap.beatmap_id,
-                    beatmapset_id=beatmap.beatmapset_id,
-                    ranked_status=beatmap.ranked_status,
-                    artist=beatmap.artist,
-                    title=beatmap.title,
-                    creator=beatmap.creator,
-                    version=beatmap.version,
-                    hit_objects=beatmap.hit_objects,
-                    max_combo=beatmap.max_combo
-                )
-
-    db.commit()
-    return BeatmapEnrichResponse(beatmaps=result)
+    missing_md5s = list(
+        dict.fromkeys(
+            md5 for md5 in md5_hashes
+            if md5 not in invalid_md5s and md5 not in cached_beatmaps
+        )
+    )
+    return result, missing_md5s
+
+
+def _beatmap_data(beatmap: Optional[Beatmap | CachedBeatmap]) -> Optional[BeatmapData]:
+    if beatmap is None:
+        return None
+    return BeatmapData(
+        beatmap_id=beatmap.beatmap_id,
+        beatmapset_id=beatmap.beatmapset_id,
+        ranked_status=beatmap.ranked_status,
+        artist=beatmap.artist,
+        title=beatmap.title,
+        creator=beatmap.creator,
+        version=beatmap.version,
+        hit_objects=beatmap.hit_objects,
+        max_combo=beatmap.max_combo
+    )
@@ -1,25 +1,49 @@
+import asyncio
+import hmac
 import json
+import logging
+import os
 import shutil
 import uuid
-from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
+from concurrent.futures import Future
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.api import deps
-from app.core import security
+from app.core import report_storage, security
+from app.core.http_cache import byte_range, generation_validator_async
+from app.core.pagination import decode_cursor
+from app.core.replay_store import replay_store
+from app.core.report_index import index_path_for, index_report_stream
+from app.core.zip_stream import ZipMember, ZipStream
 from app.models.user import User
-from app.crud import crud_submission
-from app.schemas.submission import SubmissionCreate, SubmissionLeaderboard
+from app.crud import (
+    crud_cache_generation,
+    crud_hall_of_fame,
+    crud_hall_of_fame_async,
+    crud_replay,
+    crud_replay_async,
+    crud_submission,
+)
+from app.db.writer import DatabaseWriter
+from app.models.replay import SubmissionReplay
+from app.schemas.submission import SubmissionCreate, SubmissionLeaderboard
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-STORAGE_PATH = Path("storage")
-REPORTS_PATH = STORAGE_PATH / "reports"
-REPO_ROOT = Path(__file__).resolve().parents[3]
+STORAGE_PATH = Path("storage")
+REPORTS_PATH = STORAGE_PATH / "reports"
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+# Uploads are copied this many bytes at a time, so memory per request stays flat.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 REPORTS_PATH.mkdir(parents=True, exist_ok=True)
 
@@ -36,114 +60,169 @@ async def submit_hall_of_fame_entry(
     hmac_signature: str = Form(...),
     report_file: UploadFile = File(...),
     replay_files: List[UploadFile] = File([]),
-    db: Session = Depends(deps.get_db),
+    writer: DatabaseWriter = Depends(deps.get_db_writer),
     current_user: User = Depends(deps.get_current_user),
 ):
-    report_content = await report_file.read()
-    await report_file.close()
+    """
+    Store a signed report and its replays.
+
+    Every part is copied to disk in ``UPLOAD_CHUNK_SIZE`` chunks on a worker thread,
+    and the report's HMAC is computed while it streams, so neither a large report
+    nor a large replay set is ever held in memory or blocks the event loop.
+
+    The report is compressed as it streams (``REPORT_COMPRESSION``), so it is
+    stored, indexed and served in its compressed form.
+
+    Replays go to the content-addressed ``replay_store``: a replay that is already
+    stored (from this or any earlier submission) is not written again, only
+    referenced from this submission's manifest.
+    """
+    submission_id = str(uuid.uuid4())
+    user_submission_dir = REPORTS_PATH / str(current_user.id) / submission_id
+    report_path = report_storage.stored_name(
+        user_submission_dir / f"{submission_id}.json", report_storage.storage_encoding()
+    )
+    await asyncio.to_thread(user_submission_dir.mkdir, parents=True, exist_ok=True)
+
+    stored: Optional[Future] = None
+    try:
+        submission_in, replays = await _store_upload(
+            report_path, report_summary, hmac_signature, report_file, replay_files, current_user
+        )
+        stored = writer.submit(_store_submission, submission_in, current_user.id, submission_id, replays)
+        await asyncio.wrap_future(stored)
+    except BaseException:
+        # A write that already started may still commit, and then needs its files.
+        if stored is None or stored.cancel() or (stored.done() and stored.exception() is not None):
+            await asyncio.to_thread(shutil.rmtree, user_submission_dir, True)
+        raise
 
-    if not security.verify_hmac_signature(report_content, hmac_signature):
+    return {"message": "Submission successful", "submission_id": submission_id}
+
+
+async def _store_upload(
+    report_path: Path,
+    report_summary: str,
+    hmac_signature: str,
+    report_file: UploadFile,
+    replay_files: List[UploadFile],
+    current_user: User,
+) -> tuple[SubmissionCreate, dict[str, tuple[str, int, int]]]:
+    partial_path = report_path.with_name(report_path.name + ".part")
+    signer = security.hmac_signer()
+    try:
+        await asyncio.to_thread(
+            _stream_to_file,
+            report_file.file,
+            partial_path,
+            signer,
+            report_storage.encoding_of(report_path),
+        )
+    finally:
+        await report_file.close()
+
+    if not security.verify_hmac_digest(signer, hmac_signature):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid HMAC signature. Data may be tampered.",
         )
 
-    try:
-        summary_data = json.loads(report_summary)
-    except (json.JSONDecodeError, TypeError):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid report_summary format.",
-        )
-
-    submission_id = str(uuid.uuid4())
-    user_submission_dir = REPORTS_PATH / str(current_user.id) / submission_id
-    user_submission_dir.mkdir(parents=True, exist_ok=True)
-
-    report_filename = f"{submission_id}.json"
-    report_path = user_submission_dir / report_filename
-    with open(report_path, "wb") as buffer:
-        buffer.write(report_content)
-
-    decoded_report = _load_report_json(report_content)
-
-    username_from_report = decoded_report.get("metadata", {}).get(
-        "user_identifier", current_user.username
-    )
-    scan_timestamp = _parse_timestamp(
-        decoded_report.get("metadata", {}).get("analysis_timestamp")
-    )
-    summary_section = decoded_report.get("summary_stats") or decoded_report.get("summary", {})
-
-    lost_count = int(
-        summary_section.get(
-            "lost_scores_found",
-            summary_section.get("lost_count", summary_data.get("lost_scores_count", 0)),
-        )
-    )
-    current_pp = float(summary_section.get("current_pp", summary_data.get("current_pp", 0.0)))
-    potential_pp = float(
-        summary_section.get("potential_pp", summary_data.get("potential_pp", current_pp))
-    )
-    delta_pp = float(
-        summary_section.get(
-            "delta_pp",
-            summary_data.get("total_pp_gain", potential_pp - current_pp),
-        )
-    )
-
-    for replay_file in replay_files:
-        safe_replay_name = secure_filename(replay_file.filename or "replay.osr")
-        replay_path = user_submission_dir / safe_replay_name
-        try:
-            with open(replay_path, "wb") as buffer:
-                shutil.copyfileobj(replay_file.file, buffer)
+    try:
+        summary_data = json.loads(report_summary)
+    except (json.JSONDecodeError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid report_summary format.",
+        )
+
+    await asyncio.to_thread(os.replace, partial_path, report_path)
+    metadata, summary_section = await asyncio.to_thread(_index_report, report_path)
+
+    username_from_report = metadata.get("user_identifier", current_user.username)
+    scan_timestamp = _parse_timestamp(metadata.get("analysis_timestamp"))
+
+    lost_count = int(
+        summary_section.get(
+            "lost_scores_found",
+            summary_section.get("lost_count", summary_data.get("lost_scores_count", 0)),
+        )
+    )
+    current_pp = float(summary_section.get("current_pp", summary_data.get("current_pp", 0.0)))
+    potential_pp = float(
+        summary_section.get("potential_pp", summary_data.get("potential_pp", current_pp))
+    )
+    delta_pp = float(
+        summary_section.get(
+            "delta_pp",
+            summary_data.get("total_pp_gain", potential_pp - current_pp),
+        )
+    )
+
+    replays: dict[str, tuple[str, int, int]] = {}
+    for replay_file in replay_files:
+        safe_replay_name = secure_filename(replay_file.filename or "replay.osr")
+        try:
+            replays[safe_replay_name] = await asyncio.to_thread(replay_store.put, replay_file.file)
         finally:
             await replay_file.close()
 
-    try:
-        thin_json_path = str(report_path.relative_to(REPO_ROOT))
-    except ValueError:
-        thin_json_path = str(report_path)
-
-    submission_in = SubmissionCreate(
-        username=username_from_report,
-        scan_timestamp=scan_timestamp,
-        lost_count=lost_count,
-        current_pp=current_pp,
-        potential_pp=potential_pp,
-        delta_pp=delta_pp,
-        thin_json_path=thin_json_path,
-    )
-    crud_submission.create_submission(db, submission=submission_in, user_id=current_user.id)
-
-    return {"message": "Submission successful", "submission_id": submission_id}
-
-
-@router.get("/", response_model=List[SubmissionLeaderboard])
-async def get_hall_of_fame_leaderboard(db: Session = Depends(deps.get_db)):
-    submissions = crud_submission.get_top_delta_submissions(db, limit=100)
-
-    leaderboard = []
-    for rank, sub in enumerate(submissions, 1):
-        leaderboard.append(
-            {
-                "rank": rank,
-                "username": sub.user.username,
-                "osu_user_id": sub.user.osu_user_id,
-                "total_pp_gain": sub.delta_pp,
-                "lost_scores_count": sub.lost_count,
-                "submission_date": sub.scan_timestamp,
-            }
-        )
-
-    return leaderboard
+    try:
+        thin_json_path = str(report_path.relative_to(REPO_ROOT))
+    except ValueError:
+        thin_json_path = str(report_path)
+
+    submission_in = SubmissionCreate(
+        username=username_from_report,
+        scan_timestamp=scan_timestamp,
+        lost_count=lost_count,
+        current_pp=current_pp,
+        potential_pp=potential_pp,
+        delta_pp=delta_pp,
+        thin_json_path=thin_json_path,
+    )
+    return submission_in, replays
+
+
+@router.get("/", response_model=List[SubmissionLeaderboard])
+async def get_hall_of_fame_leaderboard(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(deps.get_async_read_db),
+):
+    """Leaderboard page; follow the ``X-Next-Cursor``/``X-Prev-Cursor`` headers for more."""
+    validator = await generation_validator_async(db, crud_cache_generation.SUBMISSIONS)
+    if validator.matches(request):
+        return validator.not_modified()
+    response.headers.update(validator.headers())
+
+    page = await crud_hall_of_fame_async.get_leaderboard_page(
+        db,
+        limit=limit,
+        cursor=decode_cursor(cursor, crud_hall_of_fame.LEADERBOARD_SORT) if cursor else None,
+    )
+    page.set_headers(response)
+    entries = page.items
+
+    return [
+        {
+            "rank": entry.rank,
+            "username": entry.username,
+            "osu_user_id": entry.osu_user_id,
+            "total_pp_gain": entry.delta_pp,
+            "lost_scores_count": entry.lost_count,
+            "submission_date": entry.scan_timestamp,
+        }
+        for entry in entries
+    ]
 
 
 @router.get("/replays/{submission_id}/{replay_filename}")
 async def download_replay(
     submission_id: str,
     replay_filename: str,
+    db: AsyncSession = Depends(deps.get_async_read_db),
     current_user: User = Depends(deps.get_current_user),
 ):
     if ".." in replay_filename or "/" in replay_filename or "\\" in replay_filename:
@@ -151,43 +230,184 @@ async def download_replay(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid filename."
         )
 
-    # Validate access permissions for the submission
-    replay_path = REPORTS_PATH / str(current_user.id) / submission_id / replay_filename
+    # The manifest is scoped to the owner, which is also the access check.
+    entry = await crud_replay_async.get_submission_replay(
+        db, current_user.id, submission_id, replay_filename
+    )
+    if entry is not None:
+        replay_path = replay_store.blob_path(entry.sha256)
+    else:
+        # Submissions from before the replay store kept copies next to the report.
+        replay_path = REPORTS_PATH / str(current_user.id) / submission_id / replay_filename
 
     if not replay_path.is_file():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Replay not found."
         )
 
-    return FileResponse(
-        path=replay_path,
-        media_type="application/octet-stream",
-        filename=replay_filename,
-    )
-
-
-def _load_report_json(content: bytes) -> dict:
-    try:
-        return json.loads(content.decode("utf-8"))
-    except UnicodeDecodeError:
-        return json.loads(content)
-    except json.JSONDecodeError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid report file: {exc}",
-        ) from exc
-
-
-def _parse_timestamp(raw_timestamp: Optional[str]) -> datetime:
-    if not raw_timestamp:
-        return datetime.utcnow()
-    for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y %H-%M-%S"):
-        try:
-            return datetime.strptime(raw_timestamp, fmt)
-        except ValueError:
-            continue
-    try:
-        return datetime.fromisoformat(raw_timestamp)
-    except ValueError:
-        logger.warning("Could not parse timestamp '%s', falling back to current time", raw_timestamp)
-        return datetime.utcnow()
+    return FileResponse(
+        path=replay_path,
+        media_type="application/octet-stream",
+        filename=replay_filename,
+    )
+
+
+@router.get("/exports/{submission_id}.zip")
+async def export_submission(
+    submission_id: str,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Every replay of a submission, plus its report, as one ZIP.
+
+    The archive is generated while it is sent, with no temp file and one chunk in
+    memory at a time, and honours ``Range``/``If-Range`` so large exports can resume.
+    """
+    if ".." in submission_id or "\\" in submission_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid submission id."
+        )
+
+    replays = await crud_replay_async.get_submission_replays(db, current_user.id, submission_id)
+    submission_dir = REPORTS_PATH / str(current_user.id) / submission_id
+    try:
+        archive = await asyncio.to_thread(_build_export, submission_dir, submission_id, replays)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Submission is too large to export as one archive.",
+        )
+    if archive is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found."
+        )
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": archive.etag,
+        "Content-Disposition": f'attachment; filename="{submission_id}.zip"',
+    }
+    requested = byte_range(request, archive.size, archive.etag)
+    if requested is None:
+        headers["Content-Length"] = str(archive.size)
+        return StreamingResponse(archive.iter_bytes(), media_type="application/zip", headers=headers)
+
+    start, stop = requested
+    headers["Content-Length"] = str(stop - start)
+    headers["Content-Range"] = f"bytes {start}-{stop - 1}/{archive.size}"
+    return StreamingResponse(
+        archive.iter_bytes(start, stop),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type="application/zip",
+        headers=headers,
+    )
+
+
+def _build_export(
+    submission_dir: Path, submission_id: str, replays: list[tuple[SubmissionReplay, Optional[int]]]
+) -> Optional[ZipStream]:
+    """Lay out the export archive; None when the submission has nothing to export."""
+    members: list[ZipMember] = []
+    modified = datetime(1980, 1, 1)
+    skipped = set()
+
+    for encoding in (None, *report_storage.SUFFIXES):
+        report_path = report_storage.stored_name(submission_dir / f"{submission_id}.json", encoding)
+        skipped.update((report_path.name, index_path_for(report_path).name))
+        if report_path.is_file():
+            stat = report_path.stat()
+            modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+            members.append(
+                ZipMember(report_path.name, report_path, stat.st_size, f"{stat.st_size}-{stat.st_mtime_ns}")
+            )
+
+    for replay, crc32 in replays:
+        blob_path = replay_store.blob_path(replay.sha256)
+        try:
+            size = blob_path.stat().st_size
+        except FileNotFoundError:
+            logger.warning("Replay blob %s for %s is missing", replay.sha256, replay.filename)
+            continue
+        members.append(ZipMember(replay.filename, blob_path, size, replay.sha256, crc32))
+        skipped.add(replay.filename)
+
+    # Submissions from before the replay store kept replays next to the report.
+    if submission_dir.is_dir():
+        for path in sorted(submission_dir.iterdir()):
+            if path.name in skipped or path.suffix in (".part", ".tmp") or not path.is_file():
+                continue
+            stat = path.stat()
+            members.append(ZipMember(path.name, path, stat.st_size, f"{stat.st_size}-{stat.st_mtime_ns}"))
+
+    return ZipStream(members, modified) if members else None
+
+
+def _stream_to_file(
+    source: BinaryIO,
+    destination: Path,
+    signer: Optional[hmac.HMAC] = None,
+    encoding: Optional[str] = None,
+) -> int:
+    """
+    Copy ``source`` to ``destination`` chunk by chunk, feeding ``signer`` on the way.
+
+    The signature covers the bytes as uploaded; ``encoding`` only affects how they
+    are written.
+    """
+    size = 0
+    with report_storage.open_writer(destination, encoding) as buffer:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            if signer is not None:
+                signer.update(chunk)
+            buffer.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def _index_report(report_path: Path) -> tuple[dict, dict]:
+    """
+    Build the page index for a stored report; returns its metadata and summary.
+
+    The report is parsed as a stream, one lost score at a time, so indexing it
+    doesn't need the whole report in memory either.
+    """
+    try:
+        with report_storage.open_report(report_path) as fp:
+            metadata, summary = index_report_stream(report_path, fp)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid report file: {exc}",
+        ) from exc
+    return metadata or {}, summary or {}
+
+
+def _store_submission(
+    db: Session,
+    submission_in: SubmissionCreate,
+    user_id: int,
+    submission_key: str,
+    replays: dict[str, tuple[str, int, int]],
+) -> int:
+    submission = crud_submission.create_submission(db, submission=submission_in, user_id=user_id)
+    crud_replay.add_submission_replays(db, user_id, submission_key, replays)
+    crud_hall_of_fame.record_submission(db, submission, db.get(User, user_id))
+    crud_cache_generation.bump_generation(db, crud_cache_generation.SUBMISSIONS)
+    return submission.id
+
+
+def _parse_timestamp(raw_timestamp: Optional[str]) -> datetime:
+    if not raw_timestamp:
+        return datetime.utcnow()
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y %H-%M-%S"):
+        try:
+            return datetime.strptime(raw_timestamp, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(raw_timestamp)
+    except ValueError:
+        logger.warning("Could not parse timestamp '%s', falling back to current time", raw_timestamp)
+        return datetime.utcnow()
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 import logging
 
 from app.api import deps
 from app.models.user import User
-from app.crud import crud_token
+from app.crud import crud_token_async
 from app.core.osu_api_client import OsuAPIClient
+from app.db.writer import DatabaseWriter
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,14 +17,16 @@ logger = logging.getLogger(__name__)
 async def proxy_get_request(
     full_path: str,
     request: Request,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_read_db),
     current_user: User = Depends(deps.get_current_user),
+    client: httpx.AsyncClient = Depends(deps.get_async_client),
+    writer: DatabaseWriter = Depends(deps.get_db_writer),
 ):
-    user_token = crud_token.get_token_by_owner_id(db, owner_id=int(current_user.id))
+    user_token = await crud_token_async.get_token_by_owner_id(db, owner_id=int(current_user.id))
     if not user_token:
         raise HTTPException(status_code=401, detail="User has no valid osu! token")
 
-    api_client = OsuAPIClient(db_session=db, user_token=user_token)
+    api_client = OsuAPIClient(user_token=user_token, http_client=client, writer=writer)
 
     api_endpoint = f"/api/v2/{full_path}"
 
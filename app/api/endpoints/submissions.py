@@ -1,16 +1,32 @@
+import asyncio
 import json
 import logging
 from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.api.deps import get_db
+from app.api.deps import get_async_read_db
+from app.core import report_storage
 from app.core.osu_api_client import get_public_user_data
-from app.crud import crud_submission, crud_beatmap
+from app.core.report_cache import report_cache, report_cache_key
+from app.core.user_stats_cache import user_stats_cache
+from app.core.report_index import ReportPage, read_report_page, split_report, write_report_index
+from app.core.config import settings
+from app.core.http_cache import content_validator, generation_validator_async
+from app.core.pagination import decode_cursor
+from app.crud import (
+    crud_beatmap_async,
+    crud_cache_generation,
+    crud_submission,
+    crud_submission_async,
+    crud_user_stats_async,
+)
 from app.models.submission import Submission as SubmissionModel
+from app.models.user_stats import UserStats
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -26,6 +42,13 @@ class SubmissionSummary(BaseModel):
     total_pp_gain: float
     current_pp: float
     potential_pp: float
+    live_pp: Optional[float] = None
+    live_global_rank: Optional[int] = None
+
+
+class UsernameMatch(BaseModel):
+    username: str
+    scan_date: str
 
 
 class LostScore(BaseModel):
@@ -47,8 +70,8 @@ class LostScore(BaseModel):
 
 class CurrentUserStats(BaseModel):
     current_pp: float
-    current_global_rank: int
-    current_country_rank: int
+    current_global_rank: Optional[int] = None
+    current_country_rank: Optional[int] = None
     username: str
     avatar_url: str
     country_code: str
@@ -63,23 +86,130 @@ class SubmissionDetail(BaseModel):
 
 
 @router.get("/list", response_model=list[SubmissionSummary])
-async def list_submissions(limit: int = 100, db: Session = Depends(get_db)):
-    db_submissions = crud_submission.get_recent_submissions(db, limit=limit)
+async def list_submissions(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1),
+    sort: str = Query(crud_submission.SORT_RECENT, pattern="^(recent|delta)$"),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Submissions newest first (``sort=recent``) or by pp gain (``sort=delta``).
+
+    Pages are keyset-paginated: pass the opaque ``X-Next-Cursor`` or
+    ``X-Prev-Cursor`` response header back as ``cursor``.
+    """
+    validator = await generation_validator_async(db, crud_cache_generation.SUBMISSIONS)
+    if validator.matches(request):
+        return validator.not_modified()
+    response.headers.update(validator.headers())
+
+    page = await crud_submission_async.get_submissions_page(
+        db, sort=sort, limit=limit, cursor=decode_cursor(cursor, sort) if cursor else None
+    )
+    page.set_headers(response)
+    db_submissions = page.items
+    stored_stats = await crud_user_stats_async.get_user_stats(
+        db,
+        (sub.user.osu_user_id for sub in db_submissions if sub.user),
+        settings.USER_STATS_MAX_AGE_SECONDS,
+    )
+
+    return [
+        _summary_from_db(sub, stored_stats.get(sub.user.osu_user_id) if sub.user else None)
+        for sub in db_submissions
+    ]
+
 
-    return [_summary_from_db(sub) for sub in db_submissions]
+@router.get("/search/usernames", response_model=list[UsernameMatch])
+async def search_usernames(
+    request: Request,
+    response: Response,
+    prefix: str = Query(..., min_length=1, max_length=32),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Username autocomplete: case-insensitive prefix match over submitters."""
+    validator = await generation_validator_async(db, crud_cache_generation.SUBMISSIONS)
+    if validator.matches(request):
+        return validator.not_modified()
+    response.headers.update(validator.headers())
+
+    return [
+        UsernameMatch(username=username, scan_date=scan_timestamp.isoformat())
+        for username, scan_timestamp in await crud_submission_async.search_usernames(db, prefix, limit=limit)
+    ]
+
+
+@router.get("/cache/metrics")
+async def get_report_cache_metrics():
+    return {
+        "reports": report_cache.metrics(),
+        "user_stats": user_stats_cache.metrics(),
+    }
 
 
 @router.get("/{username}", response_model=SubmissionDetail)
-async def get_submission(username: str, offset: int = 0, limit: int = 50, db: Session = Depends(get_db)):
-    db_submission = crud_submission.get_latest_submission_by_username(db, username)
+async def get_submission(
+    username: str,
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    db_submission = await crud_submission_async.get_latest_submission_by_username(db, username)
 
     if not db_submission:
         raise HTTPException(status_code=404, detail="Submission not found")
 
-    return await _detail_from_db(db_submission, db, offset=offset, limit=limit)
+    detail = await _detail_from_db(db_submission, db, offset=offset, limit=limit)
+
+    # Live user stats change independently of submissions, so the detail page is
+    # validated by a hash of its body rather than by the submissions generation.
+    body = detail.model_dump_json().encode("utf-8")
+    validator = content_validator(body)
+    if validator.matches(request):
+        return validator.not_modified()
+    return Response(content=body, media_type="application/json", headers=validator.headers())
+
+
+@router.get("/{username}/report")
+async def get_submission_report(
+    username: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    The latest submission's full report as stored.
+
+    Compressed reports are sent as is with ``Content-Encoding`` when the client
+    accepts that encoding, so serving them costs neither decompression nor
+    re-serialization; other clients get them decoded on the fly.
+    """
+    db_submission = await crud_submission_async.get_latest_submission_by_username(db, username)
+    if not db_submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    json_path = _resolve_path(db_submission.thin_json_path)
+    if not await asyncio.to_thread(json_path.is_file):
+        raise HTTPException(status_code=404, detail="Submission data not found")
+
+    encoding = report_storage.encoding_of(json_path)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is None:
+        return FileResponse(json_path, media_type="application/json", headers=headers)
+    if report_storage.accepts_encoding(request.headers.get("accept-encoding"), encoding):
+        headers["Content-Encoding"] = encoding
+        return FileResponse(json_path, media_type="application/json", headers=headers)
+    return StreamingResponse(
+        report_storage.iter_report(json_path), media_type="application/json", headers=headers
+    )
 
 
-def _summary_from_db(submission: SubmissionModel) -> SubmissionSummary:
+def _summary_from_db(
+    submission: SubmissionModel, stats: Optional[UserStats] = None
+) -> SubmissionSummary:
     osu_user_id = submission.user.osu_user_id if submission.user else submission.user_id
     return SubmissionSummary(
         username=submission.username,
@@ -89,12 +219,14 @@ def _summary_from_db(submission: SubmissionModel) -> SubmissionSummary:
         total_pp_gain=submission.delta_pp,
         current_pp=submission.current_pp,
         potential_pp=submission.potential_pp,
+        live_pp=stats.pp if stats else None,
+        live_global_rank=stats.global_rank if stats else None,
     )
 
 
 async def _detail_from_db(
     submission: SubmissionModel,
-    db: Session,
+    db: AsyncSession,
     offset: int,
     limit: int,
 ) -> SubmissionDetail:
@@ -104,14 +236,14 @@ async def _detail_from_db(
         logger.warning("Submission file not found at %s", json_path)
         raise HTTPException(status_code=404, detail="Submission data not found")
 
-    metadata, summary, raw_scores = _load_submission_file(json_path)
-    total_count = len(raw_scores)
-    paginated_scores = raw_scores[offset: offset + limit]
+    page = await _load_submission_page(json_path, offset, limit)
+    metadata, summary, total_count = page.metadata, page.summary, page.total_count
+    paginated_scores = page.scores
 
     beatmap_lookup = {}
     beatmap_ids = [score.get("beatmap_id") for score in paginated_scores if score.get("beatmap_id")]
     if beatmap_ids:
-        beatmap_lookup = crud_beatmap.get_beatmaps_by_ids(db, beatmap_ids)
+        beatmap_lookup = await crud_beatmap_async.get_beatmaps_by_ids(db, beatmap_ids)
 
     lost_scores: list[LostScore] = []
     for score in paginated_scores:
@@ -140,12 +272,12 @@ async def _detail_from_db(
         )
 
     summary_stats = _merge_summary(summary, submission)
-    metadata = metadata or {}
+    metadata = dict(metadata or {})
     metadata.setdefault("username", submission.username)
     metadata.setdefault("user_id", submission.user.osu_user_id if submission.user else submission.user_id)
     metadata.setdefault("analysis_timestamp", submission.scan_timestamp.isoformat())
 
-    current_user_stats = await _fetch_user_stats(submission)
+    current_user_stats = await _fetch_user_stats(submission, db)
 
     return SubmissionDetail(
         metadata=metadata,
@@ -156,7 +288,6 @@ async def _detail_from_db(
     )
 
 
-
 def _resolve_path(path_str: str) -> Path:
     path = Path(path_str)
     if not path.is_absolute():
@@ -164,19 +295,40 @@ def _resolve_path(path_str: str) -> Path:
     return path
 
 
-def _load_submission_file(path: Path) -> tuple[dict, dict, list[dict]]:
-    with open(path, "r", encoding="utf-8") as fp:
-        data = json.load(fp)
+async def _load_submission_page(path: Path, offset: int, limit: int) -> ReportPage:
+    return await asyncio.to_thread(_cached_submission_page, path, offset, limit)
 
-    metadata = data.get("metadata", {})
-    summary = data.get("summary_stats") or data.get("summary", {})
 
-    if "score_lists" in data:
-        lost_scores = data["score_lists"].get("lost_scores", [])
-    else:
-        lost_scores = data.get("lost_scores", [])
+def _cached_submission_page(path: Path, offset: int, limit: int) -> ReportPage:
+    # Cached pages are shared between requests and must not be mutated. The key
+    # stats the report, so even a hit runs off the event loop.
+    key = report_cache_key(path, (offset, limit))
+    page = report_cache.get(key)
+    if page is None:
+        page = _read_submission_page(path, offset, limit)
+        report_cache.put(key, page)
+    return page
 
-    return metadata, summary, lost_scores
+
+def _read_submission_page(path: Path, offset: int, limit: int) -> ReportPage:
+    page = read_report_page(path, offset, limit)
+    if page is not None:
+        return page
+
+    # No usable sidecar (report predates it or was replaced): parse once and
+    # build it so later pages are served from the index.
+    with report_storage.open_report(path) as fp:
+        data = json.load(fp)
+    try:
+        write_report_index(path, data)
+    except OSError as exc:
+        logger.warning("Could not write report index for %s: %s", path, exc)
+
+    metadata, summary, raw_scores = split_report(data)
+    # Same bounds as read_report_page, so a page doesn't depend on the sidecar.
+    first = max(offset, 0)
+    scores = raw_scores[first: first + max(limit, 0)]
+    return ReportPage(metadata, summary, len(raw_scores), scores)
 
 
 def _merge_summary(summary: dict, submission: SubmissionModel) -> dict:
@@ -190,9 +342,33 @@ def _merge_summary(summary: dict, submission: SubmissionModel) -> dict:
     return summary_stats
 
 
-async def _fetch_user_stats(submission: SubmissionModel) -> Optional[CurrentUserStats]:
+async def _fetch_user_stats(submission: SubmissionModel, db: AsyncSession) -> Optional[CurrentUserStats]:
+    if submission.user:
+        # Kept current by the background refresher; no upstream call needed.
+        stored = (
+            await crud_user_stats_async.get_user_stats(
+                db, [submission.user.osu_user_id], settings.USER_STATS_MAX_AGE_SECONDS
+            )
+        ).get(submission.user.osu_user_id)
+        if stored is not None:
+            return CurrentUserStats(
+                current_pp=stored.pp,
+                current_global_rank=stored.global_rank,
+                current_country_rank=stored.country_rank,
+                username=stored.username,
+                avatar_url=stored.avatar_url or "",
+                country_code=stored.country_code or "",
+            )
+
+    user_identifier = submission.user.osu_user_id if submission.user else submission.username
+    cache_key = user_identifier if isinstance(user_identifier, int) else user_identifier.lower()
+    return await user_stats_cache.get(
+        cache_key, lambda: _load_user_stats(user_identifier, submission.username)
+    )
+
+
+async def _load_user_stats(user_identifier: str | int, username: str) -> Optional[CurrentUserStats]:
     try:
-        user_identifier = submission.user.osu_user_id if submission.user else submission.username
         user_data = await get_public_user_data(user_identifier, mode="osu")
         return CurrentUserStats(
             current_pp=user_data["statistics"]["pp"],
@@ -203,5 +379,5 @@ async def _fetch_user_stats(submission: SubmissionModel) -> Optional[CurrentUser
             country_code=user_data["country_code"],
         )
     except Exception as exc:
-        logger.error("Failed to fetch live user data for %s: %s", submission.username, exc)
+        logger.error("Failed to fetch live user data for %s: %s", username, exc)
         return None
@@ -0,0 +1,206 @@
+import sys
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+_PENDING_KEY = "beatmap_cache_pending"
+
+
+class CachedBeatmap:
+    """Read-only beatmap record; attribute-compatible with the Beatmap model."""
+
+    __slots__ = (
+        "beatmap_id",
+        "beatmapset_id",
+        "ranked_status",
+        "md5_hash",
+        "artist",
+        "title",
+        "creator",
+        "version",
+        "hit_objects",
+        "max_combo",
+        "expires_at",
+    )
+
+    FIELDS = __slots__[:-1]
+
+    def __init__(
+        self,
+        beatmap_id: int,
+        beatmapset_id: Optional[int],
+        ranked_status: Optional[str],
+        md5_hash: str,
+        artist: Optional[str],
+        title: Optional[str],
+        creator: Optional[str],
+        version: Optional[str],
+        hit_objects: Optional[int],
+        max_combo: Optional[int],
+        expires_at: float = 0.0,
+    ) -> None:
+        self.beatmap_id = beatmap_id
+        self.beatmapset_id = beatmapset_id
+        self.ranked_status = ranked_status
+        self.md5_hash = md5_hash
+        self.artist = artist
+        self.title = title
+        self.creator = creator
+        self.version = version
+        self.hit_objects = hit_objects
+        self.max_combo = max_combo
+        self.expires_at = expires_at
+
+    def footprint(self) -> int:
+        """Approximate bytes held by this record and the strings it references."""
+        size = sys.getsizeof(self)
+        for field in self.FIELDS:
+            size += sys.getsizeof(getattr(self, field))
+        return size
+
+
+class BeatmapCache:
+    """
+    Size-bounded LRU with TTL, keyed by MD5 with a secondary beatmap_id index.
+
+    Entries are ``CachedBeatmap`` records rather than ORM instances, so they carry
+    no session state and cost a fraction of the memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.BEATMAP_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.BEATMAP_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._by_md5: OrderedDict[str, CachedBeatmap] = OrderedDict()
+        self._md5_by_id: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get_many_by_md5(self, md5_hashes: Iterable[str]) -> dict[str, CachedBeatmap]:
+        with self._lock:
+            return {
+                md5: record
+                for md5 in md5_hashes
+                if (record := self._get_locked(md5)) is not None
+            }
+
+    def get_many_by_id(self, beatmap_ids: Iterable[int]) -> dict[int, CachedBeatmap]:
+        with self._lock:
+            found: dict[int, CachedBeatmap] = {}
+            for beatmap_id in beatmap_ids:
+                md5 = self._md5_by_id.get(beatmap_id)
+                record = self._get_locked(md5) if md5 is not None else None
+                if md5 is None:
+                    self._misses += 1
+                if record is not None:
+                    found[beatmap_id] = record
+            return found
+
+    def put(self, record: CachedBeatmap) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._remove_locked(record.md5_hash)
+            stale_md5 = self._md5_by_id.get(record.beatmap_id)
+            if stale_md5 is not None:
+                self._remove_locked(stale_md5)
+
+            record.expires_at = monotonic() + self.ttl_seconds
+            self._by_md5[record.md5_hash] = record
+            self._md5_by_id[record.beatmap_id] = record.md5_hash
+            self._bytes += record.footprint()
+
+            while len(self._by_md5) > self.max_entries:
+                oldest_md5 = next(iter(self._by_md5))
+                self._remove_locked(oldest_md5)
+                self._evictions += 1
+
+    def invalidate(self, md5_hash: Optional[str] = None, beatmap_id: Optional[int] = None) -> None:
+        with self._lock:
+            if md5_hash is not None:
+                self._remove_locked(md5_hash)
+            if beatmap_id is not None:
+                md5 = self._md5_by_id.get(beatmap_id)
+                if md5 is not None:
+                    self._remove_locked(md5)
+
+    def stage_invalidation(
+        self, db: Session, md5_hash: Optional[str] = None, beatmap_id: Optional[int] = None
+    ) -> None:
+        """
+        Invalidate once ``db`` commits.
+
+        Dropping the entry earlier would let a read that runs before the commit
+        cache the old row again for a whole TTL.
+        """
+        db.info.setdefault(_PENDING_KEY, []).append((md5_hash, beatmap_id))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_md5.clear()
+            self._md5_by_id.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._by_md5),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "approx_bytes": self._bytes,
+            }
+
+    def _get_locked(self, md5: str) -> Optional[CachedBeatmap]:
+        record = self._by_md5.get(md5)
+        if record is None:
+            self._misses += 1
+            return None
+        if record.expires_at <= monotonic():
+            self._remove_locked(md5)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._by_md5.move_to_end(md5)
+        self._hits += 1
+        return record
+
+    def _remove_locked(self, md5: str) -> None:
+        record = self._by_md5.pop(md5, None)
+        if record is None:
+            return
+        if self._md5_by_id.get(record.beatmap_id) == md5:
+            del self._md5_by_id[record.beatmap_id]
+        self._bytes -= record.footprint()
+
+
+beatmap_cache = BeatmapCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_invalidations(session: Session) -> None:
+    for md5_hash, beatmap_id in session.info.pop(_PENDING_KEY, ()):
+        beatmap_cache.invalidate(md5_hash=md5_hash, beatmap_id=beatmap_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.beatmap_cache import CachedBeatmap
+from app.core.config import settings
+from app.core.osu_api_client import lookup_beatmap_by_md5
+from app.crud.crud_beatmap import insert_invalid_md5s, upsert_beatmaps
+
+logger = logging.getLogger(__name__)
+
+BeatmapFetcher = Callable[[str], Awaitable[Optional[dict]]]
+
+
+class BeatmapEnrichmentEngine:
+    """
+    Resolves beatmap MD5s against the osu! API with a fixed number of workers.
+
+    Hashes are pushed onto a bounded queue, so a huge request applies backpressure
+    instead of spawning one coroutine per hash. Every hash that is queued or being
+    fetched has an entry in a process-wide in-flight map; concurrent callers asking
+    for the same hash await that entry instead of issuing a second upstream lookup.
+    """
+
+    def __init__(
+        self,
+        fetcher: BeatmapFetcher,
+        workers: int = settings.ENRICH_WORKERS,
+        queue_size: int = settings.ENRICH_QUEUE_SIZE,
+    ) -> None:
+        self.fetcher = fetcher
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._worker_tasks: set[asyncio.Task] = set()
+        self._requested = 0
+        self._coalesced = 0
+        self._lookups = 0
+        self._failures = 0
+
+    async def resolve(self, md5_hashes: list[str]) -> dict[str, Optional[dict]]:
+        """
+        Fetch every hash and return ``{md5: payload}``.
+
+        A ``None`` payload means osu! answered 404. Hashes whose lookup failed for any
+        other reason are left out so callers don't cache transient errors.
+        """
+        futures = await self.submit(md5_hashes)
+
+        results: dict[str, Optional[dict]] = {}
+        for md5, future in futures.items():
+            try:
+                results[md5] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The lookup was abandoned by the caller that queued it; transient.
+                logger.warning(f"Lookup for MD5 {md5} was cancelled")
+            except Exception as exc:
+                logger.error(f"Failed to fetch beatmap for MD5 {md5}: {exc}")
+        return results
+
+    async def submit(self, md5_hashes: list[str]) -> dict[str, asyncio.Future]:
+        """Queue every hash and return its (possibly shared) future without waiting."""
+        self._bind_loop()
+
+        futures: dict[str, asyncio.Future] = {}
+        for md5 in dict.fromkeys(md5_hashes):
+            futures[md5] = await self._submit(md5)
+        return futures
+
+    def submit_nowait(self, md5_hashes: list[str]) -> dict[str, asyncio.Future]:
+        """
+        Queue only the hashes that fit right now and return their futures.
+
+        Hashes already in flight are always returned; new ones are left out once
+        the queue is full, so the caller never waits on backpressure.
+        """
+        self._bind_loop()
+
+        futures: dict[str, asyncio.Future] = {}
+        for md5 in dict.fromkeys(md5_hashes):
+            future = self._in_flight.get(md5)
+            if future is None and self._queue.full():
+                continue
+            self._requested += 1
+            if future is not None:
+                self._coalesced += 1
+            else:
+                future = self._track(md5)
+                self._queue.put_nowait(md5)
+                self._spawn_worker()
+            futures[md5] = future
+        return futures
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.queue_size,
+            "in_flight": len(self._in_flight),
+            "active_workers": len(self._worker_tasks),
+            "max_workers": self.workers,
+            "requested": self._requested,
+            "coalesced_hits": self._coalesced,
+            "upstream_lookups": self._lookups,
+            "upstream_failures": self._failures,
+        }
+
+    async def shutdown(self) -> None:
+        for task in list(self._worker_tasks):
+            task.cancel()
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+
+        for future in self._in_flight.values():
+            if not future.done():
+                future.cancel()
+        self._in_flight.clear()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+    def _bind_loop(self) -> None:
+        # Queue, futures and workers belong to one event loop; start fresh if the
+        # engine is used from a new one (e.g. a TestClient without lifespan).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._in_flight = {}
+            self._worker_tasks = set()
+
+    async def _submit(self, md5: str) -> asyncio.Future:
+        self._requested += 1
+
+        future = self._in_flight.get(md5)
+        if future is not None:
+            self._coalesced += 1
+            return future
+
+        future = self._track(md5)
+        try:
+            await self._queue.put(md5)
+        except BaseException:
+            # Never queued (e.g. the caller was cancelled while the queue was full):
+            # drop the entry so later callers queue the hash again instead of
+            # awaiting a future no worker will resolve.
+            if self._in_flight.get(md5) is future:
+                del self._in_flight[md5]
+            future.cancel()
+            raise
+        self._spawn_worker()
+        return future
+
+    def _track(self, md5: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[md5] = future
+        return future
+
+    def _spawn_worker(self) -> None:
+        if len(self._worker_tasks) >= self.workers:
+            return
+        task = asyncio.create_task(self._worker())
+        self._worker_tasks.add(task)
+        task.add_done_callback(self._worker_tasks.discard)
+
+    async def _worker(self) -> None:
+        # Workers exit once the queue drains and are respawned on demand, so an idle
+        # process holds no background tasks.
+        while True:
+            try:
+                md5 = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                # Deregister before yielding, so a put that lands right after this
+                # sees the free slot and spawns a replacement.
+                self._worker_tasks.discard(asyncio.current_task())
+                return
+
+            future = self._in_flight.get(md5)
+            try:
+                self._lookups += 1
+                data = await self.fetcher(md5)
+            except asyncio.CancelledError:
+                if future is not None and not future.done():
+                    future.cancel()
+                raise
+            except Exception as exc:
+                self._failures += 1
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            else:
+                if future is not None and not future.done():
+                    future.set_result(data)
+            finally:
+                self._in_flight.pop(md5, None)
+                self._queue.task_done()
+
+
+def beatmap_fields_from_osu(md5: str, data: dict) -> dict:
+    return {
+        "beatmap_id": data["id"],
+        "beatmapset_id": data["beatmapset_id"],
+        "ranked_status": data["status"],
+        "md5_hash": md5,
+        "artist": data["beatmapset"]["artist"],
+        "title": data["beatmapset"]["title"],
+        "creator": data["beatmapset"]["creator"],
+        "version": data["version"],
+        "hit_objects": data.get("count_circles", 0) + data.get("count_sliders", 0) + data.get("count_spinners", 0),
+        "max_combo": data.get("max_combo")
+    }
+
+
+def store_lookup_results(
+    db: Session, results: dict[str, Optional[dict]]
+) -> dict[str, Optional[CachedBeatmap]]:
+    """
+    Persist a batch of upstream answers with one upsert per table.
+
+    Beatmaps are upserted and 404s recorded as InvalidMD5 rows; hashes another
+    request or worker already stored are absorbed by the ON CONFLICT clauses.
+    """
+    beatmaps: dict[str, Optional[CachedBeatmap]] = {}
+    beatmap_rows: list[dict] = []
+    invalid_md5s: list[str] = []
+
+    for md5, data in results.items():
+        if data is None:
+            invalid_md5s.append(md5)
+            beatmaps[md5] = None
+        else:
+            row = beatmap_fields_from_osu(md5, data)
+            beatmap_rows.append(row)
+            beatmaps[md5] = CachedBeatmap(**row)
+
+    if beatmap_rows:
+        logger.info(f"Saving {len(beatmap_rows)} beatmaps to database")
+    if invalid_md5s:
+        logger.info(f"Caching {len(invalid_md5s)} MD5s that returned 404 as invalid")
+
+    upsert_beatmaps(db, beatmap_rows)
+    insert_invalid_md5s(db, invalid_md5s, "404_not_found")
+    return beatmaps
+
+
+beatmap_enrichment_engine = BeatmapEnrichmentEngine(fetcher=lookup_beatmap_by_md5)
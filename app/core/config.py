@@ -21,6 +21,64 @@ class Settings(BaseSettings):
     HMAC_SECRET_KEY: str = ""
     FRONTEND_BASE_URL: str = "http://localhost:5174"
 
+    OSU_HTTP_TIMEOUT_SECONDS: float = 30.0
+    OSU_HTTP_MAX_CONNECTIONS: int = 100
+    OSU_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OSU_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    OSU_HTTP2_ENABLED: bool = False
+    OSU_TOKEN_REFRESH_MARGIN_SECONDS: int = 300
+
+    OSU_RATE_LIMIT_MAX_CALLS: int = 60
+    OSU_RATE_LIMIT_PERIOD_SECONDS: float = 60.0
+    # "memory" (per process) or "sqlite" (one budget shared by all workers on the host)
+    OSU_RATE_LIMIT_BACKEND: str = "memory"
+    OSU_RATE_LIMIT_DB_PATH: str = "storage/rate_limiter.db"
+    # Slots per window that background work (enrichment, refreshes) may not use
+    OSU_RATE_LIMIT_INTERACTIVE_RESERVE: int = 10
+
+    ENRICH_WORKERS: int = 4
+    ENRICH_QUEUE_SIZE: int = 256
+    ENRICH_JOB_BATCH_SIZE: int = 50
+    ENRICH_JOB_POLL_SECONDS: float = 5.0
+    ENRICH_JOB_MAX_ATTEMPTS: int = 5
+    # Completed jobs and their items are deleted this long after they finish
+    ENRICH_JOB_RETENTION_SECONDS: float = 7 * 24 * 3600.0
+
+    BEATMAP_CACHE_MAX_ENTRIES: int = 50000
+    BEATMAP_CACHE_TTL_SECONDS: float = 3600.0
+    # Memory for cached report pages, counted as decoded objects (report_index.decoded_size)
+    REPORT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # How uploaded reports are stored: gzip, zstd (needs 'zstandard') or none
+    REPORT_COMPRESSION: str = "gzip"
+    # Live profile stats on submission detail: served as is while fresh, served
+    # and refreshed in the background until the max age, refetched inline after.
+    USER_STATS_FRESH_SECONDS: float = 60.0
+    USER_STATS_MAX_AGE_SECONDS: float = 3600.0
+    USER_STATS_CACHE_MAX_ENTRIES: int = 10000
+    # After a failed osu! lookup, skip that player's upstream call for this long
+    USER_STATS_NEGATIVE_TTL_SECONDS: float = 30.0
+    # Background refresh of stored stats for every submitter; 0 disables it
+    USER_STATS_REFRESH_INTERVAL_SECONDS: float = 900.0
+
+    # Applied to every SQLite connection (app/db/sqlite_profile.py)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    # PRAGMA optimize cadence; 0 disables the periodic run
+    SQLITE_OPTIMIZE_INTERVAL_SECONDS: float = 3600.0
+    SQLITE_READ_POOL_SIZE: int = 10
+    # Request writes are group-committed by one writer thread (app/db/writer.py)
+    DB_WRITER_MAX_BATCH: int = 64
+    # Extra wait for more writes after the first; 0 commits whatever is queued
+    DB_WRITER_BATCH_WINDOW_MS: float = 0.0
+
+    # Cache-Control for public read endpoints (hall of fame, submissions)
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 30
+    HTTP_CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = 300
+
     class Config:
         case_sensitive = True
         env_file = ".env"
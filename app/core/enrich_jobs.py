@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.beatmap_enrichment import beatmap_enrichment_engine, store_lookup_results
+from app.core.config import settings
+from app.crud import crud_enrich_job
+from app.db.session import AsyncReadSessionLocal
+from app.db.writer import DatabaseWriter, db_writer
+
+logger = logging.getLogger(__name__)
+
+# How often an idle runner deletes completed jobs past their retention.
+SWEEP_INTERVAL_SECONDS = 3600.0
+
+
+class EnrichJobRunner:
+    """
+    Drains pending enrich job items stored in SQLite.
+
+    Items are only marked done after their beatmap (or InvalidMD5) row is committed,
+    so work left over when the process stops is picked up again on the next start.
+    Reads use the read pool and writes go through the writer; no session is held
+    while upstream lookups are awaited. While idle it deletes jobs completed more
+    than ``retention_seconds`` ago, at most once per ``SWEEP_INTERVAL_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.ENRICH_JOB_BATCH_SIZE,
+        poll_seconds: float = settings.ENRICH_JOB_POLL_SECONDS,
+        max_attempts: int = settings.ENRICH_JOB_MAX_ATTEMPTS,
+        writer: DatabaseWriter = db_writer,
+        read_session_factory: async_sessionmaker[AsyncSession] = AsyncReadSessionLocal,
+        retention_seconds: float = settings.ENRICH_JOB_RETENTION_SECONDS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.writer = writer
+        self.read_session_factory = read_session_factory
+        self.retention_seconds = retention_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._swept_at: Optional[float] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def wake(self) -> None:
+        """Tell a running runner new items were queued. No-op when it is not running."""
+        if self._wake is not None and self._task is not None and not self._task.done():
+            self._wake.set()
+
+    async def run_once(self) -> int:
+        """Resolve one batch of pending items. Returns how many hashes were resolved."""
+        async with self.read_session_factory() as db:
+            items = await db.run_sync(crud_enrich_job.get_pending_items, self.batch_size)
+            pending = [(item.id, item.md5_hash) for item in items]
+        if not pending:
+            return 0
+
+        md5_hashes = list(dict.fromkeys(md5 for _, md5 in pending))
+        results = await beatmap_enrichment_engine.resolve(md5_hashes)
+
+        failed_item_ids = [item_id for item_id, md5 in pending if md5 not in results]
+        await self.writer.run(_store_batch, results, failed_item_ids, self.max_attempts)
+        return len(results)
+
+    async def sweep(self) -> int:
+        """Delete jobs completed before the retention window. Returns how many were deleted."""
+        completed_before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            seconds=self.retention_seconds
+        )
+        deleted = await self.writer.run(crud_enrich_job.delete_completed_jobs, completed_before)
+        if deleted:
+            logger.info(f"Deleted {deleted} completed enrich jobs")
+        return deleted
+
+    async def _run(self) -> None:
+        while True:
+            resolved = 0
+            try:
+                resolved = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Enrich job batch failed")
+
+            # Keep draining while upstream answers; back off when idle or failing.
+            if resolved:
+                continue
+
+            loop = asyncio.get_running_loop()
+            if self._swept_at is None or loop.time() - self._swept_at >= SWEEP_INTERVAL_SECONDS:
+                self._swept_at = loop.time()
+                try:
+                    await self.sweep()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Enrich job sweep failed")
+
+            assert self._wake is not None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _store_batch(
+    db: Session, results: dict[str, Optional[dict]], failed_item_ids: list[int], max_attempts: int
+) -> None:
+    store_lookup_results(db, results)
+    job_ids = crud_enrich_job.mark_items_done(db, results.keys())
+    job_ids |= crud_enrich_job.record_failed_attempts(db, failed_item_ids, max_attempts)
+    crud_enrich_job.complete_finished_jobs(db, job_ids)
+
+
+enrich_job_runner = EnrichJobRunner()
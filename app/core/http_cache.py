@@ -0,0 +1,119 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import crud_cache_generation_async
+
+
+class Validator:
+    """ETag and optional Last-Modified for one representation of a resource."""
+
+    __slots__ = ("etag", "last_modified")
+
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": (
+                f"public, max-age={settings.HTTP_CACHE_MAX_AGE_SECONDS}, "
+                f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE_SECONDS}"
+            ),
+        }
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            return _opaque(self.etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+
+async def generation_validator_async(db: AsyncSession, name: str) -> Validator:
+    """Validator that changes whenever ``name``'s generation is bumped."""
+    value, updated_at = await crud_cache_generation_async.get_generation(db, name)
+    return _generation_validator(name, value, updated_at)
+
+
+def content_validator(body: bytes) -> Validator:
+    return Validator(f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def byte_range(request: Request, size: int, etag: str) -> Optional[tuple[int, int]]:
+    """
+    The ``[start, stop)`` slice a ``Range`` request asks for, or None for the full body.
+
+    Only single ``bytes`` ranges are honoured; anything else, or an ``If-Range``
+    that doesn't match ``etag`` (a strong validator), gets the full body. An
+    unsatisfiable range is a 416.
+    """
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    try:
+        if not dash:
+            return None
+        if not first:
+            suffix = int(last)
+            start, stop = max(size - suffix, 0), size
+            if suffix <= 0:
+                start = size
+        else:
+            start = int(first)
+            stop = min(int(last) + 1, size) if last else size
+            if stop <= start and start < size:
+                return None
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, stop
+
+
+def _generation_validator(name: str, value: int, updated_at: Optional[datetime]) -> Validator:
+    if updated_at is not None and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    stamp = int(updated_at.timestamp()) if updated_at else 0
+    return Validator(f'W/"{name}-{value}-{stamp}"', updated_at)
+
+
+def _opaque(tag: str) -> str:
+    # Weak comparison (RFC 9110 8.8.3.2): ignore the W/ prefix.
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
@@ -0,0 +1,68 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.rate_limiter import osu_api_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+_osu_http_client: Optional[httpx.AsyncClient] = None
+
+OSU_API_HOST = "osu.ppy.sh"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _observe_rate_limit(response: httpx.Response) -> None:
+    if response.request.url.host == OSU_API_HOST:
+        await osu_api_rate_limiter.observe(response.status_code, response.headers)
+
+
+def create_osu_http_client() -> httpx.AsyncClient:
+    """Build the pooled client used for every request to osu.ppy.sh."""
+    http2 = settings.OSU_HTTP2_ENABLED
+    if http2 and not _http2_available():
+        logger.warning("OSU_HTTP2_ENABLED is set but the 'h2' package is missing, using HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.OSU_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OSU_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OSU_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return httpx.AsyncClient(
+        timeout=settings.OSU_HTTP_TIMEOUT_SECONDS,
+        limits=limits,
+        http2=http2,
+        event_hooks={"response": [_observe_rate_limit]},
+    )
+
+
+def get_osu_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide osu! client.
+
+    The client is normally opened by the application lifespan; it is created lazily
+    here as well so scripts and tests that never run the lifespan still share one pool.
+    """
+    global _osu_http_client
+
+    if _osu_http_client is None or _osu_http_client.is_closed:
+        _osu_http_client = create_osu_http_client()
+    return _osu_http_client
+
+
+async def close_osu_http_client() -> None:
+    global _osu_http_client
+
+    if _osu_http_client is not None and not _osu_http_client.is_closed:
+        await _osu_http_client.aclose()
+    _osu_http_client = None
@@ -0,0 +1,243 @@
+import logging
+import threading
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.beatmap import Beatmap
+from app.models.invalid_md5 import InvalidMD5
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+_PENDING_KEY = "md5_index_pending"
+
+
+def md5_to_digest(md5: str) -> Optional[bytes]:
+    """Pack a hex MD5 into 16 bytes, or None if it is not a well-formed MD5."""
+    if len(md5) != DIGEST_SIZE * 2:
+        return None
+    try:
+        return bytes.fromhex(md5)
+    except ValueError:
+        return None
+
+
+class _DigestView:
+    """Sequence view over a packed buffer so ``bisect`` can search it in place."""
+
+    def __init__(self, packed: bytes) -> None:
+        self._packed = packed
+
+    def __len__(self) -> int:
+        return len(self._packed) // DIGEST_SIZE
+
+    def __getitem__(self, index: int) -> bytes:
+        start = index * DIGEST_SIZE
+        return self._packed[start:start + DIGEST_SIZE]
+
+
+class PackedDigestSet:
+    """
+    Exact set of 16-byte digests stored as one sorted ``bytes`` buffer.
+
+    A million hashes cost 16 MB instead of ~100 MB for a set of strings. Inserts go
+    to a small side set that is merged into the buffer once it grows past
+    ``merge_threshold``.
+
+    Merging is split so a shared instance can do the expensive part unlocked:
+    ``start_merge`` freezes the side set (it stays searchable), ``merged_buffer``
+    builds the new buffer, and ``finish_merge`` swaps it in. ``merge`` runs all three.
+    """
+
+    def __init__(self, merge_threshold: int = 4096) -> None:
+        self.merge_threshold = merge_threshold
+        self._packed = b""
+        self._recent: set[bytes] = set()
+        self._merging: set[bytes] = set()
+        # Bumped by build(), so a merge started before it is discarded.
+        self._generation = 0
+
+    def build(self, digests: Iterable[bytes]) -> None:
+        self._packed = b"".join(sorted(set(digests)))
+        self._recent = set()
+        self._merging = set()
+        self._generation += 1
+
+    def add(self, digest: bytes) -> None:
+        if digest not in self:
+            self._recent.add(digest)
+
+    @property
+    def merge_due(self) -> bool:
+        return not self._merging and len(self._recent) >= self.merge_threshold
+
+    def start_merge(self) -> Optional[tuple[int, bytes, list[bytes]]]:
+        """Freeze the side set; returns what ``merged_buffer`` needs, or None if not due."""
+        if not self.merge_due:
+            return None
+        self._merging, self._recent = self._recent, set()
+        return self._generation, self._packed, sorted(self._merging)
+
+    @staticmethod
+    def merged_buffer(packed: bytes, batch: list[bytes]) -> bytes:
+        """Insert sorted ``batch`` (none of it in ``packed``) into ``packed`` in one pass."""
+        view = _DigestView(packed)
+        parts: list[bytes] = []
+        previous = 0
+        for digest in batch:
+            index = bisect_left(view, digest, previous)
+            parts.append(packed[previous * DIGEST_SIZE:index * DIGEST_SIZE])
+            parts.append(digest)
+            previous = index
+        parts.append(packed[previous * DIGEST_SIZE:])
+        return b"".join(parts)
+
+    def finish_merge(self, generation: int, packed: bytes) -> None:
+        if generation == self._generation:
+            self._packed = packed
+            self._merging = set()
+
+    def merge(self) -> None:
+        started = self.start_merge()
+        if started is not None:
+            generation, packed, batch = started
+            self.finish_merge(generation, self.merged_buffer(packed, batch))
+
+    def __contains__(self, digest: bytes) -> bool:
+        if digest in self._recent or digest in self._merging:
+            return True
+        view = _DigestView(self._packed)
+        index = bisect_left(view, digest)
+        return index < len(view) and view[index] == digest
+
+    def __len__(self) -> int:
+        return len(self._packed) // DIGEST_SIZE + len(self._recent) + len(self._merging)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._packed) + (len(self._recent) + len(self._merging)) * DIGEST_SIZE
+
+
+class MD5MembershipIndex:
+    """
+    In-memory answer to "is this MD5 a known beatmap / a known-invalid hash?".
+
+    Built once from the beatmaps and invalid_md5s tables, then kept current by the
+    crud create functions; their additions are applied when the session commits and
+    dropped on rollback. Rows written by other worker processes are only picked up
+    on the next load, which costs at most a redundant upstream lookup.
+    Until ``load`` has run every hash is reported as unchecked.
+    """
+
+    def __init__(self) -> None:
+        self.beatmaps = PackedDigestSet()
+        self.invalid = PackedDigestSet()
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._invalid_queries_skipped = 0
+        self._beatmap_lookups_skipped = 0
+
+    def load(self, db: Session) -> None:
+        beatmap_digests = _digests(md5 for (md5,) in db.query(Beatmap.md5_hash).yield_per(10000))
+        invalid_digests = _digests(md5 for (md5,) in db.query(InvalidMD5.md5_hash).yield_per(10000))
+        with self._lock:
+            self.beatmaps.build(beatmap_digests)
+            self.invalid.build(invalid_digests)
+            self.loaded = True
+        logger.info(
+            f"Loaded MD5 index: {len(self.beatmaps)} beatmaps, {len(self.invalid)} invalid"
+        )
+
+    def classify(self, md5_hashes: list[str]) -> tuple[set[str], list[str], list[str]]:
+        """
+        Split hashes into ``(known_invalid, maybe_cached, unchecked)``.
+
+        Hashes absent from all three are definitely not in the database. Unchecked
+        hashes (index not loaded, or not a well-formed MD5) still need both queries.
+        """
+        if not self.loaded:
+            return set(), [], list(md5_hashes)
+
+        known_invalid: set[str] = set()
+        maybe_cached: list[str] = []
+        unchecked: list[str] = []
+        with self._lock:
+            for md5 in md5_hashes:
+                digest = md5_to_digest(md5)
+                if digest is None:
+                    unchecked.append(md5)
+                elif digest in self.invalid:
+                    known_invalid.add(md5)
+                elif digest in self.beatmaps:
+                    maybe_cached.append(md5)
+
+            checked = len(md5_hashes) - len(unchecked)
+            if checked and not unchecked:
+                self._invalid_queries_skipped += 1
+            if checked and not maybe_cached and not unchecked:
+                self._beatmap_lookups_skipped += 1
+        return known_invalid, maybe_cached, unchecked
+
+    def stage_beatmap(self, db: Session, md5: str) -> None:
+        db.info.setdefault(_PENDING_KEY, []).append((self.beatmaps, md5))
+
+    def stage_invalid(self, db: Session, md5: str) -> None:
+        db.info.setdefault(_PENDING_KEY, []).append((self.invalid, md5))
+
+    def apply(self, staged: list[tuple[PackedDigestSet, str]]) -> None:
+        with self._lock:
+            for target, md5 in staged:
+                digest = md5_to_digest(md5)
+                if digest is not None:
+                    target.add(digest)
+            merges = [
+                (target, started)
+                for target in {id(target): target for target, _ in staged}.values()
+                if (started := target.start_merge()) is not None
+            ]
+
+        # Building the merged buffer copies the whole set; do it without blocking
+        # classify(), which keeps answering from the old buffer plus the frozen batch.
+        for target, (generation, packed, batch) in merges:
+            merged = PackedDigestSet.merged_buffer(packed, batch)
+            with self._lock:
+                target.finish_merge(generation, merged)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.beatmaps = PackedDigestSet()
+            self.invalid = PackedDigestSet()
+            self.loaded = False
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "beatmaps": len(self.beatmaps),
+                "invalid": len(self.invalid),
+                "bytes": self.beatmaps.nbytes + self.invalid.nbytes,
+                "invalid_queries_skipped": self._invalid_queries_skipped,
+                "beatmap_lookups_skipped": self._beatmap_lookups_skipped,
+            }
+
+
+def _digests(md5_hashes: Iterable[str]) -> list[bytes]:
+    return [digest for md5 in md5_hashes if (digest := md5_to_digest(md5)) is not None]
+
+
+md5_membership_index = MD5MembershipIndex()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_md5s(session: Session) -> None:
+    staged = session.info.pop(_PENDING_KEY, None)
+    if staged:
+        md5_membership_index.apply(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_md5s(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
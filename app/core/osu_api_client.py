@@ -1,23 +1,33 @@
+import asyncio
 import httpx
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.http_client import get_osu_http_client
+from app.core.rate_limiter import RequestPriority, osu_api_rate_limiter
 from app.models.token import Token
 from app.crud import crud_token
+from app.db.writer import DatabaseWriter, db_writer
 
 OSU_API_BASE_URL = "https://osu.ppy.sh"
-logger = logging.getLogger(__name__)
+# Maximum number of ids osu! accepts on GET /api/v2/users
+USERS_LOOKUP_BATCH_SIZE = 50
 
-_client_credentials_token: Optional[dict] = None
+logger = logging.getLogger(__name__)
 
 
 class OsuAPIClient:
-    def __init__(self, db_session: Session, user_token: Token):
-        self.db = db_session
+    def __init__(
+        self,
+        user_token: Token,
+        http_client: Optional[httpx.AsyncClient] = None,
+        writer: Optional[DatabaseWriter] = None,
+    ):
         self.token = user_token
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.client = http_client or get_osu_http_client()
+        self.writer = writer or db_writer
 
     async def _get_valid_access_token(self) -> str:
         current_time = datetime.now(timezone.utc)
@@ -42,9 +52,7 @@ class OsuAPIClient:
         response = await self.client.post(token_url, data=refresh_data)
 
         new_token_data = response.json()
-        self.token = crud_token.update_refreshed_token(
-            db=self.db, db_token=self.token, new_token_data=new_token_data
-        )
+        self.token = await self.writer.run(_store_refreshed_token, self.token.id, new_token_data)
 
     async def make_request(self, method: str, endpoint: str, **kwargs):
         access_token = await self._get_valid_access_token()
@@ -54,8 +62,11 @@ class OsuAPIClient:
 
         url = f"{OSU_API_BASE_URL}{endpoint}"
 
+        await osu_api_rate_limiter.acquire(RequestPriority.INTERACTIVE)
         try:
-            response = await self.client.request(method, url, headers=headers, **kwargs)
+            response = await self.client.request(
+                method, url, headers=headers, timeout=60.0, **kwargs
+            )
             result = response.json()
             return result
         except Exception as e:
@@ -66,19 +77,73 @@ class OsuAPIClient:
         endpoint = f"/api/v2/users/{user_identifier}/{mode}"
         return await self.make_request("GET", endpoint)
 
-    async def close(self):
-        await self.client.aclose()
 
+def _store_refreshed_token(db: Session, token_id: int, new_token_data: dict) -> Token:
+    db_token = db.get(Token, token_id)
+    return crud_token.update_refreshed_token(db=db, db_token=db_token, new_token_data=new_token_data)
 
-async def get_client_credentials_token() -> str:
-    global _client_credentials_token
 
-    current_time = datetime.now(timezone.utc)
+class ClientCredentialsTokenManager:
+    """
+    Owns the app-level (client_credentials) osu! token.
+
+    Only one ``/oauth/token`` request runs at a time: concurrent callers that find no
+    usable token await the same refresh task. A background loop renews the token
+    ``refresh_margin`` before it expires, and callers that see a token inside that
+    margin kick off a refresh without waiting for it, so the request path only pays
+    for the OAuth round trip on a cold start or after an invalidation.
+    """
+
+    def __init__(self, refresh_margin_seconds: int = settings.OSU_TOKEN_REFRESH_MARGIN_SECONDS):
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self._token: Optional[dict] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+
+    async def get_token(self) -> str:
+        token = self._token
+        now = datetime.now(timezone.utc)
+
+        if token and token["expires_at"] > now:
+            if token["expires_at"] - self.refresh_margin <= now:
+                self._ensure_refresh()
+            return token["access_token"]
+
+        return await asyncio.shield(self._ensure_refresh())
+
+    def invalidate(self, access_token: str) -> None:
+        """Drop ``access_token`` after osu! rejected it and start fetching a new one."""
+        if self._token and self._token["access_token"] == access_token:
+            logger.warning("Client credentials token rejected by osu!, refreshing")
+            self._token = None
+            self._ensure_refresh()
 
-    if _client_credentials_token and _client_credentials_token["expires_at"] > current_time:
-        return _client_credentials_token["access_token"]
+    def start(self) -> None:
+        if self._background_task is None or self._background_task.done():
+            self._background_task = asyncio.create_task(self._refresh_loop())
 
-    async with httpx.AsyncClient() as client:
+    async def stop(self) -> None:
+        for task in (self._background_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._background_task = None
+        self._refresh_task = None
+
+    def _ensure_refresh(self) -> asyncio.Task:
+        task = self._refresh_task
+        loop = asyncio.get_running_loop()
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch_token())
+            task.add_done_callback(_consume_task_exception)
+            self._refresh_task = task
+        return task
+
+    async def _fetch_token(self) -> str:
+        client = get_osu_http_client()
         token_url = f"{OSU_API_BASE_URL}/oauth/token"
         data = {
             "client_id": settings.OSU_CLIENT_ID,
@@ -87,29 +152,105 @@ async def get_client_credentials_token() -> str:
             "scope": "public"
         }
 
+        requested_at = datetime.now(timezone.utc)
         response = await client.post(token_url, data=data)
         response.raise_for_status()
         token_data = response.json()
 
-        _client_credentials_token = {
+        self._token = {
             "access_token": token_data["access_token"],
-            "expires_at": current_time + timedelta(seconds=token_data["expires_in"])
+            "expires_at": requested_at + timedelta(seconds=token_data["expires_in"])
         }
-
         return token_data["access_token"]
 
+    async def _refresh_loop(self) -> None:
+        while True:
+            token = self._token
+            delay = 0.0
+            if token is not None:
+                remaining = (token["expires_at"] - datetime.now(timezone.utc)).total_seconds()
+                margin = self.refresh_margin.total_seconds()
+                # Short-lived tokens are renewed halfway through instead of in a tight loop.
+                delay = remaining - margin if remaining > 2 * margin else remaining / 2
+
+            if delay > 1:
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                await asyncio.shield(self._ensure_refresh())
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Background client credentials refresh failed: {exc}")
+                await asyncio.sleep(30)
+
+
+def _consume_task_exception(task: asyncio.Task) -> None:
+    # Fire-and-forget refreshes may fail with nobody awaiting them.
+    if not task.cancelled():
+        task.exception()
 
-async def get_public_user_data(user_identifier: str | int, mode: str = "osu") -> dict:
-    access_token = await get_client_credentials_token()
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+client_credentials_token_manager = ClientCredentialsTokenManager()
+
+
+async def get_client_credentials_token() -> str:
+    return await client_credentials_token_manager.get_token()
+
+
+async def _get_with_client_credentials(
+    url: str, timeout: float, priority: RequestPriority
+) -> httpx.Response:
+    """
+    GET with the app token, renewing it once if osu! answers 401.
+
+    Every request, the retry included, takes a rate limiter slot at ``priority``.
+    """
+    client = get_osu_http_client()
+
+    for attempt in range(2):
+        await osu_api_rate_limiter.acquire(priority)
+        access_token = await get_client_credentials_token()
         headers = {
             "Authorization": f"Bearer {access_token}",
             "Accept": "application/json"
         }
+        response = await client.get(url, headers=headers, timeout=timeout)
+        if response.status_code != 401 or attempt:
+            break
+        client_credentials_token_manager.invalidate(access_token)
 
-        url = f"{OSU_API_BASE_URL}/api/v2/users/{user_identifier}/{mode}"
+    return response
 
-        response = await client.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+
+async def get_public_user_data(user_identifier: str | int, mode: str = "osu") -> dict:
+    url = f"{OSU_API_BASE_URL}/api/v2/users/{user_identifier}/{mode}"
+
+    response = await _get_with_client_credentials(
+        url, timeout=30.0, priority=RequestPriority.INTERACTIVE
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_users_by_ids(user_ids: list[int]) -> list[dict]:
+    """Fetch up to ``USERS_LOOKUP_BATCH_SIZE`` profiles in one call, using spare budget."""
+    query = "&".join(f"ids[]={user_id}" for user_id in user_ids[:USERS_LOOKUP_BATCH_SIZE])
+    url = f"{OSU_API_BASE_URL}/api/v2/users?{query}"
+    response = await _get_with_client_credentials(url, timeout=30.0, priority=RequestPriority.IDLE)
+    response.raise_for_status()
+    return response.json().get("users", [])
+
+
+async def lookup_beatmap_by_md5(md5_hash: str) -> Optional[dict]:
+    """Look up a beatmap by checksum. Returns None when osu! does not know the hash."""
+    url = f"{OSU_API_BASE_URL}/api/v2/beatmaps/lookup?checksum={md5_hash}"
+    response = await _get_with_client_credentials(
+        url, timeout=10.0, priority=RequestPriority.BACKGROUND
+    )
+    if response.status_code == 404:
+        return None
+
+    response.raise_for_status()
+    return response.json()
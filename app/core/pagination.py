@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Generic, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.orm import Query
+
+T = TypeVar("T")
+QueryT = TypeVar("QueryT", Query, Select)
+
+NEXT = "n"
+PREV = "p"
+
+# (column, descending) pairs; the last column must be unique (a primary key).
+KeysetOrder = Sequence[tuple[Any, bool]]
+
+
+class Cursor:
+    __slots__ = ("sort", "direction", "key")
+
+    def __init__(self, sort: str, direction: str, key: tuple) -> None:
+        self.sort = sort
+        self.direction = direction
+        self.key = key
+
+
+class Page(Generic[T]):
+    __slots__ = ("items", "next_cursor", "prev_cursor")
+
+    def __init__(
+        self, items: list[T], next_cursor: Optional[str], prev_cursor: Optional[str]
+    ) -> None:
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def set_headers(self, response: Response) -> None:
+        if self.next_cursor:
+            response.headers["X-Next-Cursor"] = self.next_cursor
+        if self.prev_cursor:
+            response.headers["X-Prev-Cursor"] = self.prev_cursor
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    key = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in cursor.key]
+    raw = json.dumps([cursor.sort, cursor.direction, key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: str) -> Cursor:
+    """Parse a cursor issued for ``sort``; anything else is a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_sort, direction, key = json.loads(raw)
+        key = tuple(
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in key
+        )
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if cursor_sort != sort or direction not in (NEXT, PREV):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return Cursor(sort, direction, key)
+
+
+def keyset_page(
+    query: Query,
+    order: KeysetOrder,
+    key_of: Callable[[T], tuple],
+    sort: str,
+    limit: int,
+    cursor: Optional[Cursor] = None,
+) -> Page[T]:
+    """
+    Fetch one page of ``query`` in ``order`` starting at ``cursor``.
+
+    Pages are selected with a ``WHERE`` on the sort key instead of ``OFFSET``, so
+    with an index on the order columns every page costs one index seek.
+    """
+    query = keyset_filter(query, order, limit, cursor)
+    return build_page(query.all(), key_of, sort, limit, cursor)
+
+
+def keyset_filter(query: QueryT, order: KeysetOrder, limit: int, cursor: Optional[Cursor]) -> QueryT:
+    """Apply the keyset WHERE, ORDER BY and LIMIT to a ``Query`` or ``Select``."""
+    if cursor is not None and len(cursor.key) != len(order):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    backwards = _is_backwards(cursor)
+    if cursor is not None:
+        query = query.filter(_beyond(order, cursor.key, backwards))
+
+    ordering = [
+        column.desc() if descending != backwards else column.asc()
+        for column, descending in order
+    ]
+    return query.order_by(*ordering).limit(limit + 1)
+
+
+def build_page(
+    rows: Sequence[T],
+    key_of: Callable[[T], tuple],
+    sort: str,
+    limit: int,
+    cursor: Optional[Cursor],
+) -> Page[T]:
+    """Turn the ``limit + 1`` rows fetched by ``keyset_filter`` into a page."""
+    backwards = _is_backwards(cursor)
+    has_more = len(rows) > limit
+    items = list(rows[:limit])
+    if backwards:
+        items.reverse()
+
+    if not items:
+        return Page(items, None, None)
+
+    # Coming from a cursor means there is a page on the side we came from.
+    more_after = has_more if not backwards else True
+    more_before = cursor is not None if not backwards else has_more
+    next_cursor = encode_cursor(Cursor(sort, NEXT, key_of(items[-1]))) if more_after else None
+    prev_cursor = encode_cursor(Cursor(sort, PREV, key_of(items[0]))) if more_before else None
+    return Page(items, next_cursor, prev_cursor)
+
+
+def _is_backwards(cursor: Optional[Cursor]) -> bool:
+    return cursor is not None and cursor.direction == PREV
+
+
+def _beyond(order: KeysetOrder, key: tuple, backwards: bool):
+    # Lexicographic "comes after key" (or before, when paging backwards).
+    clauses = []
+    for index, (column, descending) in enumerate(order):
+        equal = [order[i][0] == key[i] for i in range(index)]
+        past = column < key[index] if descending != backwards else column > key[index]
+        clauses.append(and_(*equal, past))
+    return or_(*clauses)
@@ -1,30 +1,322 @@
 import asyncio
+import heapq
+import itertools
+import logging
+import sqlite3
+import threading
+import time
 from collections import deque
+from enum import IntEnum
+from pathlib import Path
 from time import monotonic
+from typing import Mapping, Optional, Protocol
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    # Housekeeping (e.g. profile stats refresh): only runs when nothing else waits.
+    IDLE = 2
+
+
+class RateLimitBackend(Protocol):
+    async def try_acquire(self, max_calls: int, period_seconds: float) -> float:
+        """Take a slot and return 0, or return how many seconds to wait before retrying."""
+        ...
+
+    async def block_until(self, until: float) -> None:
+        """Refuse every slot until the wall-clock time ``until``."""
+        ...
+
+    async def reset(self) -> None:
+        ...
+
+
+class InMemoryRateLimitBackend:
+    """Sliding window kept in this process only."""
+
+    def __init__(self) -> None:
+        self._timestamps: deque[float] = deque()
+        self._blocked_until = 0.0
+
+    async def try_acquire(self, max_calls: int, period_seconds: float) -> float:
+        blocked_for = self._blocked_until - time.time()
+        if blocked_for > 0:
+            return blocked_for
+
+        now = monotonic()
+        while self._timestamps and now - self._timestamps[0] >= period_seconds:
+            self._timestamps.popleft()
+
+        if len(self._timestamps) < max_calls:
+            self._timestamps.append(now)
+            return 0.0
+
+        return period_seconds - (now - self._timestamps[0])
+
+    async def block_until(self, until: float) -> None:
+        self._blocked_until = max(self._blocked_until, until)
+
+    async def reset(self) -> None:
+        self._timestamps.clear()
+        self._blocked_until = 0.0
+
+
+class SQLiteRateLimitBackend:
+    """
+    Sliding window stored in a SQLite file, shared by every process on the host.
+
+    Each acquisition runs in a ``BEGIN IMMEDIATE`` transaction, so uvicorn workers
+    serialize on the file lock and together never exceed ``max_calls`` per window.
+    Timestamps are wall-clock so the window survives restarts.
+    """
+
+    def __init__(self, path: Path, bucket: str = "osu_api") -> None:
+        self.path = path
+        self.bucket = bucket
+        self._conn: sqlite3.Connection | None = None
+        self._conn_lock = threading.Lock()
+
+    async def try_acquire(self, max_calls: int, period_seconds: float) -> float:
+        return await asyncio.to_thread(self._try_acquire_sync, max_calls, period_seconds)
+
+    async def block_until(self, until: float) -> None:
+        await asyncio.to_thread(self._block_until_sync, until)
+
+    async def reset(self) -> None:
+        await asyncio.to_thread(self._reset_sync)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_events ("
+                "bucket TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rate_limit_events_bucket_ts "
+                "ON rate_limit_events (bucket, ts)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_blocks ("
+                "bucket TEXT PRIMARY KEY, until REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _try_acquire_sync(self, max_calls: int, period_seconds: float) -> float:
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                blocked = conn.execute(
+                    "SELECT until FROM rate_limit_blocks WHERE bucket = ?", (self.bucket,)
+                ).fetchone()
+                if blocked and blocked[0] > now:
+                    conn.execute("COMMIT")
+                    return blocked[0] - now
+
+                conn.execute(
+                    "DELETE FROM rate_limit_events WHERE bucket = ? AND ts <= ?",
+                    (self.bucket, now - period_seconds),
+                )
+                count, oldest = conn.execute(
+                    "SELECT COUNT(*), MIN(ts) FROM rate_limit_events WHERE bucket = ?",
+                    (self.bucket,),
+                ).fetchone()
+
+                if count < max_calls:
+                    conn.execute(
+                        "INSERT INTO rate_limit_events (bucket, ts) VALUES (?, ?)",
+                        (self.bucket, now),
+                    )
+                    wait_for = 0.0
+                else:
+                    wait_for = max(oldest + period_seconds - now, 0.001)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait_for
+
+    def _block_until_sync(self, until: float) -> None:
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO rate_limit_blocks (bucket, until) VALUES (?, ?) "
+                "ON CONFLICT (bucket) DO UPDATE SET until = MAX(until, excluded.until)",
+                (self.bucket, until),
+            )
+
+    def _reset_sync(self) -> None:
+        with self._conn_lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM rate_limit_events WHERE bucket = ?", (self.bucket,))
+            conn.execute("DELETE FROM rate_limit_blocks WHERE bucket = ?", (self.bucket,))
 
 
 class RateLimiter:
-    def __init__(self, max_calls: int, period_seconds: float) -> None:
+    """
+    Sliding-window limiter that serves waiters by priority and adapts to osu!.
+
+    Only the highest-priority waiter (FIFO within a class) asks the backend for a
+    slot; everyone else sleeps until the head changes. Background callers may not
+    use the last ``interactive_reserve`` slots of the window, so a large enrich batch
+    never makes a user-facing call wait for the window to roll over.
+
+    ``observe`` feeds osu!'s ``X-RateLimit-*`` and ``Retry-After`` headers back in:
+    the budget shrinks to the advertised limit, an exhausted budget pauses every
+    caller, a nearly exhausted one pauses background work, and 429s back off.
+    """
+
+    def __init__(
+        self,
+        max_calls: int,
+        period_seconds: float,
+        backend: RateLimitBackend | None = None,
+        interactive_reserve: int = 0,
+    ) -> None:
+        self.configured_max_calls = max_calls
         self.max_calls = max_calls
         self.period_seconds = period_seconds
-        self._timestamps: deque[float] = deque()
-        self._lock = asyncio.Lock()
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.interactive_reserve = min(interactive_reserve, max_calls - 1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._head_changed = asyncio.Event()
+        self._background_paused_until = 0.0
+        self._backoff_seconds = 0.0
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.INTERACTIVE) -> None:
+        self._bind_loop()
+        ticket = (int(priority), next(self._sequence))
+        heapq.heappush(self._waiters, ticket)
+        if self._waiters[0] == ticket:
+            self._notify()
+
+        try:
+            while True:
+                wait_for: Optional[float] = None
+                if self._waiters[0] == ticket:
+                    wait_for = self._background_pause(priority)
+                    if wait_for <= 0:
+                        wait_for = await self.backend.try_acquire(
+                            self._budget_for(priority), self.period_seconds
+                        )
+                        if wait_for <= 0:
+                            return
+
+                await self._wait_for_head_change(wait_for)
+        finally:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+            self._notify()
+
+    async def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Adjust the budget from an osu! response."""
+        limit = _parse_int(headers.get("X-RateLimit-Limit"))
+        if limit is not None and limit > 0:
+            self.max_calls = min(self.configured_max_calls, limit)
+
+        now = time.time()
+        if status_code == 429:
+            retry_after = _parse_float(headers.get("Retry-After"))
+            if retry_after is None:
+                self._backoff_seconds = min(
+                    max(self._backoff_seconds * 2, 1.0), self.period_seconds
+                )
+                retry_after = self._backoff_seconds
+            logger.warning(f"osu! API rate limited us, pausing for {retry_after:.1f}s")
+            await self.backend.block_until(now + retry_after)
+            return
+
+        if status_code < 400:
+            self._backoff_seconds = 0.0
+
+        remaining = _parse_int(headers.get("X-RateLimit-Remaining"))
+        if remaining is None:
+            return
+        if remaining <= 0:
+            await self.backend.block_until(now + self.period_seconds)
+        elif remaining <= self.interactive_reserve:
+            self._background_paused_until = max(
+                self._background_paused_until, monotonic() + self.period_seconds
+            )
+
+    async def reset(self) -> None:
+        self.max_calls = self.configured_max_calls
+        self._background_paused_until = 0.0
+        self._backoff_seconds = 0.0
+        await self.backend.reset()
+
+    def _budget_for(self, priority: RequestPriority) -> int:
+        if priority == RequestPriority.INTERACTIVE:
+            return self.max_calls
+        return max(1, self.max_calls - self.interactive_reserve)
+
+    def _background_pause(self, priority: RequestPriority) -> float:
+        if priority == RequestPriority.INTERACTIVE:
+            return 0.0
+        return self._background_paused_until - monotonic()
+
+    async def _wait_for_head_change(self, timeout: Optional[float]) -> None:
+        event = self._head_changed
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self) -> None:
+        # Wake every waiter once and arm a fresh event for the next change.
+        self._head_changed.set()
+        self._head_changed = asyncio.Event()
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = []
+            self._head_changed = asyncio.Event()
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
 
-    async def acquire(self) -> None:
-        while True:
-            async with self._lock:
-                now = monotonic()
-                while self._timestamps and now - self._timestamps[0] >= self.period_seconds:
-                    self._timestamps.popleft()
 
-                if len(self._timestamps) < self.max_calls:
-                    self._timestamps.append(now)
-                    return
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
 
-                wait_for = self.period_seconds - (now - self._timestamps[0])
 
-            # sleep outside the lock
-            await asyncio.sleep(wait_for)
+def build_rate_limit_backend() -> RateLimitBackend:
+    if settings.OSU_RATE_LIMIT_BACKEND == "sqlite":
+        path = Path(settings.OSU_RATE_LIMIT_DB_PATH)
+        if not path.is_absolute():
+            path = Path(__file__).resolve().parents[2] / path
+        return SQLiteRateLimitBackend(path)
+    return InMemoryRateLimitBackend()
 
 
-osu_api_rate_limiter = RateLimiter(max_calls=60, period_seconds=60.0)
+osu_api_rate_limiter = RateLimiter(
+    max_calls=settings.OSU_RATE_LIMIT_MAX_CALLS,
+    period_seconds=settings.OSU_RATE_LIMIT_PERIOD_SECONDS,
+    backend=build_rate_limit_backend(),
+    interactive_reserve=settings.OSU_RATE_LIMIT_INTERACTIVE_RESERVE,
+)
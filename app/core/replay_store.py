@@ -0,0 +1,98 @@
+import hashlib
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+STORAGE_PATH = Path("storage")
+REPLAY_BLOBS_PATH = STORAGE_PATH / "replays"
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ReplayStore:
+    """
+    Replay files stored once under ``<root>/<sha256[:2]>/<sha256>``.
+
+    Which submission uses which blob lives in the ``submission_replays`` manifest;
+    this class only moves bytes.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def put(self, source: BinaryIO) -> tuple[str, int, int]:
+        """
+        Store the rest of ``source`` and return ``(sha256, size, crc32)``.
+
+        The content is hashed first and only copied when no blob with that hash
+        exists, so re-uploading a known replay costs a read and no write. The CRC
+        comes from the same pass and lets exports write ZIP headers up front.
+        ``source`` must be seekable (upload spool files are).
+        """
+        start = source.tell()
+        digest = hashlib.sha256()
+        crc32 = 0
+        size = 0
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+            crc32 = zlib.crc32(chunk, crc32)
+            size += len(chunk)
+        sha256 = digest.hexdigest()
+
+        path = self.blob_path(sha256)
+        try:
+            # Mark it as in use so garbage collection's age check keeps it.
+            os.utime(path)
+            return sha256, size, crc32
+        except FileNotFoundError:
+            pass
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        source.seek(start)
+        tmp_path = path.with_name(f"{sha256}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as buffer:
+                while chunk := source.read(CHUNK_SIZE):
+                    buffer.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return sha256, size, crc32
+
+    def set_aside(self, sha256: str) -> Optional[Path]:
+        """
+        Move a blob out of the way before deleting it; returns where it went.
+
+        Uploads arriving after the move no longer find it and store a fresh copy.
+        None if the blob is already gone.
+        """
+        path = self.blob_path(sha256)
+        aside = path.with_name(f"{sha256}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            return None
+        return aside
+
+    def restore(self, sha256: str, aside: Path) -> None:
+        """Undo ``set_aside``; a copy stored in the meantime has the same bytes."""
+        os.replace(aside, self.blob_path(sha256))
+
+    def iter_blobs(self) -> Iterator[tuple[str, Path]]:
+        """Every stored blob as ``(sha256, path)``, leftover temp files excluded."""
+        if not self.root.is_dir():
+            return
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for path in shard.iterdir():
+                if path.suffix != ".tmp":
+                    yield path.name, path
+
+
+replay_store = ReplayStore(REPLAY_BLOBS_PATH)
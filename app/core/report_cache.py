@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Optional
+
+from app.core.config import settings
+from app.core.report_index import ReportPage
+
+ReportCacheKey = tuple[str, int, int, Hashable]
+
+
+def report_cache_key(path: Path, part: Hashable) -> ReportCacheKey:
+    """Key ``part`` of a report by path, mtime and size, so a rewritten file misses."""
+    stat = path.stat()
+    return (str(path), stat.st_mtime_ns, stat.st_size, part)
+
+
+class ReportCache:
+    """
+    LRU of parsed report pages bounded by an approximate byte budget.
+
+    Entries are keyed by ``(path, mtime_ns, size, part)``; replacing a report changes
+    its key, and the stale entries age out of the LRU.
+    """
+
+    def __init__(self, max_bytes: int = settings.REPORT_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[ReportCacheKey, ReportPage] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: ReportCacheKey) -> Optional[ReportPage]:
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return page
+
+    def put(self, key: ReportCacheKey, page: ReportPage) -> None:
+        if page.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+
+            self._entries[key] = page
+            self._bytes += page.nbytes
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+report_cache = ReportCache()
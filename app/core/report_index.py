@@ -0,0 +1,325 @@
+import codecs
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Sidecar layout:
+#   MAGIC | u32 header length | header JSON | u64 row offsets[count + 1] | rows
+# Rows are compact JSON lines; offsets are relative to the start of the rows, so
+# row ``i`` spans ``offsets[i]:offsets[i + 1]``. The header carries metadata,
+# summary, row count and the size/mtime of the report it was built from.
+MAGIC = b"LSRIDX1\n"
+INDEX_SUFFIX = ".idx"
+
+_HEADER_LENGTH = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+READ_CHUNK_SIZE = 256 * 1024
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+class ReportPage:
+    """One page of a report; ``nbytes`` approximates the memory it holds once decoded."""
+
+    __slots__ = ("metadata", "summary", "total_count", "scores", "nbytes")
+
+    def __init__(self, metadata: dict, summary: dict, total_count: int, scores: list[dict]) -> None:
+        self.metadata = metadata
+        self.summary = summary
+        self.total_count = total_count
+        self.scores = scores
+        self.nbytes = decoded_size([metadata, summary, scores])
+
+
+def decoded_size(value: Any) -> int:
+    """
+    Approximate bytes held by a decoded JSON value: ``sys.getsizeof`` of every
+    container, key and scalar in it.
+
+    Keys repeated across rows are usually one shared string but are counted per
+    row, so this errs high, never low; a dict of a few floats and short strings
+    is several times its JSON text.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + decoded_size(item)
+    elif isinstance(value, list):
+        for item in value:
+            size += decoded_size(item)
+    return size
+
+
+def split_report(data: dict) -> tuple[dict, dict, list[dict]]:
+    """Return ``(metadata, summary, lost_scores)`` from a decoded report."""
+    metadata = data.get("metadata", {})
+    summary = data.get("summary_stats") or data.get("summary", {})
+
+    if "score_lists" in data:
+        lost_scores = data["score_lists"].get("lost_scores", [])
+    else:
+        lost_scores = data.get("lost_scores", [])
+
+    return metadata, summary, lost_scores
+
+
+def index_path_for(report_path: Path) -> Path:
+    return report_path.with_name(report_path.name + INDEX_SUFFIX)
+
+
+def write_report_index(report_path: Path, data: dict) -> Path:
+    """Write the sidecar for ``report_path`` from its decoded contents."""
+    metadata, summary, lost_scores = split_report(data)
+
+    rows = [_encode_row(score) for score in lost_scores]
+    offsets = [0]
+    for row in rows:
+        offsets.append(offsets[-1] + len(row))
+    return _write_index(report_path, metadata, summary, offsets, lambda fp: fp.writelines(rows))
+
+
+def index_report_stream(report_path: Path, source: BinaryIO) -> tuple[dict, dict]:
+    """
+    Write the sidecar for ``report_path`` from its decoded bytes, read from ``source``.
+
+    Unlike ``write_report_index`` the report is never loaded whole: lost scores are
+    parsed one at a time and spooled to a temporary rows file, so memory is bounded
+    by the largest single score. Returns ``(metadata, summary)``; raises ValueError
+    if the report is not a JSON object.
+    """
+    index_path = index_path_for(report_path)
+    rows_path = index_path.with_name(index_path.name + ".rows.tmp")
+    offsets = array("Q", [0])
+
+    try:
+        with open(rows_path, "w+b") as rows:
+            def add_score(score: Any) -> None:
+                row = _encode_row(score)
+                rows.write(row)
+                offsets.append(offsets[-1] + len(row))
+
+            def reset_scores() -> None:
+                rows.seek(0)
+                rows.truncate()
+                del offsets[1:]
+
+            top = _scan_report(_JsonStream(source), add_score, reset_scores)
+            metadata, summary, _ = split_report(top)
+            rows.seek(0)
+            _write_index(
+                report_path, metadata, summary, offsets,
+                lambda fp: shutil.copyfileobj(rows, fp, READ_CHUNK_SIZE),
+            )
+    finally:
+        rows_path.unlink(missing_ok=True)
+    return metadata, summary
+
+
+def _encode_row(score: Any) -> bytes:
+    return json.dumps(score, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _write_index(
+    report_path: Path,
+    metadata: dict,
+    summary: dict,
+    offsets: Sequence[int],
+    write_rows: Callable[[BinaryIO], Any],
+) -> Path:
+    source = report_path.stat()
+    header = json.dumps(
+        {
+            "metadata": metadata,
+            "summary": summary,
+            "count": len(offsets) - 1,
+            "source_size": source.st_size,
+            "source_mtime_ns": source.st_mtime_ns,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    index_path = index_path_for(report_path)
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, "wb") as fp:
+        fp.write(MAGIC)
+        fp.write(_HEADER_LENGTH.pack(len(header)))
+        fp.write(header)
+        fp.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        write_rows(fp)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def _scan_report(
+    stream: "_JsonStream", add_score: Callable[[Any], None], reset_scores: Callable[[], None]
+) -> dict:
+    """
+    Walk a report, handing each lost score to ``add_score``.
+
+    Returns the top-level ``metadata``/``summary`` sections; every other value is
+    skipped element by element. Mirrors ``split_report``: ``score_lists.lost_scores``
+    wins over a top-level ``lost_scores``.
+    """
+    top: dict = {}
+    from_score_lists = False
+    for key in stream.members():
+        if key == "score_lists":
+            reset_scores()
+            from_score_lists = True
+            for list_key in stream.members():
+                if list_key == "lost_scores":
+                    for score in stream.elements():
+                        add_score(score)
+                else:
+                    stream.skip()
+        elif key == "lost_scores" and not from_score_lists:
+            for score in stream.elements():
+                add_score(score)
+        elif key in ("metadata", "summary_stats", "summary"):
+            top[key] = stream.value()
+        else:
+            stream.skip()
+    if stream.peek():
+        raise ValueError("Unexpected data after the report object")
+    return top
+
+
+class _JsonStream:
+    """Pulls JSON values out of a UTF-8 byte stream, buffering one value at a time."""
+
+    def __init__(self, source: BinaryIO) -> None:
+        self._source = source
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def peek(self) -> str:
+        """The next non-whitespace character, without consuming it; "" at the end."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number running to the end of the buffer may continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object at the cursor; consume each value before the next key."""
+        self._take("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Expected an object key")
+            self._take(":")
+            yield key
+            if self.peek() != ",":
+                self._take("}")
+                return
+            self._pos += 1
+
+    def elements(self) -> Iterator[Any]:
+        self._take("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() != ",":
+                self._take("]")
+                return
+            self._pos += 1
+
+    def skip(self) -> None:
+        char = self.peek()
+        if char == "[":
+            for _ in self.elements():
+                pass
+        elif char == "{":
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+    def _take(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in report")
+        self._pos += 1
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._source.read(READ_CHUNK_SIZE)
+        self._eof = not chunk
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk, final=self._eof)
+        self._pos = 0
+        return True
+
+
+def read_report_page(report_path: Path, offset: int, limit: int) -> Optional[ReportPage]:
+    """
+    Read one page of lost scores from the sidecar of ``report_path``.
+
+    Only the header, ``limit + 1`` offsets and the requested rows are read. Returns
+    None if there is no sidecar or it was built from a different version of the
+    report, in which case the caller should parse the report and rebuild it.
+    """
+    index_path = index_path_for(report_path)
+    try:
+        fp = open(index_path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            logger.warning(f"Ignoring report index with unknown format: {index_path}")
+            return None
+        (header_length,) = _HEADER_LENGTH.unpack(fp.read(_HEADER_LENGTH.size))
+        header = json.loads(fp.read(header_length))
+
+        source = report_path.stat()
+        if header["source_size"] != source.st_size or header["source_mtime_ns"] != source.st_mtime_ns:
+            return None
+
+        count = header["count"]
+        offsets_start = len(MAGIC) + _HEADER_LENGTH.size + header_length
+        rows_start = offsets_start + (count + 1) * _OFFSET.size
+
+        first = min(max(offset, 0), count)
+        last = min(first + max(limit, 0), count)
+        scores: list[dict] = []
+        if last > first:
+            fp.seek(offsets_start + first * _OFFSET.size)
+            span = struct.unpack(f"<{last - first + 1}Q", fp.read((last - first + 1) * _OFFSET.size))
+            fp.seek(rows_start + span[0])
+            block = fp.read(span[-1] - span[0])
+            scores = [json.loads(line) for line in block.splitlines()]
+
+    return ReportPage(header["metadata"], header["summary"], count, scores)
@@ -0,0 +1,105 @@
+import gzip
+import logging
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# The stored file's suffix says how it is encoded; reports without one are plain JSON.
+SUFFIXES = {GZIP: ".gz", ZSTD: ".zst"}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def storage_encoding() -> Optional[str]:
+    """The encoding new reports are written with, or None to store them as plain JSON."""
+    encoding = settings.REPORT_COMPRESSION.lower()
+    if encoding in ("", "none", "identity"):
+        return None
+    if encoding not in SUFFIXES:
+        raise ValueError(f"REPORT_COMPRESSION must be one of gzip, zstd or none, got {encoding!r}")
+    if encoding == ZSTD and not _zstd_available():
+        logger.warning("REPORT_COMPRESSION=zstd but the 'zstandard' package is missing, using gzip")
+        return GZIP
+    return encoding
+
+
+def stored_name(report_path: Path, encoding: Optional[str]) -> Path:
+    return report_path.with_name(report_path.name + SUFFIXES[encoding]) if encoding else report_path
+
+
+def encoding_of(path: Path) -> Optional[str]:
+    for encoding, suffix in SUFFIXES.items():
+        if path.name.endswith(suffix):
+            return encoding
+    return None
+
+
+def open_writer(path: Path, encoding: Optional[str]) -> BinaryIO:
+    """Binary file at ``path`` that compresses what is written to it with ``encoding``."""
+    if encoding == GZIP:
+        # mtime=0 keeps the bytes (and so the HTTP validators) a function of the content.
+        return gzip.GzipFile(path, "wb", compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+def open_report(path: Path) -> BinaryIO:
+    """Open a stored report for reading, decompressing it on the fly if needed."""
+    encoding = encoding_of(path)
+    if encoding == GZIP:
+        return gzip.open(path, "rb")
+    if encoding == ZSTD:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def read_report(path: Path) -> bytes:
+    with open_report(path) as fp:
+        return fp.read()
+
+
+def iter_report(path: Path) -> Iterator[bytes]:
+    """The decoded report in chunks, for clients that can't take the stored encoding."""
+    with open_report(path) as fp:
+        while chunk := fp.read(READ_CHUNK_SIZE):
+            yield chunk
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Whether an ``Accept-Encoding`` header allows ``encoding`` (q=0 refuses it)."""
+    if not accept_encoding:
+        return False
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get(encoding, qualities.get("*", 0.0)) > 0
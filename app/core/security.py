@@ -35,8 +35,16 @@ def decode_session_token(token: str):
         return None
 
 
+def hmac_signer() -> "hmac.HMAC":
+    """Incremental HMAC for payloads that are verified while they stream."""
+    return hmac.new(key=settings.HMAC_SECRET_KEY.encode(), digestmod=hashlib.sha256)
+
+
+def verify_hmac_digest(signer: "hmac.HMAC", signature: str) -> bool:
+    return hmac.compare_digest(signer.hexdigest(), signature)
+
+
 def verify_hmac_signature(data: bytes, signature: str) -> bool:
-    expected_signature = hmac.new(
-        key=settings.HMAC_SECRET_KEY.encode(), msg=data, digestmod=hashlib.sha256
-    ).hexdigest()
-    return hmac.compare_digest(expected_signature, signature)
+    signer = hmac_signer()
+    signer.update(data)
+    return verify_hmac_digest(signer, signature)
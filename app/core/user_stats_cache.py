@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+StatsLoader = Callable[[], Awaitable[Optional[Any]]]
+
+
+class UserStatsCache:
+    """
+    Stale-while-revalidate cache for live osu! profile stats.
+
+    Entries younger than ``fresh_seconds`` are served as is. Older entries are still
+    served immediately while one background task per key refetches them; only
+    entries past ``max_age_seconds`` (or missing) make the caller wait on osu!.
+    Concurrent callers of a missing key share a single fetch. A failed fetch
+    (loader returned None) keeps the previous entry, and for ``negative_ttl_seconds``
+    afterwards the key is answered without asking osu! again: the stale entry if
+    there is one, None otherwise.
+    """
+
+    def __init__(
+        self,
+        fresh_seconds: float = settings.USER_STATS_FRESH_SECONDS,
+        max_age_seconds: float = settings.USER_STATS_MAX_AGE_SECONDS,
+        max_entries: int = settings.USER_STATS_CACHE_MAX_ENTRIES,
+        negative_ttl_seconds: float = settings.USER_STATS_NEGATIVE_TTL_SECONDS,
+    ) -> None:
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max(max_age_seconds, fresh_seconds)
+        self.max_entries = max_entries
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # Key -> monotonic time of its last failed fetch.
+        self._failed: OrderedDict[Hashable, float] = OrderedDict()
+        self._refreshes: dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._fresh_hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._negative_hits = 0
+        self._refresh_failures = 0
+
+    async def get(self, key: Hashable, loader: StatsLoader) -> Optional[Any]:
+        now = monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.max_age_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now - entry[0] < self.fresh_seconds:
+                    self._fresh_hits += 1
+                    return entry[1]
+            failed_at = self._failed.get(key)
+            if failed_at is not None and now - failed_at < self.negative_ttl_seconds:
+                self._negative_hits += 1
+                return entry[1] if entry is not None else None
+            if entry is not None:
+                self._stale_hits += 1
+            else:
+                self._misses += 1
+
+        task = self._ensure_refresh(key, loader)
+        if entry is not None:
+            return entry[1]
+        return await asyncio.shield(task)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (monotonic(), value)
+            self._entries.move_to_end(key)
+            self._failed.pop(key, None)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._failed.clear()
+        self._refreshes.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "fresh_seconds": self.fresh_seconds,
+                "max_age_seconds": self.max_age_seconds,
+                "fresh_hits": self._fresh_hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "negative_ttl_seconds": self.negative_ttl_seconds,
+                "negative_hits": self._negative_hits,
+                "refreshes_in_flight": sum(not task.done() for task in self._refreshes.values()),
+                "refresh_failures": self._refresh_failures,
+            }
+
+    def _ensure_refresh(self, key: Hashable, loader: StatsLoader) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        task = self._refreshes.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._refresh(key, loader))
+            self._refreshes[key] = task
+
+            def forget(done: asyncio.Task) -> None:
+                if self._refreshes.get(key) is done:
+                    del self._refreshes[key]
+
+            task.add_done_callback(forget)
+        return task
+
+    async def _refresh(self, key: Hashable, loader: StatsLoader) -> Optional[Any]:
+        try:
+            value = await loader()
+        except Exception as exc:
+            logger.error(f"User stats refresh for {key} failed: {exc}")
+            value = None
+        if value is None:
+            self._refresh_failures += 1
+            self._remember_failure(key)
+            return None
+        self.put(key, value)
+        return value
+
+    def _remember_failure(self, key: Hashable) -> None:
+        if self.negative_ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._failed[key] = monotonic()
+            self._failed.move_to_end(key)
+            while len(self._failed) > self.max_entries:
+                self._failed.popitem(last=False)
+
+
+user_stats_cache = UserStatsCache()
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.osu_api_client import USERS_LOOKUP_BATCH_SIZE, get_users_by_ids
+from app.crud import crud_cache_generation, crud_user_stats
+from app.db.session import AsyncReadSessionLocal
+from app.db.writer import DatabaseWriter, db_writer
+from app.models.user_stats import UserStats
+
+logger = logging.getLogger(__name__)
+
+UsersFetcher = Callable[[list[int]], Awaitable[list[dict]]]
+
+
+def user_stats_fields_from_osu(data: dict, mode: str = "osu") -> Optional[dict]:
+    statistics = (data.get("statistics_rulesets") or {}).get(mode) or data.get("statistics")
+    if not statistics:
+        return None
+    return {
+        "osu_user_id": data["id"],
+        "username": data["username"],
+        "pp": float(statistics.get("pp") or 0.0),
+        "global_rank": statistics.get("global_rank"),
+        "country_rank": statistics.get("country_rank"),
+        "avatar_url": data.get("avatar_url"),
+        "country_code": data.get("country_code"),
+    }
+
+
+class UserStatsRefresher:
+    """
+    Periodically refreshes stored osu! stats for everyone with a submission.
+
+    Profiles are fetched ``USERS_LOOKUP_BATCH_SIZE`` at a time, stalest first, at
+    IDLE priority, so the refresh only spends rate-limit budget nothing else wants.
+    Request handlers read the ``user_stats`` table instead of calling osu!.
+    Each batch is stored through the writer.
+
+    List pages show stored stats younger than ``max_age_seconds`` and are
+    validated by the submissions generation, so it is bumped when a batch
+    changes a fresh row, and once per run when rows have aged past the max age
+    since the previous run.
+    """
+
+    def __init__(
+        self,
+        fetcher: UsersFetcher = get_users_by_ids,
+        interval_seconds: float = settings.USER_STATS_REFRESH_INTERVAL_SECONDS,
+        writer: DatabaseWriter = db_writer,
+        read_session_factory: async_sessionmaker[AsyncSession] = AsyncReadSessionLocal,
+        max_age_seconds: float = settings.USER_STATS_MAX_AGE_SECONDS,
+    ) -> None:
+        self.fetcher = fetcher
+        self.interval_seconds = interval_seconds
+        self.writer = writer
+        self.read_session_factory = read_session_factory
+        self.max_age_seconds = max_age_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._expired_before: Optional[datetime] = None
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run_once(self) -> int:
+        """Refresh every submitter once. Returns how many profiles were stored."""
+        async with self.read_session_factory() as db:
+            user_ids = await db.run_sync(crud_user_stats.get_submitter_ids_by_staleness)
+        refreshed = 0
+        for start in range(0, len(user_ids), USERS_LOOKUP_BATCH_SIZE):
+            users = await self.fetcher(user_ids[start:start + USERS_LOOKUP_BATCH_SIZE])
+            rows = [row for user in users if (row := user_stats_fields_from_osu(user))]
+            if rows:
+                await self.writer.run(_store_user_stats, rows, self.max_age_seconds)
+            refreshed += len(rows)
+        cutoff = crud_user_stats.stats_cutoff(self.max_age_seconds)
+        await self.writer.run(_expire_user_stats, self._expired_before, cutoff)
+        self._expired_before = cutoff
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                refreshed = await self.run_once()
+                logger.info(f"Refreshed osu! stats for {refreshed} users")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("User stats refresh failed")
+            await asyncio.sleep(self.interval_seconds)
+
+
+def _store_user_stats(db: Session, rows: list[dict], max_age_seconds: float) -> None:
+    shown = crud_user_stats.get_user_stats(db, (row["osu_user_id"] for row in rows), max_age_seconds)
+    changed = any(_differs(shown.get(row["osu_user_id"]), row) for row in rows)
+    crud_user_stats.upsert_user_stats(db, rows)
+    if changed:
+        # List pages show the stored live pp.
+        crud_cache_generation.bump_generation(db, crud_cache_generation.SUBMISSIONS)
+
+
+def _expire_user_stats(db: Session, since: Optional[datetime], until: datetime) -> None:
+    # Rows last updated in [since, until) dropped off list pages since the last run.
+    if crud_user_stats.any_stats_updated_between(db, since, until):
+        crud_cache_generation.bump_generation(db, crud_cache_generation.SUBMISSIONS)
+
+
+def _differs(stored: Optional[UserStats], row: dict) -> bool:
+    return stored is None or any(getattr(stored, column) != value for column, value in row.items())
+
+
+user_stats_refresher = UserStatsRefresher()
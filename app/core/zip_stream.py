@@ -0,0 +1,148 @@
+import hashlib
+import struct
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+# Entries are STORED (replays and compressed reports don't shrink further), so
+# every offset in the archive is known before a byte is read. Local headers carry
+# the CRC and sizes: streaming readers can't find the end of a STORED entry from
+# a data descriptor, so there are none.
+_FLAGS = 0x0800  # UTF-8 names
+_VERSION = 20
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class ZipMember:
+    __slots__ = ("name", "path", "size", "version", "crc")
+
+    def __init__(
+        self, name: str, path: Path, size: int, version: str, crc: Optional[int] = None
+    ) -> None:
+        self.name = name
+        self.path = path
+        self.size = size
+        # Changes whenever the member's bytes could have; feeds the archive ETag.
+        self.version = version
+        # CRC-32 of the file if already known; otherwise it is read to compute it.
+        self.crc = crc
+
+
+class ZipStream:
+    """
+    A ZIP archive of files on disk, generated on demand and addressable by byte.
+
+    The size and layout are computed up front from file sizes alone, so any
+    ``[start, stop)`` slice can be produced without building what comes before
+    it, holding one chunk in memory at a time. A member without a known CRC is
+    read once more to checksum it when its local header or the central
+    directory is sent.
+    """
+
+    def __init__(self, members: list[ZipMember], modified: datetime) -> None:
+        self.members = members
+        self._dos_time, self._dos_date = _dos_timestamp(modified)
+        self._crcs = {index: member.crc for index, member in enumerate(members) if member.crc is not None}
+
+        self._names = [member.name.encode("utf-8") for member in members]
+        self._offsets: list[int] = []
+        offset = 0
+        for member, name in zip(members, self._names):
+            self._offsets.append(offset)
+            offset += _LOCAL_HEADER.size + len(name) + member.size
+        self._central_offset = offset
+        self._central_size = sum(_CENTRAL_HEADER.size + len(name) for name in self._names)
+        self.size = offset + self._central_size + _END_OF_CENTRAL_DIRECTORY.size
+
+        if len(members) > 0xFFFF or self.size > _ZIP32_LIMIT:
+            raise ValueError("Archive needs ZIP64, which is not supported")
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{self._dos_date}:{self._dos_time}".encode())
+        for member in members:
+            digest.update(f"\0{member.name}\0{member.size}\0{member.version}".encode("utf-8"))
+        self.etag = f'"{digest.hexdigest()}"'
+
+    def iter_bytes(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the archive bytes in ``[start, stop)``."""
+        stop = self.size if stop is None else min(stop, self.size)
+        for segment_start, length, produce in self._segments():
+            segment_stop = segment_start + length
+            if segment_stop <= start:
+                continue
+            if segment_start >= stop:
+                return
+            yield from produce(max(start, segment_start) - segment_start, min(stop, segment_stop) - segment_start)
+
+    def _segments(self):
+        for index, (member, name) in enumerate(zip(self.members, self._names)):
+            offset = self._offsets[index]
+            header_size = _LOCAL_HEADER.size + len(name)
+            yield offset, header_size, lambda lo, hi, index=index: iter((self._local_header(index)[lo:hi],))
+            yield offset + header_size, member.size, self._data_producer(index)
+        yield self._central_offset, self._central_size, lambda lo, hi: iter((self._central_directory()[lo:hi],))
+        end = _END_OF_CENTRAL_DIRECTORY.pack(
+            0x06054B50, 0, 0, len(self.members), len(self.members),
+            self._central_size, self._central_offset, 0,
+        )
+        yield self._central_offset + self._central_size, len(end), _static(end)
+
+    def _data_producer(self, index: int):
+        member = self.members[index]
+
+        def produce(lo: int, hi: int) -> Iterator[bytes]:
+            with open(member.path, "rb") as fp:
+                fp.seek(lo)
+                remaining = hi - lo
+                while remaining:
+                    chunk = fp.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise OSError(f"{member.path} is shorter than when the archive was laid out")
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return produce
+
+    def _crc(self, index: int) -> int:
+        if index not in self._crcs:
+            crc = 0
+            with open(self.members[index].path, "rb") as fp:
+                while chunk := fp.read(CHUNK_SIZE):
+                    crc = zlib.crc32(chunk, crc)
+            self._crcs[index] = crc
+        return self._crcs[index]
+
+    def _local_header(self, index: int) -> bytes:
+        size, name = self.members[index].size, self._names[index]
+        return _LOCAL_HEADER.pack(
+            0x04034B50, _VERSION, _FLAGS, 0, self._dos_time, self._dos_date,
+            self._crc(index), size, size, len(name), 0,
+        ) + name
+
+    def _central_directory(self) -> bytes:
+        return b"".join(
+            _CENTRAL_HEADER.pack(
+                0x02014B50, _VERSION, _VERSION, _FLAGS, 0, self._dos_time, self._dos_date,
+                self._crc(index), member.size, member.size, len(name), 0, 0, 0, 0, 0,
+                self._offsets[index],
+            ) + name
+            for index, (member, name) in enumerate(zip(self.members, self._names))
+        )
+
+
+def _static(data: bytes):
+    return lambda lo, hi: iter((data[lo:hi],))
+
+
+def _dos_timestamp(moment: datetime) -> tuple[int, int]:
+    if moment.year < 1980:
+        return 0, (1 << 5) | 1
+    dos_time = (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2)
+    dos_date = ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day
+    return dos_time, dos_date
@@ -1,41 +1,137 @@
-from typing import Optional
+import sqlite3
+from typing import Any, Iterable, Iterator, Sequence, TypeVar
 
+from sqlalchemy import Select, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
+from app.core.beatmap_cache import CachedBeatmap, beatmap_cache
+from app.core.md5_index import md5_membership_index
 from app.models.beatmap import Beatmap
 from app.models.invalid_md5 import InvalidMD5
 
+# Column-only selects: cache misses are filled without building ORM instances.
+CACHED_COLUMNS = tuple(getattr(Beatmap, field) for field in CachedBeatmap.FIELDS)
 
-def get_beatmaps_by_md5(db: Session, md5_hashes: list[str]) -> dict[str, Optional[Beatmap]]:
+# Bound-parameter ceiling per statement (SQLITE_MAX_VARIABLE_NUMBER default).
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+T = TypeVar("T")
+
+
+def chunks(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# The lookups below are split into statement builders and row handling shared
+# with crud_beatmap_async, which only swaps in ``await db.execute``.
+
+
+def missing_keys(keys: Iterable[Any], found: dict) -> list:
+    """Distinct ``keys`` the cache had no entry for, in first-seen order."""
+    return list(dict.fromkeys(key for key in keys if key not in found))
+
+
+def cached_beatmap_lookups(column: Any, keys: list) -> Iterator[Select]:
+    """Column-only selects of the beatmaps whose ``column`` is in ``keys``, chunked."""
+    for chunk in chunks(keys, SQLITE_MAX_VARIABLES):
+        yield select(*CACHED_COLUMNS).where(column.in_(chunk))
+
+
+def cache_beatmap_rows(rows: Iterable[Sequence], found: dict, key: str) -> None:
+    """Cache each row and add it to ``found`` under its ``key`` attribute."""
+    for row in rows:
+        record = CachedBeatmap(*row)
+        beatmap_cache.put(record)
+        found[getattr(record, key)] = record
+
+
+def invalid_md5_lookups(md5_hashes: list[str]) -> Iterator[Select]:
+    for chunk in chunks(list(dict.fromkeys(md5_hashes)), SQLITE_MAX_VARIABLES):
+        yield select(InvalidMD5.md5_hash).where(InvalidMD5.md5_hash.in_(chunk))
+
+
+def get_beatmaps_by_md5(db: Session, md5_hashes: list[str]) -> dict[str, CachedBeatmap]:
     if not md5_hashes:
         return {}
-    beatmaps = db.query(Beatmap).filter(Beatmap.md5_hash.in_(md5_hashes)).all()
-    return {b.md5_hash: b for b in beatmaps}
+    found = beatmap_cache.get_many_by_md5(md5_hashes)
+    for stmt in cached_beatmap_lookups(Beatmap.md5_hash, missing_keys(md5_hashes, found)):
+        cache_beatmap_rows(db.execute(stmt), found, "md5_hash")
+    return found
 
 
-def get_beatmaps_by_ids(db: Session, beatmap_ids: list[int]) -> dict[int, Beatmap]:
+def get_beatmaps_by_ids(db: Session, beatmap_ids: list[int]) -> dict[int, CachedBeatmap]:
     if not beatmap_ids:
         return {}
-    beatmaps = db.query(Beatmap).filter(Beatmap.beatmap_id.in_(beatmap_ids)).all()
-    return {b.beatmap_id: b for b in beatmaps}
+    found = beatmap_cache.get_many_by_id(beatmap_ids)
+    for stmt in cached_beatmap_lookups(Beatmap.beatmap_id, missing_keys(beatmap_ids, found)):
+        cache_beatmap_rows(db.execute(stmt), found, "beatmap_id")
+    return found
 
 
 def create_beatmap(db: Session, beatmap_data: dict) -> Beatmap:
     beatmap = Beatmap(**beatmap_data)
     db.add(beatmap)
     db.flush()
+    beatmap_cache.stage_invalidation(db, md5_hash=beatmap.md5_hash, beatmap_id=beatmap.beatmap_id)
+    md5_membership_index.stage_beatmap(db, beatmap.md5_hash)
     return beatmap
 
 
+def upsert_beatmaps(db: Session, beatmaps_data: list[dict]) -> None:
+    """
+    Write a batch of beatmaps with ``INSERT ... ON CONFLICT (md5_hash) DO UPDATE``.
+
+    Concurrent writers resolving the same hash update the row instead of failing.
+    """
+    if not beatmaps_data:
+        return
+
+    rows_per_statement = max(1, SQLITE_MAX_VARIABLES // len(beatmaps_data[0]))
+    for chunk in chunks(beatmaps_data, rows_per_statement):
+        stmt = sqlite_insert(Beatmap).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Beatmap.md5_hash],
+            set_={
+                column: stmt.excluded[column]
+                for column in chunk[0]
+                if column != "md5_hash"
+            },
+        )
+        db.execute(stmt)
+
+    for data in beatmaps_data:
+        beatmap_cache.stage_invalidation(db, md5_hash=data["md5_hash"], beatmap_id=data["beatmap_id"])
+        md5_membership_index.stage_beatmap(db, data["md5_hash"])
+
+
 def get_invalid_md5s(db: Session, md5_hashes: list[str]) -> set[str]:
     if not md5_hashes:
         return set()
-    invalid = db.query(InvalidMD5.md5_hash).filter(InvalidMD5.md5_hash.in_(md5_hashes)).all()
-    return {md5[0] for md5 in invalid}
+    invalid: set[str] = set()
+    for stmt in invalid_md5_lookups(md5_hashes):
+        invalid.update(db.scalars(stmt))
+    return invalid
 
 
 def create_invalid_md5(db: Session, md5_hash: str, reason: str = "404_not_found") -> InvalidMD5:
     invalid = InvalidMD5(md5_hash=md5_hash, reason=reason)
     db.add(invalid)
     db.flush()
+    md5_membership_index.stage_invalid(db, md5_hash)
     return invalid
+
+
+def insert_invalid_md5s(db: Session, md5_hashes: list[str], reason: str = "404_not_found") -> None:
+    """Record a batch of invalid hashes with ``INSERT ... ON CONFLICT DO NOTHING``."""
+    if not md5_hashes:
+        return
+
+    rows = [{"md5_hash": md5, "reason": reason} for md5 in dict.fromkeys(md5_hashes)]
+    for chunk in chunks(rows, SQLITE_MAX_VARIABLES // 2):
+        stmt = sqlite_insert(InvalidMD5).values(list(chunk))
+        db.execute(stmt.on_conflict_do_nothing(index_elements=[InvalidMD5.md5_hash]))
+
+    for row in rows:
+        md5_membership_index.stage_invalid(db, row["md5_hash"])
@@ -0,0 +1,37 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.beatmap_cache import CachedBeatmap, beatmap_cache
+from app.crud.crud_beatmap import (
+    cache_beatmap_rows,
+    cached_beatmap_lookups,
+    invalid_md5_lookups,
+    missing_keys,
+)
+from app.models.beatmap import Beatmap
+
+
+async def get_beatmaps_by_md5(db: AsyncSession, md5_hashes: list[str]) -> dict[str, CachedBeatmap]:
+    if not md5_hashes:
+        return {}
+    found = beatmap_cache.get_many_by_md5(md5_hashes)
+    for stmt in cached_beatmap_lookups(Beatmap.md5_hash, missing_keys(md5_hashes, found)):
+        cache_beatmap_rows(await db.execute(stmt), found, "md5_hash")
+    return found
+
+
+async def get_beatmaps_by_ids(db: AsyncSession, beatmap_ids: list[int]) -> dict[int, CachedBeatmap]:
+    if not beatmap_ids:
+        return {}
+    found = beatmap_cache.get_many_by_id(beatmap_ids)
+    for stmt in cached_beatmap_lookups(Beatmap.beatmap_id, missing_keys(beatmap_ids, found)):
+        cache_beatmap_rows(await db.execute(stmt), found, "beatmap_id")
+    return found
+
+
+async def get_invalid_md5s(db: AsyncSession, md5_hashes: list[str]) -> set[str]:
+    if not md5_hashes:
+        return set()
+    invalid: set[str] = set()
+    for stmt in invalid_md5_lookups(md5_hashes):
+        invalid.update(await db.scalars(stmt))
+    return invalid
@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.cache_generation import CacheGeneration
+
+# Hall of fame, submission lists and submission detail pages.
+SUBMISSIONS = "submissions"
+
+
+def bump_generation(db: Session, name: str) -> None:
+    """Invalidate every validator derived from ``name``; takes effect on commit."""
+    now = datetime.now(timezone.utc)
+    stmt = sqlite_insert(CacheGeneration).values(name=name, value=1, updated_at=now)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[CacheGeneration.name],
+            set_={"value": CacheGeneration.value + 1, "updated_at": now},
+        )
+    )
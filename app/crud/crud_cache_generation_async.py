@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cache_generation import CacheGeneration
+
+
+async def get_generation(db: AsyncSession, name: str) -> tuple[int, Optional[datetime]]:
+    row = await db.get(CacheGeneration, name)
+    if row is None:
+        return 0, None
+    return row.value, row.updated_at
@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.crud.crud_beatmap import SQLITE_MAX_VARIABLES, chunks
+from app.models.enrich_job import EnrichJob, EnrichJobItem
+
+ITEM_PENDING = "pending"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+
+JOB_PENDING = "pending"
+JOB_COMPLETED = "completed"
+
+
+def create_job(db: Session, job_id: str, md5_hashes: list[str]) -> EnrichJob:
+    job = EnrichJob(id=job_id, total=len(md5_hashes))
+    job.items = [EnrichJobItem(md5_hash=md5) for md5 in md5_hashes]
+    db.add(job)
+    db.flush()
+    return job
+
+
+def get_job(db: Session, job_id: str) -> EnrichJob | None:
+    return db.query(EnrichJob).filter(EnrichJob.id == job_id).first()
+
+
+def get_job_items(db: Session, job_id: str) -> list[EnrichJobItem]:
+    return (
+        db.query(EnrichJobItem)
+        .filter(EnrichJobItem.job_id == job_id)
+        .order_by(EnrichJobItem.id)
+        .all()
+    )
+
+
+def get_pending_items(db: Session, limit: int) -> list[EnrichJobItem]:
+    return (
+        db.query(EnrichJobItem)
+        .filter(EnrichJobItem.status == ITEM_PENDING)
+        .order_by(EnrichJobItem.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def mark_items_done(db: Session, md5_hashes: Iterable[str]) -> set[str]:
+    """Resolve every pending item for these hashes, in any job. Returns the touched job ids."""
+    job_ids: set[str] = set()
+    # One variable is taken by the status.
+    for chunk in chunks(list(dict.fromkeys(md5_hashes)), SQLITE_MAX_VARIABLES - 1):
+        query = db.query(EnrichJobItem).filter(
+            EnrichJobItem.status == ITEM_PENDING,
+            EnrichJobItem.md5_hash.in_(chunk),
+        )
+        job_ids.update(job_id for (job_id,) in query.with_entities(EnrichJobItem.job_id).distinct())
+        query.update({EnrichJobItem.status: ITEM_DONE}, synchronize_session=False)
+    return job_ids
+
+
+def record_failed_attempts(db: Session, item_ids: Iterable[int], max_attempts: int) -> set[str]:
+    """Count a failed lookup against each still-pending item. Returns the touched job ids."""
+    job_ids: set[str] = set()
+    for item_id in item_ids:
+        item = db.get(EnrichJobItem, item_id)
+        if item is None or item.status != ITEM_PENDING:
+            continue
+        item.attempts += 1
+        if item.attempts >= max_attempts:
+            item.status = ITEM_FAILED
+        job_ids.add(item.job_id)
+    return job_ids
+
+
+def complete_finished_jobs(db: Session, job_ids: Iterable[str]) -> None:
+    for job_id in set(job_ids):
+        pending = (
+            db.query(func.count(EnrichJobItem.id))
+            .filter(EnrichJobItem.job_id == job_id, EnrichJobItem.status == ITEM_PENDING)
+            .scalar()
+        )
+        if not pending:
+            db.query(EnrichJob).filter(EnrichJob.id == job_id).update(
+                {EnrichJob.status: JOB_COMPLETED}, synchronize_session=False
+            )
+
+
+def delete_completed_jobs(db: Session, completed_before: datetime) -> int:
+    """Delete jobs completed before ``completed_before`` and their items. Returns the job count."""
+    finished = db.query(EnrichJob).filter(
+        EnrichJob.status == JOB_COMPLETED, EnrichJob.updated_at < completed_before
+    )
+    job_ids = finished.with_entities(EnrichJob.id).scalar_subquery()
+    db.query(EnrichJobItem).filter(EnrichJobItem.job_id.in_(job_ids)).delete(synchronize_session=False)
+    return finished.delete(synchronize_session=False)
@@ -0,0 +1,105 @@
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.hall_of_fame import HallOfFameEntry
+from app.models.submission import Submission
+from app.models.user import User
+
+
+def _ranked_ahead_of(delta_pp: float, submission_id: int):
+    return or_(
+        HallOfFameEntry.delta_pp > delta_pp,
+        and_(HallOfFameEntry.delta_pp == delta_pp, HallOfFameEntry.submission_id < submission_id),
+    )
+
+
+LEADERBOARD_SORT = "leaderboard"
+
+
+def record_submission(db: Session, submission: Submission, user: User) -> HallOfFameEntry:
+    """
+    Fold a new submission into the leaderboard.
+
+    Only a user's best submission is kept, so the entry is replaced when the new one
+    gains more pp and left alone otherwise. Entries between the new and the old
+    rank move down by one; nothing else is touched.
+    """
+    entry = db.get(HallOfFameEntry, user.id)
+    if entry is not None and submission.delta_pp <= entry.delta_pp:
+        return entry
+
+    new_rank = 1 + (
+        db.query(func.count())
+        .select_from(HallOfFameEntry)
+        .filter(
+            HallOfFameEntry.user_id != user.id,
+            _ranked_ahead_of(submission.delta_pp, submission.id),
+        )
+        .scalar()
+    )
+
+    shifted = db.query(HallOfFameEntry).filter(
+        HallOfFameEntry.user_id != user.id, HallOfFameEntry.rank >= new_rank
+    )
+    if entry is not None:
+        shifted = shifted.filter(HallOfFameEntry.rank < entry.rank)
+    shifted.update({HallOfFameEntry.rank: HallOfFameEntry.rank + 1})
+
+    if entry is None:
+        entry = HallOfFameEntry(
+            user_id=user.id,
+            submission_id=submission.id,
+            rank=new_rank,
+            username=user.username,
+            osu_user_id=user.osu_user_id,
+            delta_pp=submission.delta_pp,
+            lost_count=submission.lost_count,
+            scan_timestamp=submission.scan_timestamp,
+        )
+        db.add(entry)
+    else:
+        entry.submission_id = submission.id
+        entry.rank = new_rank
+        entry.username = user.username
+        entry.delta_pp = submission.delta_pp
+        entry.lost_count = submission.lost_count
+        entry.scan_timestamp = submission.scan_timestamp
+    db.flush()
+    return entry
+
+
+def rebuild_leaderboard(db: Session) -> int:
+    """Recompute the whole leaderboard from the submissions table. Returns its size."""
+    db.query(HallOfFameEntry).delete()
+
+    rows = (
+        db.query(Submission, User)
+        .join(User, Submission.user_id == User.id)
+        .order_by(Submission.delta_pp.desc(), Submission.id)
+        .yield_per(1000)
+    )
+    entries: dict[int, HallOfFameEntry] = {}
+    for submission, user in rows:
+        if user.id in entries:
+            continue
+        entries[user.id] = HallOfFameEntry(
+            user_id=user.id,
+            submission_id=submission.id,
+            rank=len(entries) + 1,
+            username=user.username,
+            osu_user_id=user.osu_user_id,
+            delta_pp=submission.delta_pp,
+            lost_count=submission.lost_count,
+            scan_timestamp=submission.scan_timestamp,
+        )
+    db.add_all(entries.values())
+    db.flush()
+    return len(entries)
+
+
+def needs_rebuild(db: Session) -> bool:
+    """True when submissions exist but the leaderboard was never built."""
+    return (
+        db.query(HallOfFameEntry.user_id).first() is None
+        and db.query(Submission.id).first() is not None
+    )
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import Cursor, Page, build_page, keyset_filter
+from app.crud import crud_hall_of_fame
+from app.models.hall_of_fame import HallOfFameEntry
+
+
+async def get_leaderboard_page(
+    db: AsyncSession, limit: int = 100, cursor: Optional[Cursor] = None
+) -> Page[HallOfFameEntry]:
+    stmt = keyset_filter(
+        select(HallOfFameEntry),
+        [(HallOfFameEntry.delta_pp, True), (HallOfFameEntry.submission_id, False)],
+        limit,
+        cursor,
+    )
+    rows = (await db.scalars(stmt)).all()
+    return build_page(
+        rows,
+        lambda entry: (entry.delta_pp, entry.submission_id),
+        crud_hall_of_fame.LEADERBOARD_SORT,
+        limit,
+        cursor,
+    )
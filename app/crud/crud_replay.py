@@ -0,0 +1,41 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.replay import ReplayBlob, SubmissionReplay
+
+
+def add_submission_replays(
+    db: Session, user_id: int, submission_key: str, replays: dict[str, tuple[str, int, int]]
+) -> None:
+    """
+    Write the manifest for a submission, adding blob rows not seen before.
+
+    ``replays`` maps filename to ``(sha256, size, crc32)`` of a blob already in the store.
+    """
+    if not replays:
+        return
+
+    blobs = {sha256: (size, crc32) for sha256, size, crc32 in replays.values()}
+    stmt = sqlite_insert(ReplayBlob).values(
+        [{"sha256": sha256, "size": size, "crc32": crc32} for sha256, (size, crc32) in blobs.items()]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ReplayBlob.sha256],
+            set_={"crc32": func.coalesce(ReplayBlob.crc32, stmt.excluded.crc32)},
+        )
+    )
+    db.add_all(
+        SubmissionReplay(user_id=user_id, submission_key=submission_key, filename=filename, sha256=sha256)
+        for filename, (sha256, _, _) in replays.items()
+    )
+    db.flush()
+
+
+def get_known_blobs(db: Session) -> set[str]:
+    return {sha256 for (sha256,) in db.query(ReplayBlob.sha256)}
+
+
+def is_known_blob(db: Session, sha256: str) -> bool:
+    return db.get(ReplayBlob, sha256) is not None
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.replay import ReplayBlob, SubmissionReplay
+
+
+async def get_submission_replay(
+    db: AsyncSession, user_id: int, submission_key: str, filename: str
+) -> SubmissionReplay | None:
+    stmt = select(SubmissionReplay).where(
+        SubmissionReplay.user_id == user_id,
+        SubmissionReplay.submission_key == submission_key,
+        SubmissionReplay.filename == filename,
+    )
+    return (await db.scalars(stmt)).first()
+
+
+async def get_submission_replays(
+    db: AsyncSession, user_id: int, submission_key: str
+) -> list[tuple[SubmissionReplay, Optional[int]]]:
+    """A submission's manifest rows, each with its blob's CRC-32 if one was recorded."""
+    stmt = (
+        select(SubmissionReplay, ReplayBlob.crc32)
+        .join(ReplayBlob, ReplayBlob.sha256 == SubmissionReplay.sha256)
+        .where(SubmissionReplay.user_id == user_id, SubmissionReplay.submission_key == submission_key)
+        .order_by(SubmissionReplay.filename)
+    )
+    return [(replay, crc32) for replay, crc32 in await db.execute(stmt)]
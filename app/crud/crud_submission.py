@@ -1,6 +1,9 @@
-from sqlalchemy import desc, func
+from typing import Optional
+
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 
+from app.core.pagination import Cursor, Page, keyset_page
 from app.models.submission import Submission
 from app.schemas.submission import SubmissionCreate
 
@@ -8,36 +11,33 @@ from app.schemas.submission import SubmissionCreate
 def create_submission(db: Session, submission: SubmissionCreate, user_id: int) -> Submission:
     db_submission = Submission(**submission.model_dump(), user_id=user_id)
     db.add(db_submission)
-    db.commit()
-    db.refresh(db_submission)
+    db.flush()
     return db_submission
 
 
-def get_recent_submissions(db: Session, limit: int = 100) -> list[Submission]:
-    return (
-        db.query(Submission)
-        .options(joinedload(Submission.user))
-        .order_by(desc(Submission.scan_timestamp))
-        .limit(limit)
-        .all()
-    )
+SORT_RECENT = "recent"
+SORT_DELTA = "delta"
 
+# Each order is backed by a composite index on the submissions table.
+SORT_ORDERS = {
+    SORT_RECENT: (Submission.scan_timestamp, lambda sub: (sub.scan_timestamp, sub.id)),
+    SORT_DELTA: (Submission.delta_pp, lambda sub: (sub.delta_pp, sub.id)),
+}
 
-def get_latest_submission_by_username(db: Session, username: str) -> Submission | None:
-    return (
-        db.query(Submission)
-        .options(joinedload(Submission.user))
-        .filter(func.lower(Submission.username) == username.lower())
-        .order_by(desc(Submission.scan_timestamp))
-        .first()
+
+def get_submissions_page(
+    db: Session, sort: str = SORT_RECENT, limit: int = 100, cursor: Optional[Cursor] = None
+) -> Page[Submission]:
+    column, key_of = SORT_ORDERS[sort]
+    query = db.query(Submission).options(joinedload(Submission.user))
+    return keyset_page(
+        query, [(column, True), (Submission.id, True)], key_of, sort, limit, cursor
     )
 
 
-def get_top_delta_submissions(db: Session, limit: int = 100) -> list[Submission]:
+def backfill_normalized_usernames(db: Session) -> int:
     return (
         db.query(Submission)
-        .options(joinedload(Submission.user))
-        .order_by(desc(Submission.delta_pp))
-        .limit(limit)
-        .all()
+        .filter(Submission.username_normalized.is_(None))
+        .update({Submission.username_normalized: func.lower(Submission.username)}, synchronize_session=False)
     )
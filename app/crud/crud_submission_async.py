@@ -0,0 +1,59 @@
+from typing import Optional
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.core.pagination import Cursor, Page, build_page, keyset_filter
+from app.crud.crud_submission import SORT_ORDERS, SORT_RECENT
+from app.models.submission import Submission, normalize_username
+from app.schemas.submission import SubmissionCreate
+
+
+async def create_submission(db: AsyncSession, submission: SubmissionCreate, user_id: int) -> Submission:
+    db_submission = Submission(**submission.model_dump(), user_id=user_id)
+    db.add(db_submission)
+    await db.flush()
+    return db_submission
+
+
+async def get_submissions_page(
+    db: AsyncSession, sort: str = SORT_RECENT, limit: int = 100, cursor: Optional[Cursor] = None
+) -> Page[Submission]:
+    column, key_of = SORT_ORDERS[sort]
+    stmt = keyset_filter(
+        select(Submission).options(joinedload(Submission.user)),
+        [(column, True), (Submission.id, True)],
+        limit,
+        cursor,
+    )
+    rows = (await db.scalars(stmt)).all()
+    return build_page(rows, key_of, sort, limit, cursor)
+
+
+async def get_latest_submission_by_username(db: AsyncSession, username: str) -> Submission | None:
+    stmt = (
+        select(Submission)
+        .options(joinedload(Submission.user))
+        .where(Submission.username_normalized == normalize_username(username))
+        .order_by(desc(Submission.scan_timestamp))
+        .limit(1)
+    )
+    return (await db.scalars(stmt)).first()
+
+
+async def search_usernames(db: AsyncSession, prefix: str, limit: int = 10) -> list[tuple]:
+    lower = normalize_username(prefix)
+    if not lower:
+        return []
+    upper = lower[:-1] + chr(ord(lower[-1]) + 1)
+
+    # SQLite takes bare columns from the row holding max(), i.e. the latest scan.
+    stmt = (
+        select(Submission.username, func.max(Submission.scan_timestamp))
+        .where(Submission.username_normalized >= lower, Submission.username_normalized < upper)
+        .group_by(Submission.username_normalized)
+        .order_by(Submission.username_normalized)
+        .limit(limit)
+    )
+    return [tuple(row) for row in (await db.execute(stmt)).all()]
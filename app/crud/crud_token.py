@@ -26,8 +26,7 @@ def create_or_update_token(db: Session, token_data: OsuToken, user_id: int) -> T
         )
         db.add(db_token)
 
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
     return db_token
 
 
@@ -40,6 +39,5 @@ def update_refreshed_token(db: Session, db_token: Token, new_token_data: dict) -
     db_token.refresh_token = new_token_data["refresh_token"]
     db_token.expires_at = new_expires_at  # type: ignore
 
-    db.commit()
-    db.refresh(db_token)
+    db.flush()
     return db_token
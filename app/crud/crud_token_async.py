@@ -0,0 +1,8 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.token import Token
+
+
+async def get_token_by_owner_id(db: AsyncSession, owner_id: int) -> Token | None:
+    return (await db.scalars(select(Token).where(Token.owner_id == owner_id))).first()
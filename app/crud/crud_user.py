@@ -14,6 +14,5 @@ def get_user(db: Session, user_id: int):
 def create_user(db: Session, user: UserCreate) -> User:
     db_user = User(osu_user_id=user.osu_user_id, username=user.username)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
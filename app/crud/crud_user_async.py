@@ -0,0 +1,12 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+
+
+async def get_user_by_osu_id(db: AsyncSession, osu_user_id: int) -> User | None:
+    return (await db.scalars(select(User).where(User.osu_user_id == osu_user_id))).first()
+
+
+async def get_user(db: AsyncSession, user_id: int) -> User | None:
+    return await db.get(User, user_id)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.submission import Submission
+from app.models.user import User
+from app.models.user_stats import UserStats
+
+
+def get_submitter_ids_by_staleness(db: Session) -> list[int]:
+    """osu! ids of every user with a submission, never-refreshed and oldest stats first."""
+    rows = (
+        db.query(User.osu_user_id)
+        .join(Submission, Submission.user_id == User.id)
+        .outerjoin(UserStats, UserStats.osu_user_id == User.osu_user_id)
+        .group_by(User.osu_user_id)
+        .order_by(UserStats.updated_at.asc())
+        .all()
+    )
+    return [osu_user_id for (osu_user_id,) in rows]
+
+
+def get_user_stats(db: Session, osu_user_ids: Iterable[int], max_age_seconds: float) -> dict[int, UserStats]:
+    ids = list(dict.fromkeys(osu_user_ids))
+    if not ids:
+        return {}
+    rows = (
+        db.query(UserStats)
+        .filter(UserStats.osu_user_id.in_(ids), UserStats.updated_at >= stats_cutoff(max_age_seconds))
+        .all()
+    )
+    return {row.osu_user_id: row for row in rows}
+
+
+def stats_cutoff(max_age_seconds: float) -> datetime:
+    """Oldest ``updated_at`` still shown; stored naive, in UTC."""
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=max_age_seconds)
+
+
+def any_stats_updated_between(db: Session, start: Optional[datetime], end: datetime) -> bool:
+    query = db.query(UserStats.osu_user_id).filter(UserStats.updated_at < end)
+    if start is not None:
+        query = query.filter(UserStats.updated_at >= start)
+    return query.first() is not None
+
+
+def upsert_user_stats(db: Session, stats: list[dict]) -> None:
+    if not stats:
+        return
+    rows = [dict(row, updated_at=datetime.now(timezone.utc)) for row in stats]
+    stmt = sqlite_insert(UserStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.osu_user_id],
+        set_={column: stmt.excluded[column] for column in rows[0] if column != "osu_user_id"},
+    )
+    db.execute(stmt)
@@ -0,0 +1,21 @@
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_user_stats import stats_cutoff
+from app.models.user_stats import UserStats
+
+
+async def get_user_stats(
+    db: AsyncSession, osu_user_ids: Iterable[int], max_age_seconds: float
+) -> dict[int, UserStats]:
+    ids = list(dict.fromkeys(osu_user_ids))
+    if not ids:
+        return {}
+    rows = await db.scalars(
+        select(UserStats).where(
+            UserStats.osu_user_id.in_(ids), UserStats.updated_at >= stats_cutoff(max_age_seconds)
+        )
+    )
+    return {row.osu_user_id: row for row in rows}
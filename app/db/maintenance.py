@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import sqlite3
+import time
 from pathlib import Path
 
 from app.db.utils import resolve_sqlite_path, ensure_storage_directory
@@ -28,6 +29,42 @@ def create_snapshot(destination: Path) -> Path:
     return destination
 
 
+def collect_replay_garbage(min_age_seconds: float = 3600.0) -> int:
+    """
+    Delete replay files that no blob row points at. Returns how many were removed.
+
+    They are left by uploads that failed before their manifest was committed.
+    Submissions are never deleted, so a blob with a row is always referenced.
+    Anything used or written within ``min_age_seconds`` is kept.
+    """
+    from app.core.replay_store import replay_store
+    from app.crud import crud_replay
+    from app.db.session import SessionLocal
+
+    cutoff = time.time() - min_age_seconds
+    with SessionLocal() as db:
+        known = crud_replay.get_known_blobs(db)
+
+    orphaned = 0
+    for sha256, path in replay_store.iter_blobs():
+        if sha256 in known or path.stat().st_mtime >= cutoff:
+            continue
+        # An upload may reuse the file between the checks above and the unlink. Once
+        # it is set aside later uploads store a new copy, and one that got in first
+        # has touched it or committed its row by now.
+        aside = replay_store.set_aside(sha256)
+        if aside is None:
+            continue
+        with SessionLocal() as db:
+            reused = aside.stat().st_mtime >= cutoff or crud_replay.is_known_blob(db, sha256)
+        if reused:
+            replay_store.restore(sha256, aside)
+        else:
+            aside.unlink()
+            orphaned += 1
+    return orphaned
+
+
 def print_info() -> None:
     """Print basic information about the current SQLite database path."""
     db_path = resolve_sqlite_path()
@@ -61,6 +98,14 @@ def main() -> None:
 
     subparsers.add_parser("info", help="Show database path and WAL status.")
 
+    gc_parser = subparsers.add_parser("gc-replays", help="Delete replay blobs no submission references.")
+    gc_parser.add_argument(
+        "--min-age",
+        type=float,
+        default=3600.0,
+        help="Keep blobs used within this many seconds (default: 3600).",
+    )
+
     args = parser.parse_args()
 
     if args.command == "checkpoint":
@@ -71,6 +116,9 @@ def main() -> None:
         print(f"Snapshot created: {destination}")
     elif args.command == "info":
         print_info()
+    elif args.command == "gc-replays":
+        orphaned = collect_replay_garbage(min_age_seconds=args.min_age)
+        print(f"Removed {orphaned} orphaned replay blobs")
 
 
 if __name__ == "__main__":
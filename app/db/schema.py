@@ -0,0 +1,43 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.db.base import Base
+
+# Indexes replaced by a differently named one; dropped from existing databases.
+RETIRED_INDEXES = (
+    "ix_hall_of_fame_entries_delta_pp_submission_id",
+    "ix_replay_blobs_ref_count",
+)
+# (table, column) pairs removed from a model; dropped after the retired indexes.
+RETIRED_COLUMNS = (("replay_blobs", "ref_count"),)
+
+
+def ensure_schema(engine: Engine) -> None:
+    """
+    Create missing tables, then bring existing tables up to date.
+
+    ``create_all`` skips tables that already exist, so columns and indexes added
+    to a model later are created here, and retired indexes and columns are
+    dropped. New columns must be nullable. Everything runs on one connection, so the writer's
+    single-connection pool is enough.
+    """
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(
+                        text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+                    )
+        for name in RETIRED_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+        for table_name, column_name in RETIRED_COLUMNS:
+            if column_name in {column["name"] for column in inspector.get_columns(table_name)}:
+                connection.execute(text(f'ALTER TABLE "{table_name}" DROP COLUMN "{column_name}"'))
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
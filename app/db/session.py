@@ -1,10 +1,42 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.sqlite_profile import SqliteOptimizer, install_sqlite_profile
 import os
 
+# Sync reads (auth dependencies, startup loads). query_only, so a stray write
+# fails here instead of competing with the writer for the lock.
 engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+install_sqlite_profile(engine, read_only=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """Same database through the aiosqlite driver (sqlite:///x -> sqlite+aiosqlite:///x)."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# query_only pool for read endpoints: with WAL, readers never wait on the writer,
+# and they don't queue for connections held by write transactions either. Objects
+# stay loaded after commit: an AsyncSession cannot lazy-load expired attributes.
+async_read_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL), pool_size=settings.SQLITE_READ_POOL_SIZE
+)
+install_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+# The only connection request handlers write through; owned by app.db.writer.
+write_engine = create_engine(
+    settings.DATABASE_URL, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0
+)
+install_sqlite_profile(write_engine)
+WriteSessionLocal = sessionmaker(bind=write_engine, autoflush=False, expire_on_commit=False)
+
+# ANALYZE writes its statistics, so it needs the write connection.
+sqlite_optimizer = SqliteOptimizer(write_engine)
+
 storage_dir = os.path.dirname(settings.DATABASE_URL.split("///")[1])
 os.makedirs(storage_dir, exist_ok=True)
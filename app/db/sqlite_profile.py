@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import Engine, event, text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def _choice(name: str, value: str, allowed: set[str]) -> str:
+    value = value.upper()
+    if value not in allowed:
+        raise ValueError(f"{name} must be one of {sorted(allowed)}, got {value!r}")
+    return value
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    """PRAGMA statements run on every new connection, in order."""
+    pragmas = [
+        f"PRAGMA journal_mode={_choice('SQLITE_JOURNAL_MODE', settings.SQLITE_JOURNAL_MODE, _JOURNAL_MODES)}",
+        f"PRAGMA synchronous={_choice('SQLITE_SYNCHRONOUS', settings.SQLITE_SYNCHRONOUS, _SYNCHRONOUS)}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size={-int(settings.SQLITE_CACHE_SIZE_KIB)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_BYTES)}",
+        f"PRAGMA temp_store={_choice('SQLITE_TEMP_STORE', settings.SQLITE_TEMP_STORE, _TEMP_STORE)}",
+    ]
+    if read_only:
+        # Any write through a read connection fails instead of taking the write lock.
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def install_sqlite_profile(engine: Engine, read_only: bool = False) -> None:
+    """
+    Apply the configured PRAGMAs to every connection ``engine`` opens.
+
+    For an ``AsyncEngine`` pass its ``sync_engine``. Non-SQLite engines are left alone.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class SqliteOptimizer:
+    """
+    Runs ``PRAGMA optimize`` periodically and once at shutdown.
+
+    Connections here live for the whole process, so SQLite's advice to optimize
+    before closing each connection never kicks in on its own; this keeps the query
+    planner's statistics current as tables grow.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        interval_seconds: float = settings.SQLITE_OPTIMIZE_INTERVAL_SECONDS,
+    ) -> None:
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or self.engine.dialect.name != "sqlite":
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await asyncio.to_thread(self._optimize_logged)
+
+    def optimize(self) -> None:
+        with self.engine.connect() as connection:
+            connection.execute(text("PRAGMA optimize"))
+
+    def _optimize_logged(self) -> None:
+        try:
+            self.optimize()
+        except Exception as exc:
+            logger.error(f"PRAGMA optimize failed: {exc}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await asyncio.to_thread(self._optimize_logged)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from time import monotonic
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.session import WriteSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[..., T]
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """
+    One thread that owns the write connection and group-commits queued writes.
+
+    Callers queue ``op(db, *args)`` and get its return value back through a future.
+    The thread takes everything queued (up to ``max_batch``, waiting at most
+    ``batch_window_ms`` for more) and runs it in one transaction with one commit,
+    so a burst of writes shares a single lock acquisition instead of contending
+    for it. Ops must not commit.
+
+    If any op in a batch raises, the batch is rolled back and its ops are retried
+    in a transaction each, so only the failing op's caller sees the exception.
+    Returned ORM objects are detached with their loaded state.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker[Session],
+        max_batch: int = settings.DB_WRITER_MAX_BATCH,
+        batch_window_ms: float = settings.DB_WRITER_BATCH_WINDOW_MS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.batch_window = max(0.0, batch_window_ms) / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._ops = 0
+        self._largest_batch = 0
+        self._split_batches = 0
+        self._failures = 0
+
+    def submit(self, op: WriteOp[T], *args: Any) -> Future[T]:
+        future: Future[T] = Future()
+        self._ensure_started()
+        self._queue.put((op, args, future))
+        return future
+
+    async def run(self, op: WriteOp[T], *args: Any) -> T:
+        """Queue ``op(db, *args)`` and wait for its batch to commit."""
+        return await asyncio.wrap_future(self.submit(op, *args))
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Commit what is already queued, then stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self._batches,
+            "ops": self._ops,
+            "largest_batch": self._largest_batch,
+            "split_batches": self._split_batches,
+            "failed_ops": self._failures,
+        }
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Callers that were cancelled while queued don't get their op run.
+            batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+            if batch:
+                self._execute(batch)
+            if stopping:
+                return
+
+    def _execute(self, batch: list[tuple[WriteOp, tuple, Future]]) -> None:
+        try:
+            results = self._transaction(batch)
+        except Exception as exc:
+            if len(batch) == 1:
+                self._failures += 1
+                batch[0][2].set_exception(exc)
+                return
+            logger.warning(f"Write batch of {len(batch)} failed ({exc}); retrying ops one by one")
+            self._split_batches += 1
+            for entry in batch:
+                self._execute([entry])
+            return
+
+        self._batches += 1
+        self._ops += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _transaction(self, batch: list[tuple[WriteOp, tuple, Future]]) -> list[Any]:
+        with self.session_factory() as db:
+            results = [op(db, *args) for op, args, _ in batch]
+            db.commit()
+        return results
+
+
+db_writer = DatabaseWriter(WriteSessionLocal)
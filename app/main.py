@@ -1,15 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
 
 from app.api.api import api_router
-from app.db.base import Base
-from app.db.session import engine
-from app.core.config import settings
+from app.db.schema import ensure_schema
+from app.db.session import SessionLocal, sqlite_optimizer, write_engine
+from app.db.writer import db_writer
+from app.core.http_client import get_osu_http_client, close_osu_http_client
+from app.core.beatmap_enrichment import beatmap_enrichment_engine
+from app.core.osu_api_client import client_credentials_token_manager
+from app.core.enrich_jobs import enrich_job_runner
+from app.core.md5_index import md5_membership_index
+from app.core.user_stats_refresher import user_stats_refresher
+from app.crud import crud_hall_of_fame, crud_submission
+
+ensure_schema(write_engine)
+
+
+def _load_md5_index() -> None:
+    with SessionLocal() as db:
+        md5_membership_index.load(db)
+
+
+def _backfill_derived_data(db: Session) -> None:
+    # Once for databases that predate the materialized leaderboard or the
+    # normalized username column; no-ops afterwards.
+    crud_submission.backfill_normalized_usernames(db)
+    if crud_hall_of_fame.needs_rebuild(db):
+        crud_hall_of_fame.rebuild_leaderboard(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(_load_md5_index)
+    await db_writer.run(_backfill_derived_data)
+    get_osu_http_client()
+    client_credentials_token_manager.start()
+    enrich_job_runner.start()
+    user_stats_refresher.start()
+    sqlite_optimizer.start()
+    try:
+        yield
+    finally:
+        await sqlite_optimizer.stop()
+        await user_stats_refresher.stop()
+        await enrich_job_runner.stop()
+        await client_credentials_token_manager.stop()
+        await beatmap_enrichment_engine.shutdown()
+        await asyncio.to_thread(db_writer.stop)
+        await close_osu_http_client()
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="osu! Lost Scores API",
+    lifespan=lifespan,
     openapi_url="/api/openapi.json",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
@@ -28,6 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 app.include_router(api_router, prefix="/api")
@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class CacheGeneration(Base):
+    """Counter bumped whenever the data behind a group of cached responses changes."""
+
+    __tablename__ = "cache_generations"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now)
+
+    def __init__(self, name: str, value: int = 0):
+        super().__init__()
+        self.name = name
+        self.value = value
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from sqlalchemy import Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship, Mapped, mapped_column
+from app.db.base import Base
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class EnrichJob(Base):
+    __tablename__ = "enrich_jobs"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    total: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now, onupdate=utc_now)
+
+    items = relationship(
+        "EnrichJobItem", back_populates="job", cascade="all, delete-orphan"
+    )
+
+    def __init__(self, id: str, total: int, status: str = "pending"):
+        super().__init__()
+        self.id = id
+        self.total = total
+        self.status = status
+
+
+class EnrichJobItem(Base):
+    __tablename__ = "enrich_job_items"
+    __table_args__ = (
+        Index("ix_enrich_job_items_status_id", "status", "id"),
+        Index("ix_enrich_job_items_md5_hash", "md5_hash"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    job_id: Mapped[str] = mapped_column(
+        String, ForeignKey("enrich_jobs.id"), index=True, nullable=False
+    )
+    md5_hash: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    job = relationship("EnrichJob", back_populates="items")
+
+    def __init__(self, md5_hash: str, status: str = "pending"):
+        super().__init__()
+        self.md5_hash = md5_hash
+        self.status = status
+        self.attempts = 0
@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, ForeignKey, DateTime, Float, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class HallOfFameEntry(Base):
+    """
+    Materialized leaderboard: each user's best submission with its precomputed rank.
+
+    Ordered by ``delta_pp`` descending, earlier submissions first on ties.
+    """
+
+    __tablename__ = "hall_of_fame_entries"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    submission_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("submissions.id"), nullable=False
+    )
+    rank: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    username: Mapped[str] = mapped_column(String, nullable=False)
+    osu_user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    delta_pp: Mapped[float] = mapped_column(Float, nullable=False)
+    lost_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    scan_timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __init__(
+        self,
+        user_id: int,
+        submission_id: int,
+        rank: int,
+        username: str,
+        osu_user_id: int,
+        delta_pp: float,
+        lost_count: int,
+        scan_timestamp: datetime,
+    ):
+        super().__init__()
+        self.user_id = user_id
+        self.submission_id = submission_id
+        self.rank = rank
+        self.username = username
+        self.osu_user_id = osu_user_id
+        self.delta_pp = delta_pp
+        self.lost_count = lost_count
+        self.scan_timestamp = scan_timestamp
+
+
+# Same order as the leaderboard keyset, so pages are read straight off the index.
+Index(
+    "ix_hall_of_fame_entries_delta_pp_desc_submission_id",
+    HallOfFameEntry.delta_pp.desc(),
+    HallOfFameEntry.submission_id,
+)
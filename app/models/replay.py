@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class ReplayBlob(Base):
+    """
+    One stored replay file, addressed by the SHA-256 of its contents.
+
+    Manifest rows reference it by hash. ``python -m app.db.maintenance gc-replays``
+    removes files that never got a row.
+    """
+
+    __tablename__ = "replay_blobs"
+
+    sha256: Mapped[str] = mapped_column(String, primary_key=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    # NULL for blobs stored before it was recorded; exports then checksum the file.
+    crc32: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now)
+
+    def __init__(self, sha256: str, size: int, crc32: Optional[int] = None):
+        super().__init__()
+        self.sha256 = sha256
+        self.size = size
+        self.crc32 = crc32
+
+
+class SubmissionReplay(Base):
+    """Manifest row: a replay filename within one submission and the blob it resolves to."""
+
+    __tablename__ = "submission_replays"
+    __table_args__ = (
+        UniqueConstraint("submission_key", "filename", name="uq_submission_replays_submission_key_filename"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # The submission's storage id (the uuid in its report path and download URLs)
+    submission_key: Mapped[str] = mapped_column(String, nullable=False)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    sha256: Mapped[str] = mapped_column(String, ForeignKey("replay_blobs.sha256"), nullable=False, index=True)
+
+    def __init__(self, user_id: int, submission_key: str, filename: str, sha256: str):
+        super().__init__()
+        self.user_id = user_id
+        self.submission_key = submission_key
+        self.filename = filename
+        self.sha256 = sha256
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
-from sqlalchemy import Integer, String, ForeignKey, DateTime, Float
+from typing import Optional
+from sqlalchemy import Integer, String, ForeignKey, DateTime, Float, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.db.base import Base
 
@@ -8,29 +9,58 @@ def utc_now():
     return datetime.now(timezone.utc)
 
 
+def normalize_username(username: str) -> str:
+    # Matches SQLite's lower() for the ASCII names osu! allows.
+    return username.lower()
+
+
 class Submission(Base):
     __tablename__ = "submissions"
+    __table_args__ = (
+        Index("ix_submissions_delta_pp_id", "delta_pp", "id"),
+        Index("ix_submissions_scan_timestamp_id", "scan_timestamp", "id"),
+        Index(
+            "ix_submissions_username_normalized_scan_timestamp",
+            "username_normalized",
+            "scan_timestamp",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id"), nullable=False
     )
-    total_pp_gain: Mapped[float] = mapped_column(Float, nullable=False)
-    lost_scores_count: Mapped[int] = mapped_column(Integer, nullable=False)
-    submission_date: Mapped[datetime] = mapped_column(DateTime, default=utc_now)
-    report_path: Mapped[str] = mapped_column(String, nullable=False)
+    username: Mapped[str] = mapped_column(String, nullable=False)
+    # Lowercased username for indexed case-insensitive lookups; set from username.
+    username_normalized: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    scan_timestamp: Mapped[datetime] = mapped_column(DateTime, default=utc_now)
+    lost_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    current_pp: Mapped[float] = mapped_column(Float, nullable=False)
+    potential_pp: Mapped[float] = mapped_column(Float, nullable=False)
+    delta_pp: Mapped[float] = mapped_column(Float, nullable=False)
+    thin_json_path: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now)
 
     user = relationship("User", back_populates="submissions")
 
     def __init__(
         self,
         user_id: int,
-        total_pp_gain: float,
-        lost_scores_count: int,
-        report_path: str,
+        username: str,
+        scan_timestamp: datetime,
+        lost_count: int,
+        current_pp: float,
+        potential_pp: float,
+        delta_pp: float,
+        thin_json_path: str,
     ):
         super().__init__()
         self.user_id = user_id
-        self.total_pp_gain = total_pp_gain
-        self.lost_scores_count = lost_scores_count
-        self.report_path = report_path
+        self.username = username
+        self.username_normalized = normalize_username(username)
+        self.scan_timestamp = scan_timestamp
+        self.lost_count = lost_count
+        self.current_pp = current_pp
+        self.potential_pp = potential_pp
+        self.delta_pp = delta_pp
+        self.thin_json_path = thin_json_path
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import Integer, String, Float, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class UserStats(Base):
+    """Latest osu! profile statistics for a user, refreshed in the background."""
+
+    __tablename__ = "user_stats"
+
+    osu_user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    username: Mapped[str] = mapped_column(String, nullable=False)
+    pp: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    global_rank: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    country_rank: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    avatar_url: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    country_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utc_now, index=True)
+
+    def __init__(
+        self,
+        osu_user_id: int,
+        username: str,
+        pp: float = 0.0,
+        global_rank: Optional[int] = None,
+        country_rank: Optional[int] = None,
+        avatar_url: Optional[str] = None,
+        country_code: Optional[str] = None,
+        updated_at: Optional[datetime] = None,
+    ):
+        super().__init__()
+        self.osu_user_id = osu_user_id
+        self.username = username
+        self.pp = pp
+        self.global_rank = global_rank
+        self.country_rank = country_rank
+        self.avatar_url = avatar_url
+        self.country_code = country_code
+        self.updated_at = updated_at or utc_now()
@@ -0,0 +1,177 @@
+"""
+Request latency under mixed read/write load: sync Session vs AsyncSession (aiosqlite).
+
+Every simulated request awaits a short upstream call (``--io-ms``) and then either
+reads a page of submissions or inserts one, all on a single event loop like the
+API process. The sync layer runs its queries inline, blocking the loop the way the
+old ``Session``-based async routes did. The async layer is set up like the app:
+reads on a query_only aiosqlite pool of ``SQLITE_READ_POOL_SIZE`` connections,
+writes queued to a ``DatabaseWriter`` on its own single-connection engine.
+
+    python -m benchmarks.bench_db_layers --requests 2000 --concurrency 50 --write-ratio 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud import crud_submission, crud_submission_async
+from app.db.base import Base
+from app.db.session import async_database_url
+from app.db.sqlite_profile import install_sqlite_profile
+from app.db.writer import DatabaseWriter
+from app.models.submission import Submission
+from app.models.token import Token  # noqa: F401  (mapper configuration)
+from app.models.user import User
+from app.schemas.submission import SubmissionCreate
+
+PAGE_SIZE = 50
+SEED_USERS = 200
+SEED_SUBMISSIONS = 5000
+
+
+def _enable_wal(dbapi_connection, _record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _submission(rng: random.Random, index: int) -> SubmissionCreate:
+    current_pp = rng.uniform(1000, 12000)
+    delta_pp = rng.uniform(0, 500)
+    return SubmissionCreate(
+        username=f"player{index % SEED_USERS}",
+        scan_timestamp=datetime(2024, 1, 1) + timedelta(minutes=index),
+        lost_count=rng.randint(0, 300),
+        current_pp=current_pp,
+        potential_pp=current_pp + delta_pp,
+        delta_pp=delta_pp,
+        thin_json_path=f"storage/reports/{index}.json",
+    )
+
+
+def seed(url: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[User.__table__, Submission.__table__])
+    rng = random.Random(0)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all(User(osu_user_id=index + 1, username=f"player{index}") for index in range(SEED_USERS))
+        db.flush()
+        db.add_all(
+            Submission(**_submission(rng, index).model_dump(), user_id=index % SEED_USERS + 1)
+            for index in range(SEED_SUBMISSIONS)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def _plan(requests: int, write_ratio: float) -> list[bool]:
+    rng = random.Random(1)
+    return [rng.random() < write_ratio for _ in range(requests)]
+
+
+async def run_sync(url: str, plan: list[bool], concurrency: int, io_ms: float) -> list[float]:
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _enable_wal)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(2)
+
+    async def one(index: int, is_write: bool) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await asyncio.sleep(io_ms / 1000)
+            with session_factory() as db:
+                if is_write:
+                    crud_submission.create_submission(
+                        db, _submission(rng, SEED_SUBMISSIONS + index), user_id=index % SEED_USERS + 1
+                    )
+                    db.commit()
+                else:
+                    crud_submission.get_submissions_page(db, limit=PAGE_SIZE)
+            return (time.perf_counter() - started) * 1000
+
+    try:
+        return list(await asyncio.gather(*(one(i, w) for i, w in enumerate(plan))))
+    finally:
+        engine.dispose()
+
+
+async def run_async(url: str, plan: list[bool], concurrency: int, io_ms: float) -> list[float]:
+    read_engine = create_async_engine(async_database_url(url), pool_size=settings.SQLITE_READ_POOL_SIZE)
+    install_sqlite_profile(read_engine.sync_engine, read_only=True)
+    read_session_factory = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
+    write_engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0)
+    install_sqlite_profile(write_engine)
+    writer = DatabaseWriter(sessionmaker(bind=write_engine, autoflush=False, expire_on_commit=False))
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(2)
+
+    async def one(index: int, is_write: bool) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await asyncio.sleep(io_ms / 1000)
+            if is_write:
+                await writer.run(
+                    crud_submission.create_submission,
+                    _submission(rng, SEED_SUBMISSIONS + index),
+                    index % SEED_USERS + 1,
+                )
+            else:
+                async with read_session_factory() as db:
+                    await crud_submission_async.get_submissions_page(db, limit=PAGE_SIZE)
+            return (time.perf_counter() - started) * 1000
+
+    try:
+        return list(await asyncio.gather(*(one(i, w) for i, w in enumerate(plan))))
+    finally:
+        writer.stop()
+        write_engine.dispose()
+        await read_engine.dispose()
+
+
+def _report(label: str, samples: list[float], elapsed: float) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    print(
+        f"{label:<6} requests={len(samples):<6} "
+        f"throughput={len(samples) / elapsed:8.1f}/s "
+        f"mean={statistics.mean(samples):8.2f}ms "
+        f"p50={statistics.median(samples):8.2f}ms "
+        f"p99={p99:8.2f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--io-ms", type=float, default=2.0, help="Simulated upstream await per request.")
+    args = parser.parse_args()
+
+    plan = _plan(args.requests, args.write_ratio)
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, runner in (("sync", run_sync), ("async", run_async)):
+            # Fresh database per layer so both see the same table sizes.
+            url = f"sqlite:///{Path(tmp) / label}.db"
+            seed(url)
+            started = time.perf_counter()
+            samples = await runner(url, plan, args.concurrency, args.io_ms)
+            _report(label, samples, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
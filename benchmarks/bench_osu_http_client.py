@@ -0,0 +1,112 @@
+"""
+Latency per call: shared pooled osu! client vs a fresh httpx.AsyncClient per call.
+
+By default the benchmark talks to a tiny keep-alive HTTP server started in-process,
+so it isolates client/connection setup cost. Point it at the real API to include
+TLS handshakes:
+
+    python -m benchmarks.bench_osu_http_client --url https://osu.ppy.sh/api/v2/seasonal-backgrounds
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.core.http_client import create_osu_http_client
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: 2\r\n"
+    b"Connection: keep-alive\r\n\r\n{}"
+)
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            if not request:
+                break
+            writer.write(RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _timed(call) -> float:
+    started = time.perf_counter()
+    await call()
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_pooled(url: str, calls: int, concurrency: int) -> list[float]:
+    client = create_osu_http_client()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            return await _timed(lambda: client.get(url))
+
+    try:
+        return list(await asyncio.gather(*(one() for _ in range(calls))))
+    finally:
+        await client.aclose()
+
+
+async def run_per_call(url: str, calls: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request() -> None:
+        async with httpx.AsyncClient() as client:
+            await client.get(url)
+
+    async def one() -> float:
+        async with semaphore:
+            return await _timed(request)
+
+    return list(await asyncio.gather(*(one() for _ in range(calls))))
+
+
+def _report(label: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    print(
+        f"{label:<10} calls={len(samples):<5} "
+        f"mean={statistics.mean(samples):7.2f}ms "
+        f"p50={statistics.median(samples):7.2f}ms "
+        f"p99={p99:7.2f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Target URL (default: local keep-alive server).")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}/api/v2/me"
+
+    try:
+        _report("pooled", await run_pooled(url, args.calls, args.concurrency))
+        _report("per-call", await run_per_call(url, args.calls, args.concurrency))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
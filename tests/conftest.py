@@ -2,46 +2,100 @@ import pytest
 import sys
 import os
 import datetime
-from typing import Generator
+import shutil
+import tempfile
+from typing import AsyncGenerator, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.main import app
 from app.db.base import Base
-from app.api.deps import get_db
+from app.api.deps import get_async_read_db, get_db, get_db_writer
 from app.core import security
+from app.core.beatmap_cache import beatmap_cache
+from app.core.md5_index import md5_membership_index
+from app.core.report_cache import report_cache
+from app.core.user_stats_cache import user_stats_cache
+from app.db.session import async_database_url
+from app.db.sqlite_profile import install_sqlite_profile
+from app.db.writer import DatabaseWriter
 from app.models.user import User
 from app.models.token import Token
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# A file database, so the sync session and the async endpoints see the same data.
+TEST_DB_DIR = tempfile.mkdtemp(prefix="lost-scores-tests-")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_DIR}/test.db"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+install_sqlite_profile(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Each TestClient request runs on its own event loop; aiosqlite connections can't
+# be shared between loops, so the async side doesn't pool.
+async_read_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+install_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+TestingAsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+test_db_writer = DatabaseWriter(sessionmaker(bind=engine, autoflush=False, expire_on_commit=False))
+
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_db():
     Base.metadata.create_all(bind=engine)
     yield
+    test_db_writer.stop()
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    shutil.rmtree(TEST_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # Tables are emptied after each test; cached rows must not leak across tests.
+    beatmap_cache.clear()
+    md5_membership_index.clear()
+    report_cache.clear()
+    user_stats_cache.clear()
+    yield
+    beatmap_cache.clear()
+    md5_membership_index.clear()
+    report_cache.clear()
+    user_stats_cache.clear()
 
 
 @pytest.fixture(scope="function")
 def db_session() -> Generator[Session, None, None]:
-    connection = engine.connect()
-    transaction = connection.begin()
-    db = TestingSessionLocal(bind=connection)
+    db = TestingSessionLocal()
     try:
         yield db
     finally:
         db.close()
-        transaction.rollback()
-        connection.close()
+        # Async endpoints commit through their own connections, so there is no
+        # single transaction to roll back; empty every table instead.
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+
+@pytest.fixture(scope="function")
+def async_read_session_factory(db_session: Session) -> async_sessionmaker[AsyncSession]:
+    return TestingAsyncReadSessionLocal
+
+
+@pytest.fixture(scope="function")
+def db_writer(db_session: Session) -> DatabaseWriter:
+    return test_db_writer
+
+
+async def override_get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with TestingAsyncReadSessionLocal() as db:
+        yield db
 
 
 @pytest.fixture(scope="function")
@@ -50,6 +104,8 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+    app.dependency_overrides[get_db_writer] = lambda: test_db_writer
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -83,6 +139,8 @@ def authenticated_client(db_session: Session, test_user_with_token: User):  # ty
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+    app.dependency_overrides[get_db_writer] = lambda: test_db_writer
 
     session_jwt = security.create_session_token(
         data={"sub": str(test_user_with_token.id)}
@@ -0,0 +1,85 @@
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core.beatmap_cache import BeatmapCache, CachedBeatmap, beatmap_cache
+from app.crud import crud_beatmap
+from app.models.beatmap import Beatmap
+
+
+def _record(beatmap_id: int, md5: str) -> CachedBeatmap:
+    return CachedBeatmap(beatmap_id, beatmap_id * 10, "ranked", md5, "A", "T", "C", "V", 10, 20)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = BeatmapCache(max_entries=2, ttl_seconds=60)
+    cache.put(_record(1, "a"))
+    cache.put(_record(2, "b"))
+    cache.get_many_by_md5(["a"])
+    cache.put(_record(3, "c"))
+
+    assert set(cache.get_many_by_md5(["a", "b", "c"])) == {"a", "c"}
+    assert cache.get_many_by_id([1, 3]).keys() == {1, 3}
+    metrics = cache.metrics()
+    assert metrics["evictions"] == 1
+    assert metrics["entries"] == 2
+    assert metrics["approx_bytes"] > 0
+
+
+def test_entries_expire_after_ttl():
+    cache = BeatmapCache(max_entries=10, ttl_seconds=0.01)
+    cache.put(_record(1, "a"))
+    time.sleep(0.02)
+
+    assert cache.get_many_by_md5(["a"]) == {}
+    assert cache.metrics()["expirations"] == 1
+
+
+def test_crud_serves_repeat_lookups_from_cache(db_session: Session):
+    db_session.add(
+        Beatmap(
+            beatmap_id=7,
+            beatmapset_id=70,
+            ranked_status="ranked",
+            md5_hash="md5-7",
+            artist="Artist",
+            title="Title",
+            creator="Creator",
+            version="Hard",
+            hit_objects=100,
+            max_combo=800,
+        )
+    )
+    db_session.commit()
+
+    first = crud_beatmap.get_beatmaps_by_md5(db_session, ["md5-7"])
+    assert first["md5-7"].title == "Title"
+
+    db_session.query(Beatmap).filter_by(md5_hash="md5-7").update({"title": "Changed"})
+    assert crud_beatmap.get_beatmaps_by_ids(db_session, [7])[7].title == "Title"
+    assert beatmap_cache.metrics()["hits"] == 1
+
+
+def test_create_beatmap_invalidates_cache(db_session: Session):
+    beatmap_cache.put(_record(8, "md5-8"))
+
+    crud_beatmap.create_beatmap(
+        db_session,
+        {
+            "beatmap_id": 9,
+            "beatmapset_id": 90,
+            "ranked_status": "ranked",
+            "md5_hash": "md5-8",
+            "artist": "New",
+            "title": "New",
+            "creator": "New",
+            "version": "New",
+            "hit_objects": 1,
+            "max_combo": 1,
+        },
+    )
+    # Until the commit, readers still see the old row; so does the cache.
+    assert "md5-8" in beatmap_cache.get_many_by_md5(["md5-8"])
+
+    db_session.commit()
+    assert beatmap_cache.get_many_by_md5(["md5-8"]) == {}
@@ -1,11 +1,20 @@
 import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
 import pytest
 
 from fastapi.testclient import TestClient
 
+from app.api.endpoints import beatmap
+from app.core import osu_api_client
+from app.core.beatmap_enrichment import BeatmapEnrichmentEngine, beatmap_enrichment_engine
+from app.core.enrich_jobs import EnrichJobRunner
+from app.core.rate_limiter import osu_api_rate_limiter
+from app.crud import crud_enrich_job
 from app.models.beatmap import Beatmap
+from app.models.enrich_job import EnrichJob, EnrichJobItem
 from app.models.invalid_md5 import InvalidMD5
-from app.api.endpoints import beatmap as beatmap_endpoint
 
 
 class MockResponse:
@@ -32,7 +41,7 @@ class MockAsyncClient:
     async def __aexit__(self, exc_type, exc, tb) -> None:
         return None
 
-    async def get(self, url, headers):  # noqa: ANN001
+    async def get(self, url, headers, **kwargs):  # noqa: ANN001
         try:
             response = self._responses[self._index]
         except IndexError:
@@ -42,12 +51,20 @@ class MockAsyncClient:
         return response
 
 
+def _mock_osu_api(monkeypatch, responses: list[MockResponse]) -> None:
+    async def fake_token() -> str:
+        return "token"
+
+    mock_client = MockAsyncClient(responses)
+    monkeypatch.setattr(osu_api_client, "get_osu_http_client", lambda: mock_client)
+    monkeypatch.setattr(osu_api_client, "get_client_credentials_token", fake_token)
+
+
 @pytest.fixture(autouse=True)
 def reset_rate_limiter():
-    limiter = beatmap_endpoint.osu_api_rate_limiter
-    limiter._timestamps.clear()  # type: ignore[attr-defined]
+    asyncio.run(osu_api_rate_limiter.reset())
     yield
-    limiter._timestamps.clear()  # type: ignore[attr-defined]
+    asyncio.run(osu_api_rate_limiter.reset())
 
 
 def test_enrich_returns_cached_data(db_session, client: TestClient, monkeypatch):
@@ -70,12 +87,7 @@ def test_enrich_returns_cached_data(db_session, client: TestClient, monkeypatch)
     async def fail_fetch(*args, **kwargs):  # noqa: ANN001
         raise AssertionError("osu! API should not be called for cached beatmaps")
 
-    monkeypatch.setattr(beatmap_endpoint, "fetch_beatmap_by_md5", fail_fetch)
-
-    async def fake_token() -> str:
-        return "token"
-
-    monkeypatch.setattr(beatmap_endpoint, "get_client_credentials_token", fake_token)
+    monkeypatch.setattr(beatmap_enrichment_engine, "fetcher", fail_fetch)
 
     response = client.post("/api/beatmaps/enrich", json={"md5_hashes": [md5]})
     assert response.status_code == 200
@@ -106,12 +118,7 @@ def test_enrich_fetches_and_saves_missing_map(db_session, client: TestClient, mo
         )
     ]
 
-    monkeypatch.setattr(beatmap_endpoint.httpx, "AsyncClient", lambda *a, **k: MockAsyncClient(responses))
-
-    async def fake_token() -> str:
-        return "token"
-
-    monkeypatch.setattr(beatmap_endpoint, "get_client_credentials_token", fake_token)
+    _mock_osu_api(monkeypatch, responses)
 
     response = client.post("/api/beatmaps/enrich", json={"md5_hashes": [md5]})
     assert response.status_code == 200
@@ -130,12 +137,7 @@ def test_enrich_caches_invalid_md5(db_session, client: TestClient, monkeypatch):
     md5 = "invalid123"
     responses = [MockResponse(404, {})]
 
-    monkeypatch.setattr(beatmap_endpoint.httpx, "AsyncClient", lambda *a, **k: MockAsyncClient(responses))
-
-    async def fake_token() -> str:
-        return "token"
-
-    monkeypatch.setattr(beatmap_endpoint, "get_client_credentials_token", fake_token)
+    _mock_osu_api(monkeypatch, responses)
 
     response = client.post("/api/beatmaps/enrich", json={"md5_hashes": [md5]})
     assert response.status_code == 200
@@ -144,3 +146,246 @@ def test_enrich_caches_invalid_md5(db_session, client: TestClient, monkeypatch):
 
     cached_invalid = db_session.query(InvalidMD5).filter_by(md5_hash=md5).first()
     assert cached_invalid is not None
+
+
+def test_enrich_does_not_cache_transient_failures(db_session, client: TestClient, monkeypatch):
+    md5 = "flaky123"
+    _mock_osu_api(monkeypatch, [MockResponse(500, {})])
+
+    response = client.post("/api/beatmaps/enrich", json={"md5_hashes": [md5]})
+    assert response.status_code == 200
+    assert response.json()["beatmaps"][md5] is None
+
+    assert db_session.query(InvalidMD5).filter_by(md5_hash=md5).first() is None
+
+
+def _osu_beatmap(beatmap_id: int) -> dict:
+    return {
+        "id": beatmap_id,
+        "beatmapset_id": beatmap_id * 10,
+        "status": "ranked",
+        "beatmapset": {"artist": "Artist", "title": f"Map {beatmap_id}", "creator": "Mapper"},
+        "version": "Insane",
+        "count_circles": 1,
+        "count_sliders": 1,
+        "count_spinners": 0,
+        "max_combo": 3,
+    }
+
+
+def test_enrich_job_returns_partial_results_then_completes(
+    db_session, client: TestClient, monkeypatch, db_writer, async_read_session_factory
+):
+    async def deadline_fetch(md5: str):
+        if md5 == "slow":
+            await asyncio.sleep(5)
+        return _osu_beatmap(1 if md5 == "fast" else 2)
+
+    monkeypatch.setattr(beatmap_enrichment_engine, "fetcher", deadline_fetch)
+
+    response = client.post(
+        "/api/beatmaps/enrich/jobs?deadline_ms=100",
+        json={"md5_hashes": ["fast", "slow"]},
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["status"] == "pending"
+    assert payload["beatmaps"]["fast"]["title"] == "Map 1"
+    assert payload["pending"] == ["slow"]
+
+    job_id = payload["job_id"]
+    assert client.get(f"/api/beatmaps/enrich/jobs/{job_id}").json()["pending"] == ["slow"]
+
+    async def fast_fetch(md5: str):
+        return _osu_beatmap(2)
+
+    monkeypatch.setattr(beatmap_enrichment_engine, "fetcher", fast_fetch)
+    runner = EnrichJobRunner(writer=db_writer, read_session_factory=async_read_session_factory)
+    assert asyncio.run(runner.run_once()) == 1
+
+    status = client.get(f"/api/beatmaps/enrich/jobs/{job_id}").json()
+    assert status["status"] == "completed"
+    assert status["pending"] == []
+    assert status["beatmaps"]["slow"]["title"] == "Map 2"
+
+
+def test_enrich_job_deadline_covers_a_full_queue(db_session, client: TestClient, monkeypatch):
+    async def slow_fetch(md5: str):
+        await asyncio.sleep(0.2)
+        return _osu_beatmap(1)
+
+    monkeypatch.setattr(beatmap_enrichment_engine, "fetcher", slow_fetch)
+    monkeypatch.setattr(beatmap_enrichment_engine, "workers", 2)
+    monkeypatch.setattr(beatmap_enrichment_engine, "queue_size", 4)
+    monkeypatch.setattr(beatmap_enrichment_engine, "_loop", None)
+    md5_hashes = [f"hash{i}" for i in range(40)]
+
+    started = time.monotonic()
+    response = client.post("/api/beatmaps/enrich/jobs?deadline_ms=100", json={"md5_hashes": md5_hashes})
+
+    assert time.monotonic() - started < 1.0
+    payload = response.json()
+    assert payload["status"] == "pending"
+    assert payload["pending"] == md5_hashes
+    job_id = payload["job_id"]
+    assert client.get(f"/api/beatmaps/enrich/jobs/{job_id}").json()["pending"] == md5_hashes
+
+
+def test_enrich_job_records_lookups_finished_after_the_deadline(db_session, db_writer):
+    db_writer.submit(crud_enrich_job.create_job, "job", ["late", "lost"]).result()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        late, lost = loop.create_future(), loop.create_future()
+        task = asyncio.create_task(
+            beatmap._store_late_results(db_writer, "job", {"late": late, "lost": lost})
+        )
+        await asyncio.sleep(0)
+        late.set_result(_osu_beatmap(3))
+        lost.set_exception(RuntimeError("upstream down"))
+        await task
+
+    asyncio.run(scenario())
+
+    statuses = {item.md5_hash: item.status for item in db_session.query(EnrichJobItem)}
+    assert statuses == {"late": crud_enrich_job.ITEM_DONE, "lost": crud_enrich_job.ITEM_PENDING}
+    assert db_session.query(Beatmap).filter(Beatmap.md5_hash == "late").one().title == "Map 3"
+
+
+def test_mark_items_done_chunks_hashes(db_session, monkeypatch):
+    monkeypatch.setattr(crud_enrich_job, "SQLITE_MAX_VARIABLES", 3)
+    md5_hashes = [f"hash{i}" for i in range(5)]
+    crud_enrich_job.create_job(db_session, "job", md5_hashes)
+
+    assert crud_enrich_job.mark_items_done(db_session, md5_hashes) == {"job"}
+    db_session.expire_all()
+    assert {item.status for item in db_session.query(EnrichJobItem)} == {crud_enrich_job.ITEM_DONE}
+
+
+def test_runner_sweeps_completed_jobs_past_retention(db_session, db_writer, async_read_session_factory):
+    crud_enrich_job.create_job(db_session, "old", ["a"])
+    crud_enrich_job.create_job(db_session, "recent", ["b"])
+    crud_enrich_job.create_job(db_session, "unfinished", ["c"])
+    db_session.query(EnrichJob).filter(EnrichJob.id != "unfinished").update(
+        {EnrichJob.status: crud_enrich_job.JOB_COMPLETED}, synchronize_session=False
+    )
+    db_session.query(EnrichJob).filter(EnrichJob.id.in_(["old", "unfinished"])).update(
+        {EnrichJob.updated_at: datetime.now(timezone.utc) - timedelta(days=30)}, synchronize_session=False
+    )
+    db_session.commit()
+
+    runner = EnrichJobRunner(
+        writer=db_writer, read_session_factory=async_read_session_factory, retention_seconds=24 * 3600
+    )
+    assert asyncio.run(runner.sweep()) == 1
+
+    db_session.expire_all()
+    assert {job.id for job in db_session.query(EnrichJob)} == {"recent", "unfinished"}
+    assert {item.md5_hash for item in db_session.query(EnrichJobItem)} == {"b", "c"}
+
+
+def test_enrich_job_unknown_id(client: TestClient):
+    response = client.get("/api/beatmaps/enrich/jobs/does-not-exist")
+    assert response.status_code == 404
+
+
+def test_engine_coalesces_concurrent_lookups():
+    calls: list[str] = []
+
+    async def slow_fetch(md5: str) -> dict:
+        calls.append(md5)
+        await asyncio.sleep(0.01)
+        return {"id": len(calls)}
+
+    engine = BeatmapEnrichmentEngine(fetcher=slow_fetch, workers=2, queue_size=2)
+
+    async def scenario():
+        return await asyncio.gather(
+            engine.resolve(["a", "b", "c"]),
+            engine.resolve(["b", "c", "d"]),
+        )
+
+    first, second = asyncio.run(scenario())
+
+    assert sorted(calls) == ["a", "b", "c", "d"]
+    assert first["b"] == second["b"]
+    assert first["c"] == second["c"]
+
+    metrics = engine.metrics()
+    assert metrics["coalesced_hits"] == 2
+    assert metrics["upstream_lookups"] == 4
+    assert metrics["queue_depth"] == 0
+    assert metrics["in_flight"] == 0
+
+
+def test_engine_forgets_hashes_cancelled_while_waiting_for_the_queue():
+    release = asyncio.Event()
+
+    async def blocked_fetch(md5: str) -> dict:
+        await release.wait()
+        return {"id": md5}
+
+    engine = BeatmapEnrichmentEngine(fetcher=blocked_fetch, workers=1, queue_size=1)
+
+    async def scenario():
+        # "a" is taken by the worker, "b" fills the queue, "c" waits for room.
+        blocked = asyncio.create_task(engine.resolve(["a", "b", "c"]))
+        await asyncio.sleep(0.01)
+        assert engine.metrics()["in_flight"] == 3
+        blocked.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+        assert engine.metrics()["in_flight"] == 2
+
+        release.set()
+        return await asyncio.wait_for(engine.resolve(["c"]), timeout=1)
+
+    assert asyncio.run(scenario()) == {"c": {"id": "c"}}
+    assert engine.metrics()["in_flight"] == 0
+
+
+def test_enrich_streams_ndjson(db_session, client: TestClient, monkeypatch):
+    db_session.add(
+        Beatmap(
+            beatmap_id=1,
+            beatmapset_id=10,
+            ranked_status="ranked",
+            md5_hash="known",
+            artist="Artist",
+            title="Known",
+            creator="Creator",
+            version="Hard",
+            hit_objects=100,
+            max_combo=800,
+        )
+    )
+    db_session.commit()
+
+    async def fetch(md5: str):
+        if md5 == "flaky":
+            raise RuntimeError("upstream down")
+        if md5 == "gone":
+            return None
+        return _osu_beatmap(2)
+
+    monkeypatch.setattr(beatmap_enrichment_engine, "fetcher", fetch)
+
+    response = client.post(
+        "/api/beatmaps/enrich?stream=true",
+        json={"md5_hashes": ["known", "fresh", "gone", "flaky"]},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["md5_hash"] == "known"
+    assert lines[0]["beatmap"]["title"] == "Known"
+    beatmaps = {line["md5_hash"]: line["beatmap"] for line in lines}
+    assert beatmaps.keys() == {"known", "fresh", "gone", "flaky"}
+    assert beatmaps["fresh"]["title"] == "Map 2"
+    assert beatmaps["gone"] is None
+    assert beatmaps["flaky"] is None
+
+    assert db_session.query(Beatmap).filter_by(md5_hash="fresh").first() is not None
+    assert db_session.query(InvalidMD5).filter_by(md5_hash="gone").first() is not None
+    assert db_session.query(InvalidMD5).filter_by(md5_hash="flaky").first() is None
@@ -0,0 +1,57 @@
+from sqlalchemy.orm import Session
+
+from app.crud import crud_beatmap
+from app.models.beatmap import Beatmap
+from app.models.invalid_md5 import InvalidMD5
+
+
+def _row(beatmap_id: int, md5: str, title: str = "T") -> dict:
+    return {
+        "beatmap_id": beatmap_id,
+        "beatmapset_id": beatmap_id * 10,
+        "ranked_status": "ranked",
+        "md5_hash": md5,
+        "artist": "A",
+        "title": title,
+        "creator": "C",
+        "version": "V",
+        "hit_objects": 10,
+        "max_combo": 20,
+    }
+
+
+def test_upsert_beatmaps_updates_on_conflict(db_session: Session, monkeypatch):
+    # Force several statements per call to exercise the chunking.
+    monkeypatch.setattr(crud_beatmap, "SQLITE_MAX_VARIABLES", 25)
+    rows = [_row(i, f"{i:032x}") for i in range(1, 8)]
+    crud_beatmap.upsert_beatmaps(db_session, rows)
+    crud_beatmap.upsert_beatmaps(db_session, [_row(1, f"{1:032x}", title="Renamed")])
+    db_session.commit()
+
+    assert db_session.query(Beatmap).count() == 7
+    stored = crud_beatmap.get_beatmaps_by_md5(db_session, [f"{1:032x}"])
+    assert stored[f"{1:032x}"].title == "Renamed"
+
+
+def test_insert_invalid_md5s_ignores_duplicates(db_session: Session):
+    crud_beatmap.insert_invalid_md5s(db_session, ["a" * 32, "b" * 32])
+    crud_beatmap.insert_invalid_md5s(db_session, ["a" * 32, "a" * 32, "c" * 32])
+    db_session.commit()
+
+    assert db_session.query(InvalidMD5).count() == 3
+
+
+def test_in_queries_are_chunked(db_session: Session, monkeypatch):
+    monkeypatch.setattr(crud_beatmap, "SQLITE_MAX_VARIABLES", 2)
+    crud_beatmap.upsert_beatmaps(db_session, [_row(i, f"{i:032x}") for i in range(1, 6)])
+    crud_beatmap.insert_invalid_md5s(db_session, ["d" * 32, "e" * 32, "f" * 32])
+    db_session.commit()
+
+    md5s = [f"{i:032x}" for i in range(1, 6)]
+    assert set(crud_beatmap.get_beatmaps_by_md5(db_session, md5s)) == set(md5s)
+    assert set(crud_beatmap.get_beatmaps_by_ids(db_session, [1, 2, 3, 4, 5])) == {1, 2, 3, 4, 5}
+    assert crud_beatmap.get_invalid_md5s(db_session, ["d" * 32, "e" * 32, "f" * 32, "0" * 32]) == {
+        "d" * 32,
+        "e" * 32,
+        "f" * 32,
+    }
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.endpoints.auth import _store_login
+from app.crud import crud_token, crud_user
+from app.db.writer import DatabaseWriter
+from app.models.user import User
+from app.schemas.token import OsuToken
+from app.schemas.user import UserCreate
+
+
+def _writer(db_session: Session, **kwargs) -> DatabaseWriter:
+    factory = sessionmaker(bind=db_session.get_bind(), autoflush=False, expire_on_commit=False)
+    return DatabaseWriter(factory, **kwargs)
+
+
+def _create_user(db: Session, osu_user_id: int) -> int:
+    return crud_user.create_user(db, UserCreate(osu_user_id=osu_user_id, username=f"u{osu_user_id}")).id
+
+
+def test_queued_writes_share_one_commit(db_session: Session):
+    writer = _writer(db_session, batch_window_ms=200)
+    release = threading.Event()
+
+    # Hold the writer on a first op so the rest queue up behind it.
+    first = writer.submit(lambda db: release.wait(5))
+    futures = [writer.submit(_create_user, 1000 + index) for index in range(10)]
+    release.set()
+
+    assert first.result(5) is True
+    user_ids = [future.result(5) for future in futures]
+    writer.stop()
+
+    assert len(set(user_ids)) == 10
+    assert db_session.query(User).count() == 10
+    assert writer.metrics()["ops"] == 11
+    assert writer.metrics()["batches"] <= 2
+
+
+def test_failing_op_only_fails_its_caller(db_session: Session):
+    writer = _writer(db_session, batch_window_ms=200)
+
+    def fail(db: Session) -> None:
+        db.add(User(osu_user_id=2001, username="rolled back"))
+        db.flush()
+        raise ValueError("boom")
+
+    good = writer.submit(_create_user, 2000)
+    bad = writer.submit(fail)
+    other = writer.submit(_create_user, 2002)
+
+    assert good.result(5)
+    assert other.result(5)
+    with pytest.raises(ValueError):
+        bad.result(5)
+    writer.stop()
+
+    assert {user.osu_user_id for user in db_session.query(User)} == {2000, 2002}
+    assert writer.metrics()["split_batches"] == 1
+    assert writer.metrics()["failed_ops"] == 1
+
+
+def test_store_login_creates_user_and_token(db_session: Session):
+    writer = _writer(db_session)
+    token = OsuToken(access_token="a", refresh_token="r", expires_in=3600)
+
+    user_id = writer.submit(_store_login, 3000, "NewPlayer", token).result(5)
+    assert writer.submit(_store_login, 3000, "NewPlayer", token).result(5) == user_id
+    writer.stop()
+
+    assert crud_user.get_user_by_osu_id(db_session, osu_user_id=3000).id == user_id
+    assert crud_token.get_token_by_owner_id(db_session, owner_id=user_id).access_token == "a"
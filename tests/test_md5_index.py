@@ -0,0 +1,84 @@
+import hashlib
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.md5_index import DIGEST_SIZE, PackedDigestSet, md5_membership_index, md5_to_digest
+from app.crud import crud_beatmap
+from app.models.invalid_md5 import InvalidMD5
+
+
+def _md5(value: str) -> str:
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def test_packed_set_membership_survives_merges():
+    digests = PackedDigestSet(merge_threshold=3)
+    digests.build(md5_to_digest(_md5(str(i))) for i in range(100))
+    for i in range(100, 110):
+        digests.add(md5_to_digest(_md5(str(i))))
+        digests.merge()
+
+    assert len(digests) == 110
+    assert all(md5_to_digest(_md5(str(i))) in digests for i in range(110))
+    assert md5_to_digest(_md5("absent")) not in digests
+    assert digests.nbytes == 110 * 16
+
+    packed = digests._packed
+    merged = [packed[i:i + DIGEST_SIZE] for i in range(0, len(packed), DIGEST_SIZE)]
+    assert merged == sorted(md5_to_digest(_md5(str(i))) for i in range(109))
+
+
+def test_merge_started_before_a_rebuild_is_discarded():
+    digests = PackedDigestSet(merge_threshold=2)
+    digests.add(md5_to_digest(_md5("a")))
+    digests.add(md5_to_digest(_md5("b")))
+    generation, packed, batch = digests.start_merge()
+    assert md5_to_digest(_md5("a")) in digests
+
+    digests.build([md5_to_digest(_md5("c"))])
+    digests.finish_merge(generation, PackedDigestSet.merged_buffer(packed, batch))
+
+    assert len(digests) == 1
+    assert md5_to_digest(_md5("a")) not in digests
+
+
+def test_malformed_hashes_are_left_unchecked(db_session: Session):
+    md5_membership_index.load(db_session)
+    known_invalid, maybe_cached, unchecked = md5_membership_index.classify(["abc123"])
+    assert (known_invalid, maybe_cached, unchecked) == (set(), [], ["abc123"])
+
+
+def test_enrich_skips_database_for_classified_hashes(
+    db_session: Session, client: TestClient, monkeypatch
+):
+    invalid_md5 = _md5("invalid")
+    db_session.add(InvalidMD5(md5_hash=invalid_md5, reason="404_not_found"))
+    db_session.commit()
+    md5_membership_index.load(db_session)
+
+    async def no_invalid_query(db, md5_hashes):  # noqa: ANN001
+        assert not md5_hashes, "InvalidMD5 table should not be queried"
+        return set()
+
+    async def no_beatmap_query(db, md5_hashes):  # noqa: ANN001
+        assert not md5_hashes, "beatmaps table should not be queried"
+        return {}
+
+    monkeypatch.setattr("app.api.endpoints.beatmap.get_invalid_md5s", no_invalid_query)
+    monkeypatch.setattr("app.api.endpoints.beatmap.get_beatmaps_by_md5", no_beatmap_query)
+
+    response = client.post("/api/beatmaps/enrich", json={"md5_hashes": [invalid_md5]})
+    assert response.status_code == 200
+    assert response.json()["beatmaps"][invalid_md5] is None
+
+
+def test_commit_adds_new_hashes_to_index(db_session: Session):
+    md5_membership_index.load(db_session)
+    new_md5 = _md5("new")
+
+    crud_beatmap.create_invalid_md5(db_session, new_md5)
+    assert md5_membership_index.classify([new_md5])[0] == set()
+
+    db_session.commit()
+    assert md5_membership_index.classify([new_md5])[0] == {new_md5}
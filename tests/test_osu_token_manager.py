@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from httpx import Request, Response
+
+from app.core import osu_api_client
+from app.core.osu_api_client import ClientCredentialsTokenManager
+from app.core.rate_limiter import RequestPriority
+
+
+class FakeTokenClient:
+    def __init__(self):
+        self.posts = 0
+
+    async def post(self, url, data):  # noqa: ANN001
+        self.posts += 1
+        await asyncio.sleep(0.01)
+        return Response(
+            status_code=200,
+            json={"access_token": f"token-{self.posts}", "expires_in": 86400},
+            request=Request("POST", url),
+        )
+
+
+def test_concurrent_callers_share_one_refresh(monkeypatch):
+    fake_client = FakeTokenClient()
+    monkeypatch.setattr(osu_api_client, "get_osu_http_client", lambda: fake_client)
+    manager = ClientCredentialsTokenManager(refresh_margin_seconds=300)
+
+    async def scenario():
+        return await asyncio.gather(*(manager.get_token() for _ in range(20)))
+
+    tokens = asyncio.run(scenario())
+
+    assert fake_client.posts == 1
+    assert set(tokens) == {"token-1"}
+
+
+def test_token_inside_margin_is_served_while_refreshing(monkeypatch):
+    fake_client = FakeTokenClient()
+    monkeypatch.setattr(osu_api_client, "get_osu_http_client", lambda: fake_client)
+    manager = ClientCredentialsTokenManager(refresh_margin_seconds=300)
+    manager._token = {
+        "access_token": "old",
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=60),
+    }
+
+    async def scenario():
+        served = await manager.get_token()
+        await asyncio.sleep(0.05)
+        return served, await manager.get_token()
+
+    served, refreshed = asyncio.run(scenario())
+
+    assert served == "old"
+    assert refreshed == "token-1"
+    assert fake_client.posts == 1
+
+
+def test_get_retries_once_after_401(monkeypatch):
+    fake_client = FakeTokenClient()
+    manager = ClientCredentialsTokenManager()
+    manager._token = {
+        "access_token": "revoked",
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=1),
+    }
+    seen_tokens: list[str] = []
+
+    async def fake_get(url, headers, timeout):  # noqa: ANN001
+        seen_tokens.append(headers["Authorization"])
+        if headers["Authorization"] == "Bearer revoked":
+            return Response(status_code=401, json={}, request=Request("GET", url))
+        return Response(
+            status_code=200, json={"username": "PlayerOne"}, request=Request("GET", url)
+        )
+
+    acquired: list[RequestPriority] = []
+
+    async def fake_acquire(priority):  # noqa: ANN001
+        acquired.append(priority)
+
+    fake_client.get = fake_get
+    monkeypatch.setattr(osu_api_client, "get_osu_http_client", lambda: fake_client)
+    monkeypatch.setattr(osu_api_client, "client_credentials_token_manager", manager)
+    monkeypatch.setattr(osu_api_client.osu_api_rate_limiter, "acquire", fake_acquire)
+
+    data = asyncio.run(osu_api_client.get_public_user_data(1))
+
+    assert data["username"] == "PlayerOne"
+    assert seen_tokens == ["Bearer revoked", "Bearer token-1"]
+    # The retry is a second upstream call and is counted as one.
+    assert acquired == [RequestPriority.INTERACTIVE, RequestPriority.INTERACTIVE]
@@ -1,14 +1,21 @@
 import pytest
 import datetime
-from unittest.mock import patch, AsyncMock
+from unittest.mock import AsyncMock
 from httpx import Response
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.main import app
+from app.api.deps import get_async_client
 from app.models.user import User
 from app.models.token import Token
 
-PATCH_TARGET = "app.core.osu_api_client.httpx"
+
+def _override_client(client_instance):
+    async def override_get_async_client():
+        yield client_instance
+
+    app.dependency_overrides[get_async_client] = override_get_async_client
 
 
 @pytest.mark.asyncio
@@ -21,9 +28,8 @@ async def test_proxy_success(
     mocked_client_instance = AsyncMock()
     mocked_client_instance.request.return_value = mock_get_response
 
-    with patch(PATCH_TARGET) as mock_httpx:
-        mock_httpx.AsyncClient.return_value = mocked_client_instance
-        response = authenticated_client.get("/api/proxy/me")
+    _override_client(mocked_client_instance)
+    response = authenticated_client.get("/api/proxy/me")
 
     assert response.status_code == 200
     assert response.json() == mock_api_response
@@ -58,9 +64,8 @@ async def test_proxy_token_refresh(
     mocked_client_instance.post.return_value = mock_refresh_response
     mocked_client_instance.request.return_value = mock_get_response
 
-    with patch(PATCH_TARGET) as mock_httpx:
-        mock_httpx.AsyncClient.return_value = mocked_client_instance
-        response = authenticated_client.get("/api/proxy/me")
+    _override_client(mocked_client_instance)
+    response = authenticated_client.get("/api/proxy/me")
 
     assert response.status_code == 200
     assert response.json() == mock_api_response
@@ -68,6 +73,8 @@ async def test_proxy_token_refresh(
     mocked_client_instance.post.assert_called_once()
     mocked_client_instance.request.assert_called_once()
 
+    # The refresh was committed by the writer thread, not through this session.
+    db_session.expire_all()
     refreshed_token_in_db = (
         db_session.query(Token)
         .filter(Token.owner_id == test_user_with_token.id)
@@ -0,0 +1,147 @@
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from app.core.rate_limiter import RateLimiter, RequestPriority, SQLiteRateLimitBackend
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+MAX_CALLS = 5
+PERIOD_SECONDS = 0.5
+WORKERS = 4
+CALLS_PER_WORKER = 5
+
+WORKER_SCRIPT = """
+import asyncio, sys, time
+from pathlib import Path
+from app.core.rate_limiter import RateLimiter, SQLiteRateLimitBackend
+
+async def main():
+    limiter = RateLimiter(
+        max_calls=int(sys.argv[2]),
+        period_seconds=float(sys.argv[3]),
+        backend=SQLiteRateLimitBackend(Path(sys.argv[1])),
+    )
+    for _ in range(int(sys.argv[4])):
+        await limiter.acquire()
+        print(time.time(), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def test_sqlite_backend_enforces_limit_across_processes(tmp_path: Path):
+    db_path = tmp_path / "rate_limiter.db"
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                WORKER_SCRIPT,
+                str(db_path),
+                str(MAX_CALLS),
+                str(PERIOD_SECONDS),
+                str(CALLS_PER_WORKER),
+            ],
+            cwd=REPO_ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(WORKERS)
+    ]
+
+    timestamps: list[float] = []
+    for process in processes:
+        stdout, _ = process.communicate(timeout=60)
+        assert process.returncode == 0
+        timestamps.extend(float(line) for line in stdout.split())
+
+    assert len(timestamps) == WORKERS * CALLS_PER_WORKER
+
+    # Allow a little slack for the gap between taking a slot and printing it.
+    window = PERIOD_SECONDS * 0.9
+    timestamps.sort()
+    for i, start in enumerate(timestamps):
+        in_window = [ts for ts in timestamps[i:] if ts - start < window]
+        assert len(in_window) <= MAX_CALLS
+
+
+def test_sqlite_backend_keeps_window_across_restarts(tmp_path: Path):
+    db_path = tmp_path / "rate_limiter.db"
+
+    async def fill_budget():
+        limiter = RateLimiter(2, 60.0, backend=SQLiteRateLimitBackend(db_path))
+        await limiter.acquire()
+        await limiter.acquire()
+
+    asyncio.run(fill_budget())
+
+    restarted = SQLiteRateLimitBackend(db_path)
+    wait_for = asyncio.run(restarted.try_acquire(2, 60.0))
+    assert wait_for > 50
+
+
+def test_in_memory_limiter_waits_for_window():
+    limiter = RateLimiter(max_calls=2, period_seconds=0.2)
+
+    async def scenario():
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.18
+
+
+def test_interactive_waiters_are_served_before_background():
+    limiter = RateLimiter(max_calls=1, period_seconds=0.1)
+    order: list[str] = []
+
+    async def take(label: str, priority: RequestPriority):
+        await limiter.acquire(priority)
+        order.append(label)
+
+    async def scenario():
+        await limiter.acquire()
+        background = [
+            asyncio.create_task(take(f"background-{i}", RequestPriority.BACKGROUND))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(take("interactive", RequestPriority.INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+
+    asyncio.run(scenario())
+
+    assert order == ["interactive", "background-0", "background-1"]
+
+
+def test_background_cannot_use_interactive_reserve():
+    limiter = RateLimiter(max_calls=3, period_seconds=60.0, interactive_reserve=1)
+
+    async def scenario():
+        await limiter.acquire(RequestPriority.BACKGROUND)
+        await limiter.acquire(RequestPriority.BACKGROUND)
+        blocked = asyncio.create_task(limiter.acquire(RequestPriority.BACKGROUND))
+        await asyncio.wait_for(limiter.acquire(RequestPriority.INTERACTIVE), timeout=1)
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        blocked.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_observe_adapts_budget_and_backs_off_on_429():
+    limiter = RateLimiter(max_calls=60, period_seconds=60.0)
+
+    async def scenario():
+        await limiter.observe(200, {"X-RateLimit-Limit": "30", "X-RateLimit-Remaining": "29"})
+        assert limiter.max_calls == 30
+
+        await limiter.observe(429, {"Retry-After": "5"})
+        return await limiter.backend.try_acquire(limiter.max_calls, limiter.period_seconds)
+
+    wait_for = asyncio.run(scenario())
+    assert 4 < wait_for <= 5
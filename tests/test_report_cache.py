@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+from app.core.report_cache import ReportCache, report_cache_key
+from app.core.report_index import ReportPage
+
+
+def _page(nbytes: int) -> ReportPage:
+    page = ReportPage({}, {}, 0, [])
+    page.nbytes = nbytes
+    return page
+
+
+def test_evicts_least_recently_used_within_byte_budget():
+    cache = ReportCache(max_bytes=100)
+    cache.put(("a", 0, 0, None), _page(40))
+    cache.put(("b", 0, 0, None), _page(40))
+    assert cache.get(("a", 0, 0, None)) is not None
+    cache.put(("c", 0, 0, None), _page(40))
+
+    assert cache.get(("b", 0, 0, None)) is None
+    assert cache.get(("a", 0, 0, None)) is not None
+    metrics = cache.metrics()
+    assert metrics["evictions"] == 1
+    assert metrics["bytes"] == 80
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 1
+
+
+def test_page_size_counts_decoded_objects():
+    scores = [{"pp": float(i), "title": f"Map {i}", "mods": ["HD", "DT"]} for i in range(50)]
+    page = ReportPage({"username": "PlayerOne"}, {"delta_pp": 1.0}, 50, scores)
+    # Decoded dicts and strings take far more memory than their JSON text.
+    assert page.nbytes > 3 * len(json.dumps([page.metadata, page.summary, scores]))
+
+
+def test_oversized_pages_are_not_cached():
+    cache = ReportCache(max_bytes=10)
+    cache.put(("a", 0, 0, None), _page(11))
+    assert cache.metrics()["entries"] == 0
+
+
+def test_key_changes_when_report_is_rewritten(tmp_path: Path):
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps({"lost_scores": []}), encoding="utf-8")
+    before = report_cache_key(report, (0, 50))
+
+    report.write_text(json.dumps({"lost_scores": [{"pp": 1.0}]}), encoding="utf-8")
+    assert report_cache_key(report, (0, 50)) != before
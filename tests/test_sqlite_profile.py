@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db import session
+from app.db.sqlite_profile import SqliteOptimizer, install_sqlite_profile, sqlite_pragmas
+
+
+def _engine(tmp_path, read_only: bool = False):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    install_sqlite_profile(engine, read_only=read_only)
+    return engine
+
+
+def test_profile_applied_on_connect(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.connect() as connection:
+        pragma = lambda name: connection.execute(text(f"PRAGMA {name}")).scalar()  # noqa: E731
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+        assert pragma("cache_size") == -settings.SQLITE_CACHE_SIZE_KIB
+        assert pragma("temp_store") == 2  # MEMORY
+        assert pragma("query_only") == 0
+    engine.dispose()
+
+
+def test_read_only_profile_rejects_writes(tmp_path):
+    writer = _engine(tmp_path)
+    with writer.begin() as connection:
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        connection.execute(text("INSERT INTO t VALUES (1)"))
+
+    reader = _engine(tmp_path, read_only=True)
+    with reader.connect() as connection:
+        assert connection.execute(text("SELECT x FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            connection.execute(text("INSERT INTO t VALUES (2)"))
+
+    SqliteOptimizer(writer).optimize()
+    reader.dispose()
+    writer.dispose()
+
+
+def test_invalid_setting_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_SYNCHRONOUS", "sometimes")
+    with pytest.raises(ValueError):
+        sqlite_pragmas()
+
+
+def test_default_engine_is_read_only():
+    # Writes go through the database writer; the shared sync pool only reads.
+    with session.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 1
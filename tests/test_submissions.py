@@ -1,11 +1,17 @@
+import gzip
+import io
 import json
 from datetime import datetime
 import shutil
 from pathlib import Path
 
+import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.core import report_index
+from app.core.report_index import index_path_for, index_report_stream, read_report_page
+from app.core.report_storage import accepts_encoding
 from app.models.user import User
 from app.models.submission import Submission
 
@@ -45,7 +51,10 @@ def _write_sample_report(path: Path):
             }
         ],
     }
-    path.write_text(json.dumps(data), encoding="utf-8")
+    encoded = json.dumps(data).encode("utf-8")
+    if path.suffix == ".gz":
+        encoded = gzip.compress(encoded)
+    path.write_bytes(encoded)
 
 
 def _create_submission(db_session: Session, user: User, filename: str) -> Submission:
@@ -99,6 +108,188 @@ def test_get_submission_returns_detail(client: TestClient, db_session: Session):
     assert payload["summary_stats"]["lost_scores_found"] == 2
     assert len(payload["lost_scores"]) == 1
 
+    assert client.get("/api/submissions/PlayerTwo").json() == payload
+    metrics = client.get("/api/submissions/cache/metrics").json()["reports"]
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 1
+
+
+def test_get_submission_pages_through_report_index(client: TestClient, db_session: Session):
+    user = User(osu_user_id=3, username="PlayerThree")
+    db_session.add(user)
+    db_session.commit()
+
+    submission = _create_submission(db_session, user, "analysis_paged.json")
+    json_path = REPO_ROOT / submission.thin_json_path
+    data = json.loads(json_path.read_text(encoding="utf-8"))
+    template = data["lost_scores"][0]
+    data["lost_scores"] = [dict(template, pp=float(i), title=f"Map {i}") for i in range(5)]
+    json_path.write_text(json.dumps(data), encoding="utf-8")
+
+    index_path = index_path_for(json_path)
+    assert not index_path.exists()
+
+    first = client.get("/api/submissions/PlayerThree?offset=0&limit=2").json()
+    assert [score["title"] for score in first["lost_scores"]] == ["Map 0", "Map 1"]
+    assert first["total_count"] == 5
+    assert index_path.exists()
+
+    page = read_report_page(json_path, offset=3, limit=10)
+    assert page is not None
+    assert [score["title"] for score in page.scores] == ["Map 3", "Map 4"]
+    assert page.summary["delta_pp"] == 150.0
+
+    second = client.get("/api/submissions/PlayerThree?offset=4&limit=2").json()
+    assert [score["title"] for score in second["lost_scores"]] == ["Map 4"]
+    assert second["metadata"]["username"] == "PlayerThree"
+
+    # A replaced report invalidates the sidecar built from the old one.
+    data["lost_scores"] = data["lost_scores"][:1]
+    json_path.write_text(json.dumps(data), encoding="utf-8")
+    assert read_report_page(json_path, offset=0, limit=10) is None
+    assert client.get("/api/submissions/PlayerThree").json()["total_count"] == 1
+
+    assert client.get("/api/submissions/PlayerThree?offset=-1").status_code == 422
+    assert client.get("/api/submissions/PlayerThree?limit=0").status_code == 422
+    assert client.get("/api/submissions/PlayerThree?limit=501").status_code == 422
+
+
+def test_streamed_index_matches_the_parsed_one(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_index, "READ_CHUNK_SIZE", 7)
+    scores = [{"pp": 1.5e2 + i, "title": f"Map \u00e9 {i}", "mods": ["HD", "DT"]} for i in range(20)]
+    report = {
+        "metadata": {"user_identifier": "Streamer"},
+        "lost_scores": [{"title": "ignored"}],
+        "top_plays": [{"title": "skipped"}] * 3,
+        "score_lists": {"other": [[1, 2], {"a": None}], "lost_scores": scores},
+        "summary_stats": {"delta_pp": 12345678901234},
+    }
+    report_path = tmp_path / "report.json"
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    with open(report_path, "rb") as fp:
+        metadata, summary = index_report_stream(report_path, fp)
+
+    assert metadata == {"user_identifier": "Streamer"}
+    assert summary == {"delta_pp": 12345678901234}
+    page = read_report_page(report_path, offset=18, limit=5)
+    assert page.total_count == 20
+    assert page.scores == scores[18:]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["report.json", "report.json.idx"]
+
+    with pytest.raises(ValueError):
+        index_report_stream(report_path, io.BytesIO(b'{"lost_scores": [{"pp": 1}'))
+    with pytest.raises(ValueError):
+        index_report_stream(report_path, io.BytesIO(b"[]"))
+
+
+def test_get_submission_returns_304_for_matching_etag(client: TestClient, db_session: Session):
+    user = User(osu_user_id=4, username="PlayerFour")
+    db_session.add(user)
+    db_session.commit()
+
+    _create_submission(db_session, user, "analysis_etag.json")
+
+    first = client.get("/api/submissions/PlayerFour")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public")
+
+    cached = client.get("/api/submissions/PlayerFour", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    other_page = client.get("/api/submissions/PlayerFour?offset=1", headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+
+def test_list_submissions_keyset_pagination(client: TestClient, db_session: Session):
+    user = User(osu_user_id=5, username="PlayerFive")
+    db_session.add(user)
+    db_session.commit()
+    for day, delta_pp in ((1, 50.0), (2, 300.0), (3, 100.0), (4, 300.0), (5, 200.0)):
+        db_session.add(
+            Submission(
+                user_id=user.id,
+                username=user.username,
+                scan_timestamp=datetime(2025, 8, day),
+                lost_count=1,
+                current_pp=7000.0,
+                potential_pp=7000.0 + delta_pp,
+                delta_pp=delta_pp,
+                thin_json_path="storage/missing.json",
+            )
+        )
+    db_session.commit()
+
+    def collect(sort: str) -> list[dict]:
+        rows = []
+        response = client.get(f"/api/submissions/list?sort={sort}&limit=2")
+        while True:
+            rows.extend(response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                return rows
+            response = client.get(f"/api/submissions/list?sort={sort}&limit=2&cursor={cursor}")
+
+    recent = collect("recent")
+    assert [row["scan_date"][:10] for row in recent] == [
+        "2025-08-05", "2025-08-04", "2025-08-03", "2025-08-02", "2025-08-01"
+    ]
+    assert [row["total_pp_gain"] for row in collect("delta")] == [300.0, 300.0, 200.0, 100.0, 50.0]
+
+    first = client.get("/api/submissions/list?sort=recent&limit=2")
+    cursor = first.headers["x-next-cursor"]
+    assert client.get(f"/api/submissions/list?sort=delta&cursor={cursor}").status_code == 400
+
+
+def test_username_lookup_and_prefix_search_are_case_insensitive(
+    client: TestClient, db_session: Session
+):
+    for osu_user_id, name in ((6, "Lemon4ik"), (7, "lemonade"), (8, "Mapper")):
+        user = User(osu_user_id=osu_user_id, username=name)
+        db_session.add(user)
+        db_session.commit()
+        _create_submission(db_session, user, f"analysis_{name}.json")
+
+    assert client.get("/api/submissions/LEMON4IK").json()["metadata"]["username"] == "Lemon4ik"
+
+    matches = client.get("/api/submissions/search/usernames?prefix=LEM").json()
+    assert [match["username"] for match in matches] == ["Lemon4ik", "lemonade"]
+    assert client.get("/api/submissions/search/usernames?prefix=z").json() == []
+
+
+def test_compressed_report_is_decoded_transparently(client: TestClient, db_session: Session):
+    user = User(osu_user_id=8, username="Gzipped")
+    db_session.add(user)
+    db_session.commit()
+    submission = _create_submission(db_session, user, "analysis_gzipped.json.gz")
+    stored = (REPO_ROOT / submission.thin_json_path).read_bytes()
+
+    detail = client.get("/api/submissions/Gzipped").json()
+    assert detail["summary_stats"]["delta_pp"] == 150.0
+    assert len(detail["lost_scores"]) == 1
+
+    # Sent as stored when gzip is accepted...
+    raw = client.get("/api/submissions/Gzipped/report", headers={"Accept-Encoding": "gzip"})
+    assert raw.status_code == 200
+    assert raw.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in raw.headers["vary"]
+    assert raw.headers["content-length"] == str(len(stored))
+    assert raw.json()["metadata"]["user_identifier"] == "PlayerOne"
+
+    # ...and decoded for clients that refuse it.
+    plain = client.get("/api/submissions/Gzipped/report", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == gzip.decompress(stored)
+
+
+def test_accepts_encoding_honours_quality_values():
+    assert accepts_encoding("gzip, deflate, br", "gzip")
+    assert accepts_encoding("br;q=1.0, *;q=0.5", "gzip")
+    assert not accepts_encoding("gzip;q=0, *", "gzip")
+    assert not accepts_encoding("identity", "gzip")
+    assert not accepts_encoding(None, "zstd")
+
 
 def test_get_submission_not_found(client: TestClient):
     response = client.get("/api/submissions/UnknownUser")
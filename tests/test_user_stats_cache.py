@@ -0,0 +1,106 @@
+import asyncio
+
+from app.core.user_stats_cache import UserStatsCache
+
+
+def _counting_loader(values: list):
+    calls = []
+
+    async def loader():
+        calls.append(len(calls))
+        await asyncio.sleep(0.01)
+        return values[len(calls) - 1]
+
+    return loader, calls
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = UserStatsCache(fresh_seconds=60, max_age_seconds=600)
+    loader, calls = _counting_loader(["stats"])
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("player", loader) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["stats"] * 5
+    assert len(calls) == 1
+    assert cache.metrics()["misses"] == 5
+
+
+def test_stale_entry_is_served_while_refreshing():
+    cache = UserStatsCache(fresh_seconds=0, max_age_seconds=600)
+    loader, calls = _counting_loader(["old", "new"])
+
+    async def scenario():
+        first = await cache.get("player", loader)
+        stale = await cache.get("player", loader)
+        await asyncio.sleep(0.05)
+        return first, stale
+
+    first, stale = asyncio.run(scenario())
+    assert (first, stale) == ("old", "old")
+    assert len(calls) == 2
+    assert cache.metrics()["stale_hits"] == 1
+
+    async def read_fresh():
+        cache.fresh_seconds = 60
+        return await cache.get("player", loader)
+
+    assert asyncio.run(read_fresh()) == "new"
+
+
+def test_entries_past_max_age_are_refetched_inline():
+    cache = UserStatsCache(fresh_seconds=0, max_age_seconds=0)
+    loader, calls = _counting_loader(["old", "new"])
+
+    async def scenario():
+        await cache.get("player", loader)
+        await asyncio.sleep(0.01)
+        return await cache.get("player", loader)
+
+    assert asyncio.run(scenario()) == "new"
+    assert cache.metrics()["stale_hits"] == 0
+
+
+def test_failed_refresh_keeps_previous_entry():
+    cache = UserStatsCache(fresh_seconds=0, max_age_seconds=600)
+    loader, _ = _counting_loader(["stats", None])
+
+    async def scenario():
+        await cache.get("player", loader)
+        await cache.get("player", loader)
+        await asyncio.sleep(0.05)
+        cache.fresh_seconds = 60
+        return await cache.get("player", loader)
+
+    assert asyncio.run(scenario()) == "stats"
+    assert cache.metrics()["refresh_failures"] == 1
+
+
+def test_failed_fetch_is_not_retried_within_negative_ttl():
+    cache = UserStatsCache(fresh_seconds=60, max_age_seconds=600, negative_ttl_seconds=60)
+    loader, calls = _counting_loader([None, "stats"])
+
+    async def scenario():
+        return [await cache.get("player", loader) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [None, None, None]
+    assert len(calls) == 1
+    assert cache.metrics()["negative_hits"] == 2
+
+    cache.negative_ttl_seconds = 0
+    assert asyncio.run(cache.get("player", loader)) == "stats"
+    assert len(calls) == 2
+
+
+def test_stale_entry_is_served_without_refresh_after_a_failure():
+    cache = UserStatsCache(fresh_seconds=0, max_age_seconds=600, negative_ttl_seconds=60)
+    loader, calls = _counting_loader(["stats", None, "new"])
+
+    async def scenario():
+        await cache.get("player", loader)
+        await cache.get("player", loader)
+        await asyncio.sleep(0.05)
+        return await cache.get("player", loader)
+
+    assert asyncio.run(scenario()) == "stats"
+    assert len(calls) == 2
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.endpoints import submissions
+from app.core.user_stats_refresher import UserStatsRefresher
+from app.crud import crud_cache_generation
+from app.models.cache_generation import CacheGeneration
+from app.models.submission import Submission
+from app.models.user import User
+from app.models.user_stats import UserStats
+
+
+def _osu_user(osu_user_id: int) -> dict:
+    return {
+        "id": osu_user_id,
+        "username": f"Player{osu_user_id}",
+        "avatar_url": "https://a.ppy.sh/1",
+        "country_code": "KZ",
+        "statistics_rulesets": {
+            "osu": {"pp": 1000.0 + osu_user_id, "global_rank": osu_user_id, "country_rank": 1}
+        },
+    }
+
+
+def _add_submitter(db_session: Session, osu_user_id: int) -> User:
+    user = User(osu_user_id=osu_user_id, username=f"Player{osu_user_id}")
+    db_session.add(user)
+    db_session.flush()
+    db_session.add(
+        Submission(
+            user_id=user.id,
+            username=user.username,
+            scan_timestamp=datetime(2025, 8, 1, 12, 0, 0),
+            lost_count=1,
+            current_pp=7000.0,
+            potential_pp=7100.0,
+            delta_pp=100.0,
+            thin_json_path="storage/missing.json",
+        )
+    )
+    return user
+
+
+def test_refresh_batches_fifty_ids_per_call(
+    db_session: Session, db_writer, async_read_session_factory
+):
+    for osu_user_id in range(1, 62):
+        _add_submitter(db_session, osu_user_id)
+    db_session.commit()
+
+    batches: list[list[int]] = []
+
+    async def fetch(user_ids: list[int]) -> list[dict]:
+        batches.append(user_ids)
+        return [_osu_user(user_id) for user_id in user_ids]
+
+    refresher = UserStatsRefresher(
+        fetcher=fetch, writer=db_writer, read_session_factory=async_read_session_factory
+    )
+    assert asyncio.run(refresher.run_once()) == 61
+
+    assert [len(batch) for batch in batches] == [50, 11]
+    assert db_session.query(UserStats).count() == 61
+    assert db_session.get(UserStats, 7).pp == 1007.0
+
+
+def _generation(db_session: Session) -> int:
+    db_session.expire_all()
+    row = db_session.get(CacheGeneration, crud_cache_generation.SUBMISSIONS)
+    return row.value if row else 0
+
+
+def test_generation_bumps_only_when_shown_stats_change(
+    db_session: Session, db_writer, async_read_session_factory
+):
+    _add_submitter(db_session, 1)
+    _add_submitter(db_session, 2)
+    db_session.commit()
+    pp = {1: 1001.0, 2: 1002.0}
+
+    async def fetch(user_ids: list[int]) -> list[dict]:
+        users = [_osu_user(user_id) for user_id in user_ids]
+        for user in users:
+            user["statistics_rulesets"]["osu"]["pp"] = pp[user["id"]]
+        return users
+
+    refresher = UserStatsRefresher(
+        fetcher=fetch, writer=db_writer, read_session_factory=async_read_session_factory
+    )
+    asyncio.run(refresher.run_once())
+    first = _generation(db_session)
+    assert first > 0
+
+    asyncio.run(refresher.run_once())
+    assert _generation(db_session) == first
+
+    pp[2] = 1500.0
+    asyncio.run(refresher.run_once())
+    assert _generation(db_session) == first + 1
+
+
+def test_generation_bumps_when_stored_stats_expire(
+    db_session: Session, db_writer, async_read_session_factory
+):
+    _add_submitter(db_session, 1)
+    db_session.add(UserStats(osu_user_id=1, username="Player1", pp=1001.0))
+    db_session.commit()
+
+    async def fetch(user_ids: list[int]) -> list[dict]:
+        return []  # the profile is gone upstream, so the stored row only ages
+
+    refresher = UserStatsRefresher(
+        fetcher=fetch,
+        writer=db_writer,
+        read_session_factory=async_read_session_factory,
+        max_age_seconds=0.2,
+    )
+    asyncio.run(refresher.run_once())
+    assert _generation(db_session) == 0
+
+    time.sleep(0.3)
+    asyncio.run(refresher.run_once())
+    assert _generation(db_session) == 1
+
+    asyncio.run(refresher.run_once())
+    assert _generation(db_session) == 1
+
+
+def test_endpoints_read_stored_stats(
+    db_session: Session,
+    client: TestClient,
+    async_read_session_factory,
+    db_writer,
+    monkeypatch,
+):
+    _add_submitter(db_session, 42)
+    db_session.commit()
+
+    async def fetch(user_ids: list[int]) -> list[dict]:
+        return [_osu_user(user_id) for user_id in user_ids]
+
+    refresher = UserStatsRefresher(
+        fetcher=fetch, writer=db_writer, read_session_factory=async_read_session_factory
+    )
+    asyncio.run(refresher.run_once())
+
+    async def fail_upstream(*args, **kwargs):  # noqa: ANN001
+        raise AssertionError("stored stats should be used")
+
+    monkeypatch.setattr(submissions, "get_public_user_data", fail_upstream)
+
+    listed = client.get("/api/submissions/list").json()
+    assert listed[0]["live_pp"] == 1042.0
+    assert listed[0]["live_global_rank"] == 42
+
+    submission = db_session.query(Submission).one()
+    submission.user  # loaded here; the async session can't lazy-load it
+
+    async def fetch():
+        async with async_read_session_factory() as db:
+            return await submissions._fetch_user_stats(submission, db)
+
+    stats = asyncio.run(fetch())
+    assert stats is not None
+    assert stats.current_pp == 1042.0